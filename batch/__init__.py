@@ -0,0 +1,33 @@
+"""
+Batch package for the PicoPlaca system.
+Contains the streaming pipelines that check files of records in a single run.
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .batch_processor import BatchProcessor, BatchSummary
+    from .parallel_batch_processor import ParallelBatchProcessor
+
+_EXPORTS = {
+    "BatchProcessor": ".batch_processor",
+    "BatchSummary": ".batch_processor",
+    "ParallelBatchProcessor": ".parallel_batch_processor",
+}
+
+__all__ = ["BatchProcessor", "BatchSummary", "ParallelBatchProcessor"]
+
+
+def __getattr__(name: str):
+    """Imports an export on first access."""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """Lists the exports alongside the names already loaded."""
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,89 @@
+"""
+Batch Processor Module
+
+Connects a record reader, the predictor and a record writer into a streaming pipeline.
+"""
+import itertools
+from time import perf_counter
+from typing import Callable, Iterable, NamedTuple
+
+from core import PicoPlacaPredictor
+from core.predictor_stats import PredictorStats
+from input.record_reader import Record
+from output.record_writer import RecordWriter
+
+
+class BatchSummary(NamedTuple):
+    """
+    Counts of the records processed by a batch run.
+    Attributes:
+        records (int): Total number of records written.
+        restricted (int): Records whose vehicle is restricted.
+        errors (int): Records that could not be checked.
+    """
+
+    records: int
+    restricted: int
+    errors: int
+
+
+class BatchProcessor:
+    """
+    Streams records through a PicoPlacaPredictor.
+    Records are pulled from the reader, checked with predict_many and written out one at
+    a time in input order, so memory use stays constant regardless of input size.
+    Malformed records are written with an error verdict and do not stop the run.
+    When the predictor has stats enabled, writing each output record is timed as the
+    'format' stage.
+    Attributes:
+        predictor (PicoPlacaPredictor): The predictor used to check each record.
+    """
+
+    predictor: PicoPlacaPredictor
+
+    def __init__(self, predictor: PicoPlacaPredictor):
+        self.predictor = predictor
+
+    def process(self, records: Iterable[Record], writer: RecordWriter) -> BatchSummary:
+        """
+        Checks every record and writes one output record for each.
+        Args:
+            records (Iterable[Record]): The input records, e.g. a RecordReader.
+            writer (RecordWriter): Where to write the results.
+        Returns:
+            BatchSummary: Counts of the records processed.
+        """
+
+        # The two iterators advance in lock step, so the tee buffer only ever holds the
+        # malformed records between two valid ones.
+        records, candidates = itertools.tee(records)
+        results = self.predictor.predict_many(
+            record.triple for record in candidates if record.error is None)
+
+        write = writer.write
+        if self.predictor.stats is not None:
+            write = _timed_write(write, self.predictor.stats)
+
+        total = restricted = errors = 0
+        for record in records:
+            total += 1
+            if record.error is not None:
+                errors += 1
+                write(record.fields, None, record.error)
+                continue
+            result = next(results)
+            if result.error_code is not None:
+                errors += 1
+            elif result.restricted:
+                restricted += 1
+            write(record.fields, result.restricted, result.error, result.error_code)
+        return BatchSummary(total, restricted, errors)
+
+
+def _timed_write(write: Callable, stats: PredictorStats) -> Callable:
+    """Wraps a RecordWriter.write so that every call is recorded as the 'format' stage."""
+    def timed(*args):
+        began = perf_counter()
+        write(*args)
+        stats.observe("format", perf_counter() - began)
+    return timed
@@ -0,0 +1,312 @@
+"""
+Parallel Batch Processor Module
+
+Splits a batch input file into byte ranges and checks them in a pool of worker processes.
+"""
+import csv
+import io
+import itertools
+import multiprocessing
+import os
+import re
+from collections import deque
+from typing import List, NamedTuple, Optional, TextIO, Tuple
+
+from core import PicoPlacaPredictor, PicoPlacaRuleSet
+from core.predictor_stats import PredictorStats
+from input.record_reader import RecordReader
+from output.record_writer import RecordWriter
+from .batch_processor import BatchProcessor, BatchSummary
+
+# Target size of the byte range handed to a worker in one task
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# The line number prefix of the errors RecordReader reports
+_LINE_PREFIX = re.compile(r"line (\d+): ")
+
+# Per-process state created once by the pool initializer
+_worker_processor: Optional[BatchProcessor] = None
+_worker_format: str = "csv"
+_worker_header: str = ""
+_worker_stats: bool = False
+
+
+def _init_worker(rule_set: PicoPlacaRuleSet, fmt: str, header: str, stats: bool):
+    """Builds the predictor once per worker process."""
+    global _worker_processor, _worker_format  # pylint: disable=global-statement
+    global _worker_header, _worker_stats  # pylint: disable=global-statement
+    _worker_processor = BatchProcessor(PicoPlacaPredictor(rule_set))
+    _worker_format = fmt
+    _worker_header = header
+    _worker_stats = stats
+
+
+class _ChunkResult(NamedTuple):
+    """
+    What a worker returns for one byte range.
+    Attributes:
+        output (str): The rendered output records, with a CSV header in front.
+        numbers (List[Tuple[int, int]]): The position in output of every error line number
+                                         and that number, counted from the range's start.
+        lines (int): Number of lines in the range.
+        summary (BatchSummary): Counts of the records checked.
+        stats (Optional[PredictorStats]): The range's stats, when enabled.
+        split_record (bool): True if a CSV record of the range has a quoted line break,
+                             so the ranges do not hold whole records.
+    """
+
+    output: str
+    numbers: List[Tuple[int, int]]
+    lines: int
+    summary: BatchSummary
+    stats: Optional[PredictorStats]
+    split_record: bool
+
+
+def _process_chunk(task: Tuple[str, int, int]) -> _ChunkResult:
+    """Checks the records of a byte range, numbering its lines from 1."""
+    path, start, end = task
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        text = handle.read(end - start).decode("utf-8")
+    lines = text.count("\n")
+    if _worker_format == "csv" and _has_quoted_line_break(text):
+        return _ChunkResult("", [], lines, BatchSummary(0, 0, 0), None, True)
+    # The header is replayed in front of every chunk as line 0
+    first_line = 1
+    if _worker_header:
+        text = _worker_header + text
+        first_line = 0
+    writer = _ChunkWriter(_worker_format)
+    # Every chunk gets its own stats, which the parent merges
+    stats = _worker_processor.predictor.stats = PredictorStats() if _worker_stats else None
+    summary = _worker_processor.process(
+        RecordReader(io.StringIO(text, newline=""), _worker_format, first_line), writer)
+    return _ChunkResult(writer.stream.getvalue(), writer.numbers, lines, summary, stats,
+                        False)
+
+
+def _has_quoted_line_break(text: str) -> bool:
+    """Tells whether CSV text has a field with a line break, or ends inside quotes."""
+    if '"' not in text:
+        return False
+    for row in csv.reader(io.StringIO(text, newline="")):
+        for field in row:
+            if "\n" in field or "\r" in field:
+                return True
+    return False
+
+
+class _ChunkWriter(RecordWriter):
+    """
+    Writes the records of one range to a string, remembering where each error line
+    number was written so that the parent can replace it with the number in the file.
+    Attributes:
+        numbers (List[Tuple[int, int]]): The position in the output of every error line
+                                         number and that number.
+    """
+
+    numbers: List[Tuple[int, int]]
+
+    def __init__(self, fmt: str):
+        super().__init__(io.StringIO(), fmt)
+        self.numbers = []
+
+    def write(self, fields: dict, restricted: Optional[bool], error: Optional[str] = None,
+              error_code: Optional[str] = None):
+        match = _LINE_PREFIX.match(error) if error is not None else None
+        if match is None:
+            super().write(fields, restricted, error, error_code)
+            return
+        # The record is rendered with the line numbers 0 and 1 in its place; the last
+        # character that differs between them is where the number is, whatever the
+        # quoting or escaping of the format.
+        rest = error[match.end():]
+        start = self.stream.tell()
+        super().write(fields, restricted, "line 0: " + rest, error_code)
+        self.stream.seek(start)
+        zero = self.stream.read()
+        self.stream.seek(start)
+        self.stream.truncate()
+        super().write(fields, restricted, "line 1: " + rest, error_code)
+        end = self.stream.tell()
+        self.stream.seek(start)
+        one = self.stream.read()
+        tail = 1
+        while zero[-tail] == one[-tail]:
+            tail += 1
+        self.numbers.append((end - tail, int(match.group(1))))
+
+
+class ParallelBatchProcessor:
+    """
+    Checks a batch input file with a pool of worker processes.
+    The file is split into byte ranges that end on line boundaries. Each worker builds
+    its predictor once, then checks whole ranges at a time; results are written in input
+    order with at most a few ranges per worker held in memory, and workers number lines
+    from the start of their range, which the parent shifts while writing. Ranges are
+    split on every newline, so once a range turns out to hold a CSV record with a quoted
+    line break, the rest of the file is checked in this process instead.
+    Attributes:
+        rule_set (PicoPlacaRuleSet): The rule set sent to every worker.
+        workers (int): Number of worker processes.
+        chunk_size (int): Target size in bytes of each range.
+        stats (Optional[PredictorStats]): When set, workers instrument their predictors
+                                          and their stats are merged into it.
+    """
+
+    rule_set: PicoPlacaRuleSet
+    workers: int
+    chunk_size: int
+    stats: Optional[PredictorStats]
+
+    def __init__(self, rule_set: PicoPlacaRuleSet, workers: int, chunk_size: int = CHUNK_SIZE,
+                 stats: Optional[PredictorStats] = None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.rule_set = rule_set
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.stats = stats
+
+    def process(self, path: str, fmt: str, target: TextIO) -> BatchSummary:
+        """
+        Checks every record of a file and writes one output record for each.
+        Args:
+            path (str): The input file; it must be seekable, so standard input is not
+                        supported.
+            fmt (str): Either 'csv' or 'jsonl'.
+            target (TextIO): Where to write the results.
+        Returns:
+            BatchSummary: Counts of the records processed.
+        """
+
+        header, ranges = self._split(path, fmt)
+        if header:
+            # A header without the required columns is reported once, as in a
+            # single-process run, instead of once per range
+            header_check = next(iter(RecordReader(io.StringIO(header, newline=""), fmt)), None)
+            if header_check is not None and header_check.error is not None:
+                RecordWriter(target, fmt).write(header_check.fields, None, header_check.error)
+                return BatchSummary(1, 0, 1)
+
+        merger = _OutputMerger(target, fmt, 1 if header else 0, self.stats)
+        resume = None
+        with multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                  initargs=(self.rule_set, fmt, header,
+                                            self.stats is not None)) as pool:
+            pending = deque()
+            ranges = iter(ranges)
+            while resume is None:
+                # Keep a few ranges per worker in flight and merge them in order
+                for start, end in itertools.islice(ranges, 2 * self.workers + 1 - len(pending)):
+                    pending.append((start, pool.apply_async(_process_chunk,
+                                                            ((path, start, end),))))
+                if not pending:
+                    break
+                start, result = pending.popleft()
+                if not merger.add(result.get()):
+                    resume = start
+        if resume is not None:
+            self._process_rest(path, resume, header, fmt, merger)
+        return merger.summary()
+
+    def _process_rest(self, path: str, start: int, header: str, fmt: str,
+                      merger: "_OutputMerger"):
+        """Checks the file from a byte offset on in this process, after the merged ranges."""
+        processor = BatchProcessor(PicoPlacaPredictor(self.rule_set, self.stats))
+        with open(path, "r", encoding="utf-8", newline="") as handle:
+            handle.seek(start)
+            # The header is replayed one line before the first record left
+            records = RecordReader(itertools.chain([header], handle), fmt, merger.offset)
+            writer = RecordWriter(_HeaderSkipper(merger.target,
+                                                  merger.has_header and merger.header_written), fmt)
+            merger.add_summary(processor.process(records, writer))
+
+    def _split(self, path: str, fmt: str) -> Tuple[str, List[Tuple[int, int]]]:
+        """Finds the CSV header and the line-aligned byte ranges of the file body."""
+        size = os.path.getsize(path)
+        with open(path, "rb") as handle:
+            header = handle.readline().decode("utf-8") if fmt == "csv" else ""
+            if header and not header.endswith("\n"):
+                header += "\n"
+            start = handle.tell()
+            ranges = []
+            while start < size:
+                handle.seek(min(start + self.chunk_size, size))
+                handle.readline()
+                end = min(handle.tell(), size)
+                ranges.append((start, end))
+                start = end
+        return header, ranges
+
+
+class _OutputMerger:
+    """
+    Writes chunk outputs in order, keeping only the first CSV header, shifts their error
+    line numbers by the lines of the chunks before them, and sums counts.
+    """
+
+    def __init__(self, target: TextIO, fmt: str, offset: int,
+                 stats: Optional[PredictorStats] = None):
+        self.target = target
+        self.has_header = fmt == "csv"
+        self.header_written = False
+        self.offset = offset
+        self.records = self.restricted = self.errors = 0
+        self.stats = stats
+
+    def add(self, chunk: _ChunkResult) -> bool:
+        """
+        Appends the output, counts and stats of the next chunk.
+        Returns:
+            bool: False, with nothing written, if the chunk split a CSV record.
+        """
+
+        if chunk.split_record:
+            return False
+        self.add_summary(chunk.summary)
+        if chunk.stats is not None:
+            self.stats.merge(chunk.stats)
+        output = chunk.output
+        if chunk.numbers:
+            parts = []
+            written = 0
+            for position, number in chunk.numbers:
+                parts += (output[written:position], str(number + self.offset))
+                written = position + 1
+            parts.append(output[written:])
+            output = "".join(parts)
+        self.offset += chunk.lines
+        if not output:
+            return True
+        if self.has_header and self.header_written:
+            output = output[output.index("\n") + 1:]
+        self.target.write(output)
+        self.header_written = True
+        return True
+
+    def add_summary(self, summary: BatchSummary):
+        """Adds the counts of records checked outside a chunk."""
+        self.records += summary.records
+        self.restricted += summary.restricted
+        self.errors += summary.errors
+
+    def summary(self) -> BatchSummary:
+        """Returns the counts of every chunk added so far."""
+        return BatchSummary(self.records, self.restricted, self.errors)
+
+
+class _HeaderSkipper:
+    """Passes writes on to a stream, dropping the first one, a CSV header, if asked to."""
+
+    def __init__(self, stream: TextIO, skip: bool):
+        self.stream = stream
+        self.skip = skip
+
+    def write(self, text: str):
+        """Writes text unless it is the header to skip."""
+        if self.skip:
+            self.skip = False
+            return
+        self.stream.write(text)
@@ -0,0 +1,4 @@
+"""
+Benchmarks package for the PicoPlaca system.
+Contains standalone scripts that measure the throughput of the hot paths.
+"""
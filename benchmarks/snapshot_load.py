@@ -0,0 +1,71 @@
+"""
+Snapshot Load Benchmark
+
+Measures how long it takes to get a ready-to-query rule set from a rule configuration
+file (parsed, and from its on-disk cache) and from a memory-mapped compiled snapshot.
+
+Usage:
+    python -m benchmarks.snapshot_load [--rules N] [--repeat N]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from core import PicoPlacaRuleSet
+from input.rule_config_loader import RuleConfigLoader
+
+
+def write_config(path: str, count: int, rng: random.Random):
+    """
+    Writes a single-region configuration with random minute-aligned rules.
+    Args:
+        path (str): The file to write.
+        count (int): Number of rules.
+        rng (random.Random): The random generator.
+    """
+
+    rules = []
+    for _ in range(count):
+        start = rng.randrange(24 * 60 - 1)
+        end = min(24 * 60 - 1, start + rng.randint(1, 120))
+        rules.append({"days": [rng.randrange(7)], "digits": rng.sample(range(10), 2),
+                      "windows": [[f"{start // 60:02d}:{start % 60:02d}",
+                                   f"{end // 60:02d}:{end % 60:02d}"]]})
+    with open(path, "w", encoding="utf-8") as config:
+        json.dump({"regions": {"bench": {"rules": rules}}}, config)
+
+
+def main():
+    """
+    Runs the benchmark and prints milliseconds per load, including a first lookup.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark rule-set cold start.")
+    parser.add_argument("--rules", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    moment = datetime(2023, 10, 2, 8, 0)
+    with tempfile.TemporaryDirectory() as directory:
+        config = os.path.join(directory, "rules.json")
+        snapshot = os.path.join(directory, "rules.snapshot")
+        write_config(config, args.rules, random.Random(7))
+        RuleConfigLoader.load(config).save_snapshot(snapshot)
+
+        loaders = (("parse + compile", lambda: RuleConfigLoader.load(config, use_cache=False)),
+                   ("config cache", lambda: RuleConfigLoader.load(config)),
+                   ("mmap snapshot", lambda: PicoPlacaRuleSet.load_snapshot(snapshot)))
+        print(f"{args.rules} rules")
+        for name, load in loaders:
+            began = time.perf_counter()
+            for _ in range(args.repeat):
+                load().compile().is_vehicle_restricted(moment, 1)
+            elapsed = (time.perf_counter() - began) / args.repeat * 1e3
+            print(f"{name:>16}: {elapsed:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Benchmark Suite
+
+Runs repeatable synthetic workloads over every hot path and saves the results as JSON,
+so that two runs can be compared and a slowdown beyond a threshold fails the run.
+
+Usage:
+    python -m benchmarks.suite [--quick] [--repeat N] [--output FILE]
+                               [--compare BASELINE] [--threshold FRACTION]
+
+Each benchmark reports seconds per operation, the best of --repeat runs. With --compare,
+every benchmark present in both runs is compared and the exit status is 1 if any of them
+is slower than the baseline by more than --threshold (0.10 = 10%).
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from batch import BatchProcessor
+from cli import setup_default_rules
+from core import FleetIndex, PicoPlacaPredictor
+from input import DateTimeParser, LicensePlateParser, TimeZoneConverter
+from input.record_reader import RecordReader
+from output import OutputFormatter
+from output.record_writer import RecordWriter
+from service.violation_watcher import ViolationWatcher
+from benchmarks.predict_many import make_triples
+from benchmarks.rule_set_scaling import make_rule_set
+
+# Bumped whenever the layout of the results file changes
+RESULTS_FORMAT = 1
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RULE_SET_SIZES = (10, 1_000, 100_000)
+
+
+def measure(run: Callable[[], int], repeat: int) -> float:
+    """
+    Times a workload several times and keeps the best run. As with timeit, the garbage
+    collector is paused while timing.
+    Args:
+        run (Callable[[], int]): Runs the workload once and returns its number of operations.
+        repeat (int): Number of runs.
+    Returns:
+        float: Seconds per operation of the fastest run.
+    """
+
+    best = float("inf")
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            began = time.perf_counter()
+            operations = run()
+            best = min(best, (time.perf_counter() - began) / operations)
+    finally:
+        if collecting:
+            gc.enable()
+    return best
+
+
+def run_suite(items: int, repeat: int) -> Dict[str, float]:
+    """
+    Runs every benchmark.
+    Args:
+        items (int): Number of operations per workload.
+        repeat (int): Number of runs per benchmark.
+    Returns:
+        Dict[str, float]: Seconds per operation, keyed by benchmark name.
+    """
+
+    rng = random.Random(1234)
+    triples = make_triples(items, invalid=0.05)
+    plates = [plate for plate, _, _ in triples]
+    moments = [(date, clock) for _, date, clock in triples]
+    results = {}
+
+    def each(function, values) -> Callable[[], int]:
+        def run():
+            for value in values:
+                function(value)
+            return len(values)
+        return run
+
+    def each_pair(function, pairs) -> Callable[[], int]:
+        def run():
+            for first, second in pairs:
+                function(first, second)
+            return len(pairs)
+        return run
+
+    results["license_plate_parser.try_parse"] = measure(
+        each(LicensePlateParser.try_parse_license_plate, plates), repeat)
+    results["date_time_parser.try_parse_datetime"] = measure(
+        each_pair(DateTimeParser.try_parse_datetime, moments), repeat)
+    results["date_time_parser.try_parse_minute_of_week"] = measure(
+        each_pair(DateTimeParser.try_parse_minute_of_week, moments), repeat)
+
+    converter = TimeZoneConverter.for_zone("America/Guayaquil")
+    epochs = [1696251600 + rng.randrange(7 * 24 * 3600) for _ in range(items)]
+    results["time_zone_converter.ordinal_minute"] = measure(
+        each(converter.ordinal_minute, epochs), repeat)
+
+    monday = datetime(2023, 10, 2)
+    probes = [(monday + timedelta(minutes=rng.randrange(7 * 24 * 60)), rng.randrange(10))
+              for _ in range(items)]
+    for size in RULE_SET_SIZES:
+        rule_set = make_rule_set(size, rng)
+        rule_set.is_vehicle_restricted(monday, 0)
+        results[f"is_vehicle_restricted.rules_{size}"] = measure(
+            each_pair(rule_set.is_vehicle_restricted, probes), repeat)
+
+    fleet = FleetIndex(setup_default_rules(), plates)
+    hours = [monday + timedelta(hours=hour) for hour in range(7 * 24)]
+
+    def fleet_bitmaps() -> int:
+        for _ in fleet.allowed_bitmaps(hours):
+            pass
+        return len(hours)
+    results["fleet_index.allowed_bitmap"] = measure(fleet_bitmaps, repeat)
+
+    predictor = PicoPlacaPredictor(setup_default_rules())
+
+    def predict_restriction() -> int:
+        for plate, date, clock in triples:
+            predictor.predict_restriction(plate, date, clock)
+        return len(triples)
+    results["predictor.predict_restriction"] = measure(predict_restriction, repeat)
+
+    def predict_many() -> int:
+        for _ in predictor.predict_many(triples):
+            pass
+        return len(triples)
+    results["predictor.predict_many"] = measure(predict_many, repeat)
+
+    plate_epochs = list(zip(plates, epochs))
+
+    def predict_many_epochs() -> int:
+        for _ in predictor.predict_many_epochs(plate_epochs, "America/Guayaquil"):
+            pass
+        return len(plate_epochs)
+    results["predictor.predict_many_epochs"] = measure(predict_many_epochs, repeat)
+
+    predictions = list(predictor.predict_many(triples))
+    for fmt in ("jsonl", "csv", "binary"):
+        def encode(fmt=fmt) -> int:
+            return OutputFormatter.write_results(predictions, io.BytesIO(), fmt)
+        results[f"output_formatter.{fmt}"] = measure(encode, repeat)
+
+    watcher = ViolationWatcher(predictor, "America/Guayaquil")
+    events = [json.dumps({"plate": plate, "ts": 1696240800 + index * 0.01, "speed": 30})
+              .encode("utf-8") for index, plate in enumerate(plates)]
+    batches = [events[start:start + 1000] for start in range(0, len(events), 1000)]
+
+    def watch() -> int:
+        for lines in batches:
+            watcher.process_lines(lines)
+        return len(events)
+    results["violation_watcher.process_lines"] = measure(watch, repeat)
+
+    source = "plate,date,time\n" + "".join(f"{plate},{date},{clock}\n"
+                                           for plate, date, clock in triples)
+    processor = BatchProcessor(predictor)
+
+    def batch() -> int:
+        summary = processor.process(RecordReader(io.StringIO(source), "csv"),
+                                    RecordWriter(io.StringIO(), "csv"))
+        return summary.records
+    results["batch_processor.csv"] = measure(batch, repeat)
+
+    def cold_start() -> int:
+        subprocess.run([sys.executable, os.path.join(ROOT, "cli.py"), "--plate", "ABC-1234",
+                        "--date", "2023-10-02", "--time", "08:00"],
+                       check=True, stdout=subprocess.DEVNULL, cwd=ROOT)
+        return 1
+    results["cli.cold_start"] = measure(cold_start, repeat)
+    return results
+
+
+def compare(baseline: Dict[str, float], current: Dict[str, float],
+            threshold: float) -> Tuple[List[Tuple[str, float, float, float]], List[str]]:
+    """
+    Compares two sets of results.
+    Args:
+        baseline (Dict[str, float]): Seconds per operation of the reference run.
+        current (Dict[str, float]): Seconds per operation of the new run.
+        threshold (float): Largest accepted slowdown, as a fraction of the baseline.
+    Returns:
+        Tuple[List[Tuple[str, float, float, float]], List[str]]: (name, baseline, current,
+            ratio) rows for the benchmarks present in both runs, and the names of those
+            slower than the baseline by more than the threshold.
+    """
+
+    rows = []
+    regressions = []
+    for name in sorted(set(baseline) & set(current)):
+        ratio = current[name] / baseline[name]
+        rows.append((name, baseline[name], current[name], ratio))
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def load_results(path: str) -> Dict[str, float]:
+    """
+    Reads the benchmark results saved by a previous run.
+    Args:
+        path (str): The results file.
+    Returns:
+        Dict[str, float]: Seconds per operation, keyed by benchmark name.
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If the file is not a results file of this format.
+    """
+
+    with open(path, encoding="utf-8") as source:
+        document = json.load(source)
+    if not isinstance(document, dict) or document.get("format") != RESULTS_FORMAT:
+        raise ValueError(f"{path} is not a benchmark results file of format {RESULTS_FORMAT}")
+    return document["results"]
+
+
+def main():
+    """
+    Runs the suite, prints and saves the results, and compares them with a baseline.
+    """
+    parser = argparse.ArgumentParser(description="Run every PicoPlaca benchmark.")
+    parser.add_argument("--quick", action="store_true",
+                        help="use small workloads, for smoke-testing the suite")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", metavar="FILE", help="save the results as JSON")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="compare with the results saved by an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="largest accepted slowdown against the baseline")
+    args = parser.parse_args()
+
+    baseline = load_results(args.compare) if args.compare else None
+    results = run_suite(2_000 if args.quick else 50_000, 1 if args.quick else args.repeat)
+    for name, seconds in results.items():
+        print(f"{name:45} {seconds * 1e6:12.3f} us/op")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as target:
+            json.dump({"format": RESULTS_FORMAT,
+                       "created": datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(),
+                       "machine": platform.machine(),
+                       "results": results}, target, indent=2)
+            target.write("\n")
+
+    if baseline is not None:
+        rows, regressions = compare(baseline, results, args.threshold)
+        print()
+        print(f"{'benchmark':45} {'baseline':>12} {'current':>12} {'change':>8}")
+        for name, before, after, ratio in rows:
+            flag = "  REGRESSION" if name in regressions else ""
+            print(f"{name:45} {before * 1e6:12.3f} {after * 1e6:12.3f} "
+                  f"{ratio - 1:+8.1%}{flag}")
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than the baseline by more than "
+                  f"{args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Vectorized Engine Benchmark
+
+Measures VectorizedEngine throughput on synthetic columnar data and checks a sample of
+rows against the scalar reference engine.
+
+Usage:
+    python -m benchmarks.vectorized [--rows N]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from cli import setup_default_rules
+from core import VectorizedEngine
+
+
+def main():
+    """
+    Runs the benchmark and prints rows per second.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized engine.")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1234)
+    digits = rng.integers(0, 10, args.rows, dtype=np.uint8)
+    start = np.datetime64("2023-01-01T00:00", "s")
+    timestamps = start + rng.integers(0, 365 * 86400, args.rows).astype("timedelta64[s]")
+
+    rule_set = setup_default_rules()
+    engine = VectorizedEngine(rule_set)
+    engine.is_restricted(digits[:1000], timestamps[:1000])
+
+    began = time.perf_counter()
+    mask = engine.is_restricted(digits, timestamps)
+    elapsed = time.perf_counter() - began
+
+    for row in range(0, args.rows, max(1, args.rows // 1000)):
+        moment = timestamps[row].astype("datetime64[us]").item()
+        assert mask[row] == rule_set.is_vehicle_restricted(moment, int(digits[row]))
+
+    print(f"{args.rows / elapsed / 1e6:.1f} M rows/s ({elapsed * 1e3:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,31 @@ Command-line interface for checking vehicle circulation restrictions under Pico
 """
 import argparse
 import datetime
+import os
+import sys
 from datetime import time
+from typing import TYPE_CHECKING
 
 from core.pico_placa_rule import PicoPlacaRule
 from core.pico_placa_rule_set import PicoPlacaRuleSet
-from core.pico_placa_predictor import PicoPlacaPredictor
+
+# input.record_reader.FORMATS, spelled out so that parsing arguments does not import the
+# record reader and its csv and json dependencies
+FORMATS = ('csv', 'jsonl')
+
+# Everything else is imported by the mode that needs it, so that a single check or
+# --help does not pay for the batch, service and configuration modules
+if TYPE_CHECKING:
+    from core.pico_placa_predictor import PicoPlacaPredictor
+
+
+class _HelpFormatter(argparse.ArgumentDefaultsHelpFormatter):
+    """Shows option defaults, except those that are None or resolved at run time."""
+
+    def _get_help_string(self, action):
+        if action.default is None:
+            return action.help
+        return super()._get_help_string(action)
 
 
 def setup_default_rules() -> PicoPlacaRuleSet:
@@ -72,28 +92,377 @@ def parse_arguments():
     parser = argparse.ArgumentParser(
         description='Check if a vehicle is restricted from circulation'+
         'according to Pico y Placa rules.',
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+        formatter_class=_HelpFormatter
     )
 
     parser.add_argument(
         '-p', '--plate', 
-        required=True,
-        help='The license plate number in format XXX-#### or XXX-###'
+        help='The license plate number in format XXX-#### or XXX-### '
+        '(required unless --input is given)'
     )
 
     parser.add_argument(
         '-d', '--date',
-        default=datetime.date.today().isoformat(),
         help='The date to check in format YYYY-MM-DD (defaults to today)'
     )
 
     parser.add_argument(
         '-t', '--time',
-        default=datetime.datetime.now().strftime('%H:%M'),
         help='The time to check in format HH:MM (defaults to current time)'
     )
 
-    return parser.parse_args()
+    search = parser.add_mutually_exclusive_group()
+    search.add_argument(
+        '--next-unrestricted',
+        action='store_true',
+        help='Show when the vehicle may circulate, starting from --date and --time'
+    )
+    search.add_argument(
+        '--next-restricted',
+        action='store_true',
+        help='Show when the vehicle is next restricted, starting from --date and --time'
+    )
+
+    search.add_argument(
+        '--calendar',
+        nargs=2,
+        metavar=('START', 'END'),
+        help='List every restricted interval of the vehicle between two dates '
+        '(YYYY-MM-DD, inclusive), written to --output in --format'
+    )
+
+    parser.add_argument(
+        '-i', '--input',
+        metavar='FILE',
+        help="Check every record of a CSV or JSON-lines file ('-' for standard input) "
+        "with plate, date and time columns"
+    )
+
+    parser.add_argument(
+        '-o', '--output',
+        metavar='FILE',
+        default='-',
+        help="Where to write batch results or the --calendar ('-' for standard output)"
+    )
+
+    parser.add_argument(
+        '-f', '--format',
+        choices=FORMATS + ('binary',),
+        help='Record format for --input, --output and --calendar (defaults to the input '
+        'file extension, or csv); with a single check, prints a machine-readable result '
+        'with the verdict, error code and matched rule instead of a sentence, or with '
+        'binary, one status byte'
+    )
+
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=1,
+        help='Number of worker processes for --input files (0 uses every CPU core)'
+    )
+
+    parser.add_argument(
+        '--rules',
+        metavar='FILE',
+        help='Load the rules from a JSON or TOML configuration file instead of the '
+        'built-in Quito schedule'
+    )
+
+    parser.add_argument(
+        '--region',
+        metavar='NAME',
+        help="The region of the --rules file to use (defaults to its 'default_region')"
+    )
+
+    parser.add_argument(
+        '--snapshot',
+        metavar='FILE',
+        help='Load the rules from a compiled snapshot written by the snapshot command; '
+        'the snapshot is memory-mapped, so startup does not depend on the number of rules'
+    )
+
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='Time every prediction stage and count errors by type; a summary is printed '
+        'to standard error at exit, and serve also exposes it on GET /metrics'
+    )
+
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+    serve_parser = subparsers.add_parser(
+        'serve',
+        help='Run an HTTP service that answers restriction checks',
+        description='Run an HTTP service answering GET /check?plate=&date=&time= and '
+        'batched POST /check requests with a JSON array of checks.',
+        formatter_class=_HelpFormatter
+    )
+    serve_parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='The interface to listen on'
+    )
+    serve_parser.add_argument(
+        '--port',
+        type=int,
+        default=8080,
+        help='The TCP port to listen on'
+    )
+
+    watch_parser = subparsers.add_parser(
+        'watch',
+        help='Alert when moving vehicles enter their restricted window',
+        description='Read position events as JSON lines such as {"plate": "ABC-1234", '
+        '"ts": 1696251600, "speed": 32.5}, with ts in UTC epoch seconds, and write a '
+        'violation alert to --output each time a moving vehicle enters its restricted '
+        'window.',
+        formatter_class=_HelpFormatter
+    )
+    watch_parser.add_argument(
+        '--socket',
+        metavar='PATH',
+        help='Listen for events on a Unix socket instead of reading standard input'
+    )
+    watch_parser.add_argument(
+        '--zone',
+        default='America/Guayaquil',
+        help='The time zone the rules apply in'
+    )
+    watch_parser.add_argument(
+        '--idle-timeout',
+        type=float,
+        default=900.0,
+        help='Seconds without events after which a vehicle is forgotten'
+    )
+    watch_parser.add_argument(
+        '--max-clock-skew',
+        type=float,
+        default=300.0,
+        help='Seconds an event may be stamped ahead of the system clock before it is '
+        'rejected'
+    )
+    watch_parser.add_argument(
+        '--queue-size',
+        type=int,
+        default=64,
+        help='Event batches buffered before reading pauses'
+    )
+    watch_parser.add_argument(
+        '--metrics-port',
+        type=int,
+        help='Serve the watch counters on GET /metrics at this port on 127.0.0.1'
+    )
+
+    snapshot_parser = subparsers.add_parser(
+        'snapshot',
+        help='Compile the rules into a binary snapshot file',
+        description='Compile the built-in rules, or those selected with --rules and --region, '
+        'into a snapshot file that --snapshot loads by memory-mapping it.'
+    )
+    snapshot_parser.add_argument(
+        'path',
+        metavar='FILE',
+        help='The snapshot file to write'
+    )
+
+    args = parser.parse_args()
+    if args.region is not None and args.rules is None:
+        parser.error('--region needs a --rules file')
+    if args.snapshot is not None and args.rules is not None:
+        parser.error('--snapshot and --rules cannot be combined')
+    if args.command == 'watch' and args.queue_size < 1:
+        parser.error('--queue-size must be at least 1')
+    if args.command is not None:
+        return args
+    if args.format == 'binary' and (args.input is not None or args.calendar is not None):
+        parser.error('--format binary is only supported for single checks')
+    if args.input is None and args.plate is None:
+        parser.error('one of the arguments -p/--plate or -i/--input is required')
+    if args.workers < 0:
+        parser.error('--workers must not be negative')
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+    if args.workers > 1 and args.input == '-':
+        parser.error('--workers needs a seekable --input file, not standard input')
+    # The clock is only read when a check actually uses it
+    if args.date is None or args.time is None:
+        now = datetime.datetime.now()
+        if args.date is None:
+            args.date = now.date().isoformat()
+        if args.time is None:
+            args.time = now.strftime('%H:%M')
+    return args
+
+
+def open_stream(path: str, mode: str):
+    """
+    Opens a file for batch processing, mapping '-' to standard input or output.
+    
+    Args:
+        path (str): The file path, or '-'.
+        mode (str): 'r' or 'w'.
+    
+    Returns:
+        TextIO: The opened text stream.
+    """
+    if path == '-':
+        return sys.stdin if mode == 'r' else sys.stdout
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def run_batch(args, predictor: "PicoPlacaPredictor"):
+    """
+    Checks every record of the --input file and writes the results to --output.
+    
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+        predictor (PicoPlacaPredictor): The predictor used to check each record.
+    """
+    from batch import BatchProcessor, ParallelBatchProcessor
+    from input.record_reader import RecordReader
+    from output.record_writer import RecordWriter
+
+    fmt = args.format or RecordReader.detect_format(args.input)
+    target = open_stream(args.output, 'w')
+    try:
+        if args.workers > 1:
+            ParallelBatchProcessor(predictor.rule_set, args.workers,
+                                   stats=predictor.stats).process(args.input, fmt, target)
+            return
+        source = open_stream(args.input, 'r')
+        try:
+            BatchProcessor(predictor).process(RecordReader(source, fmt),
+                                              RecordWriter(target, fmt))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+    finally:
+        if target is not sys.stdout:
+            target.close()
+        else:
+            target.flush()
+
+
+def run_calendar(args, rule_set: PicoPlacaRuleSet):
+    """
+    Streams the restricted intervals of --plate between the two --calendar dates.
+    
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+        rule_set (PicoPlacaRuleSet): The rule set to expand.
+    """
+    from input import DateTimeParser, LicensePlateParser
+    from output.interval_writer import IntervalWriter
+
+    try:
+        last_digit = LicensePlateParser.parse_license_plate(args.plate)
+        start_date, end_date = (DateTimeParser.parse_date(value) for value in args.calendar)
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        return
+    target = open_stream(args.output, 'w')
+    try:
+        writer = IntervalWriter(target, args.format or 'csv')
+        for start, end in rule_set.restriction_calendar(last_digit, start_date, end_date):
+            writer.write(args.plate, start, end)
+    finally:
+        if target is not sys.stdout:
+            target.close()
+        else:
+            target.flush()
+
+
+def run_server(args, predictor: "PicoPlacaPredictor"):
+    """
+    Runs the HTTP service until interrupted.
+    
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+        predictor (PicoPlacaPredictor): The predictor shared by every request.
+    """
+    import asyncio
+    from service import PicoPlacaHttpServer
+
+    server = PicoPlacaHttpServer(predictor, args.host, args.port)
+    print(f"Serving Pico y Placa checks on http://{args.host}:{args.port}/check",
+          file=sys.stderr)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+def run_watch(args, predictor: "PicoPlacaPredictor"):
+    """
+    Runs the violation watcher until its input ends or it is interrupted.
+    
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+        predictor (PicoPlacaPredictor): The predictor evaluating the events.
+    """
+    import asyncio
+    from zoneinfo import ZoneInfoNotFoundError
+    from input.time_zone_converter import TimeZoneConverter
+    from service import PicoPlacaHttpServer, ViolationWatcher
+
+    try:
+        TimeZoneConverter.for_zone(args.zone)
+    except (ZoneInfoNotFoundError, ValueError):
+        print(f"Error: unknown time zone '{args.zone}'", file=sys.stderr)
+        sys.exit(2)
+    watcher = ViolationWatcher(predictor, args.zone, args.idle_timeout, args.queue_size,
+                               args.max_clock_skew)
+
+    async def watch(target):
+        server = None
+        if args.metrics_port is not None:
+            server = PicoPlacaHttpServer(predictor, '127.0.0.1', args.metrics_port,
+                                         watcher.to_prometheus)
+            await server.start()
+        try:
+            if args.socket is not None:
+                await watcher.serve_socket(args.socket, target)
+            else:
+                await watcher.run_stream(sys.stdin.buffer, target)
+        finally:
+            if server is not None:
+                server.close()
+
+    try:
+        target = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    except OSError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(2)
+    try:
+        asyncio.run(watch(target))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if target is not sys.stdout.buffer:
+            target.close()
+        if args.stats:
+            print(watcher.summary(), file=sys.stderr)
+
+
+def load_rule_set(args) -> PicoPlacaRuleSet:
+    """
+    Loads the rule set selected on the command line, exiting with status 2 on failure.
+    
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+    
+    Returns:
+        PicoPlacaRuleSet: The snapshot, the --rules region, or the built-in rules.
+    """
+    try:
+        if args.snapshot is not None:
+            return PicoPlacaRuleSet.load_snapshot(args.snapshot)
+        if args.rules is not None:
+            from input.rule_config_loader import RuleConfigLoader
+            return RuleConfigLoader.load(args.rules, args.region)
+        return setup_default_rules()
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(2)
 
 
 def main():
@@ -102,14 +471,69 @@ def main():
     """
     args = parse_arguments()
 
-    # Set up the rules
-    rule_set = setup_default_rules()
+    # The rules are only set up once the arguments are known to be valid
+    rule_set = load_rule_set(args)
+
+    if args.command == 'snapshot':
+        try:
+            rule_set.save_snapshot(args.path)
+        except (OSError, ValueError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(2)
+        return
 
     # Create the predictor
-    predictor = PicoPlacaPredictor(rule_set)
+    from core.pico_placa_predictor import PicoPlacaPredictor
+    from core.predictor_stats import PredictorStats
+
+    predictor = PicoPlacaPredictor(rule_set, PredictorStats() if args.stats else None)
+    try:
+        run_predictor(args, predictor, rule_set)
+    finally:
+        # watch reports the predictor stats as part of its own summary
+        if predictor.stats is not None and args.command != 'watch':
+            print(predictor.stats.summary(), file=sys.stderr)
+
+
+def run_predictor(args, predictor: "PicoPlacaPredictor", rule_set: PicoPlacaRuleSet):
+    """
+    Runs the mode selected on the command line.
+    
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+        predictor (PicoPlacaPredictor): The predictor.
+        rule_set (PicoPlacaRuleSet): The rule set the predictor was built with.
+    """
+    if args.command == 'serve':
+        run_server(args, predictor)
+        return
+
+    if args.command == 'watch':
+        run_watch(args, predictor)
+        return
+
+    if args.input is not None:
+        run_batch(args, predictor)
+        return
+
+    if args.calendar is not None:
+        run_calendar(args, rule_set)
+        return
 
     # Predict restriction
-    result = predictor.predict_restriction(args.plate, args.date, args.time)
+    if args.format is not None and not (args.next_unrestricted or args.next_restricted):
+        from output import OutputFormatter
+
+        result = predictor.evaluate(args.plate, args.date, args.time)
+        OutputFormatter.write_results([result], sys.stdout.buffer, args.format)
+        sys.stdout.buffer.flush()
+        return
+    if args.next_unrestricted:
+        result = predictor.predict_next_unrestricted(args.plate, args.date, args.time)
+    elif args.next_restricted:
+        result = predictor.predict_next_restricted(args.plate, args.date, args.time)
+    else:
+        result = predictor.predict_restriction(args.plate, args.date, args.time)
 
     # Display the result
     print(result)
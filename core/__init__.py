@@ -2,8 +2,53 @@
 Core package for the PicoPlaca system.
 Contains the main logic for predicting vehicle circulation restrictions.
 """
-from .pico_placa_rule import PicoPlacaRule
-from .pico_placa_rule_set import PicoPlacaRuleSet, NoRulesDefinedError
-from .pico_placa_predictor import PicoPlacaPredictor
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ["PicoPlacaRule", "PicoPlacaRuleSet", "NoRulesDefinedError"]
+if TYPE_CHECKING:
+    from .pico_placa_rule import PicoPlacaRule
+    from .pico_placa_rule_set import PicoPlacaRuleSet, NoRulesDefinedError
+    from .pico_placa_schedule import PicoPlacaSchedule
+    from .pico_placa_predictor import PicoPlacaPredictor
+    from .compiled_rule_table import CompiledRuleTable
+    from .prediction_result import PredictionResult
+    from .vectorized_engine import VectorizedEngine
+    from .trip_checker import TripChecker, TripResult
+    from .exception_calendar import ExceptionCalendar
+    from .fleet_index import FleetIndex
+
+# Exports are imported on first access, so importing the package stays cheap and
+# only the modules a caller actually uses are loaded
+_EXPORTS = {
+    "PicoPlacaRule": ".pico_placa_rule",
+    "PicoPlacaRuleSet": ".pico_placa_rule_set",
+    "NoRulesDefinedError": ".pico_placa_rule_set",
+    "PicoPlacaSchedule": ".pico_placa_schedule",
+    "PicoPlacaPredictor": ".pico_placa_predictor",
+    "CompiledRuleTable": ".compiled_rule_table",
+    "PredictionResult": ".prediction_result",
+    "VectorizedEngine": ".vectorized_engine",
+    "TripChecker": ".trip_checker",
+    "TripResult": ".trip_checker",
+    "ExceptionCalendar": ".exception_calendar",
+    "FleetIndex": ".fleet_index",
+}
+
+__all__ = ["PicoPlacaRule", "PicoPlacaRuleSet", "NoRulesDefinedError", "CompiledRuleTable",
+           "PredictionResult", "VectorizedEngine", "TripChecker", "TripResult",
+           "ExceptionCalendar", "PicoPlacaSchedule", "PicoPlacaPredictor", "FleetIndex"]
+
+
+def __getattr__(name: str):
+    """Imports an export on first access."""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """Lists the exports alongside the names already loaded."""
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,309 @@
+"""
+Compiled Rule Table Module
+
+Flattens a rule set into a dense, immutable lookup table indexed by license plate digit
+and minute of the week, so that every restriction check is a single table access.
+"""
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from datetime import datetime, time
+from typing import Dict, List, Optional, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+DIGITS = 10
+
+# Snapshot header: magic, format version, flags, table length and number of exception
+# records (little-endian); each record is a date ordinal and its effective weekday
+SNAPSHOT_MAGIC = b"PPRT"
+SNAPSHOT_VERSION = 2
+_SNAPSHOT_HEADER = struct.Struct("<4sHHII")
+_SNAPSHOT_EXCEPTION = struct.Struct("<Ib")
+_FLAG_HAS_RULES = 1
+
+
+def minute_of_week(datetime_input: datetime) -> int:
+    """
+    Computes the minute of the week for a datetime.
+    Args:
+        datetime_input (datetime): The date and time to convert.
+    Returns:
+        int: Minutes elapsed since Monday 00:00 (0 to MINUTES_PER_WEEK - 1).
+    """
+
+    return (datetime_input.weekday() * MINUTES_PER_DAY
+            + datetime_input.hour * 60 + datetime_input.minute)
+
+
+def minute_of_day(value: time) -> int:
+    """
+    Converts a minute-aligned time of day into minutes since midnight.
+    Args:
+        value (time): The time to convert.
+    Returns:
+        int: Minutes elapsed since 00:00.
+    Raises:
+        ValueError: If the time has a seconds or microseconds component, which cannot be
+                    represented in a minute-resolution table.
+    """
+
+    if value.second or value.microsecond:
+        raise ValueError(
+            f"Rule boundary {value.isoformat()} is not aligned to a whole minute "
+            "and cannot be compiled."
+        )
+    return value.hour * 60 + value.minute
+
+
+class CompiledRuleTable:
+    """
+    An immutable, minute-resolution snapshot of a PicoPlacaRuleSet.
+    The table stores one byte per (digit, minute of week) pair: 1 when a vehicle ending
+    in that digit is restricted during that minute, 0 otherwise. Lookups are a single
+    index into the table regardless of how many rules were compiled into it.
+    A table can be saved as a binary snapshot file and loaded back by memory-mapping it,
+    in which case lookups read straight from the mapped pages and every process mapping
+    the same file shares one copy through the page cache.
+    Attributes:
+        table (bytes): DIGITS * MINUTES_PER_WEEK flags laid out digit-major; a read-only
+                       memoryview when the table was loaded from a snapshot.
+        has_rules (bool): Whether the source rule set had any rules defined.
+        source (Optional[str]): The snapshot file the table is mapped from, if any.
+        overrides (Dict[int, int]): Exception dates stored with the table in its snapshot,
+                                    as date ordinals mapped to effective weekdays. The
+                                    table's own lookups do not apply them.
+    Methods:
+        from_rules(rules_by_day): Builds a table from a rule set's per-day rule lists.
+        save_snapshot(path, overrides): Writes the table to a versioned binary snapshot file.
+        load_snapshot(path): Memory-maps a table from a snapshot file.
+        is_restricted_at(minute, digit): Checks a minute of week for a digit.
+        is_vehicle_restricted(datetime, digit): Checks a datetime for a digit.
+        restricted_intervals(digit): Returns the sorted restricted intervals of a digit.
+        minutes_until_unrestricted(minute, digit): Minutes until a digit may circulate.
+        minutes_until_restricted(minute, digit): Minutes until a digit is restricted.
+    """
+
+    __slots__ = ("table", "has_rules", "source", "overrides", "_intervals")
+
+    table: bytes
+    has_rules: bool
+    source: Optional[str]
+    overrides: Dict[int, int]
+
+    def __init__(self, table: bytes, has_rules: bool, source: Optional[str] = None,
+                 overrides: Optional[Dict[int, int]] = None):
+        if len(table) != DIGITS * MINUTES_PER_WEEK:
+            raise ValueError(
+                f"Compiled table must hold {DIGITS * MINUTES_PER_WEEK} entries, "
+                f"got {len(table)}."
+            )
+        self.table = table
+        self.has_rules = has_rules
+        self.source = source
+        self.overrides = overrides or {}
+        self._intervals = {}
+
+    def __reduce__(self):
+        # Mapped tables are sent to other processes as their path, so that they map the
+        # same file instead of receiving a copy
+        if self.source is not None:
+            return CompiledRuleTable.load_snapshot, (self.source,)
+        return CompiledRuleTable, (bytes(self.table), self.has_rules, None, self.overrides)
+
+    @classmethod
+    def from_rules(cls, rules_by_day: dict) -> "CompiledRuleTable":
+        """
+        Compiles per-day rule lists into a lookup table.
+        Args:
+            rules_by_day (dict): A mapping of weekday (0-6) to the PicoPlacaRule objects
+                                 that apply on that day.
+        Returns:
+            CompiledRuleTable: The compiled table.
+        Raises:
+            ValueError: If a rule boundary is not aligned to a whole minute.
+        """
+
+        table = bytearray(DIGITS * MINUTES_PER_WEEK)
+        has_rules = False
+        for day, rules in rules_by_day.items():
+            for rule in rules:
+                has_rules = True
+                start = minute_of_day(rule.start_time)
+                end = minute_of_day(rule.end_time)
+                if end <= start:
+                    continue
+                for digit in rule.restricted_digits:
+                    offset = digit * MINUTES_PER_WEEK + day * MINUTES_PER_DAY
+                    table[offset + start:offset + end] = b"\x01" * (end - start)
+        return cls(bytes(table), has_rules)
+
+    def save_snapshot(self, path: str, overrides: Optional[Dict[int, int]] = None):
+        """
+        Writes the table to a binary snapshot file.
+        The file is a fixed header (magic, format version, flags, table length and number
+        of exception records) followed by the raw table and the exception records. It is
+        written to a temporary file and renamed into place, so processes that have the
+        previous version mapped keep reading it intact.
+        Args:
+            path (str): The snapshot file to write.
+            overrides (Optional[Dict[int, int]]): Exception dates to store with the table,
+                                                  as date ordinals mapped to effective
+                                                  weekdays. Defaults to the table's own.
+        Raises:
+            OSError: If the file cannot be written.
+        """
+
+        if overrides is None:
+            overrides = self.overrides
+        header = _SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                                       _FLAG_HAS_RULES if self.has_rules else 0,
+                                       len(self.table), len(overrides))
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as snapshot:
+                snapshot.write(header)
+                snapshot.write(self.table)
+                for ordinal, weekday in sorted(overrides.items()):
+                    snapshot.write(_SNAPSHOT_EXCEPTION.pack(ordinal, weekday))
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> "CompiledRuleTable":
+        """
+        Memory-maps a table from a snapshot file written by save_snapshot.
+        Only the header and the exception records are parsed; the table itself is used in
+        place from the mapping.
+        Args:
+            path (str): The snapshot file.
+        Returns:
+            CompiledRuleTable: The mapped table.
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If the file is not a snapshot, or was written by an incompatible
+                        version.
+        """
+
+        with open(path, "rb") as snapshot:
+            size = os.fstat(snapshot.fileno()).st_size
+            if size < _SNAPSHOT_HEADER.size:
+                raise ValueError(f"{path} is not a rule table snapshot.")
+            mapping = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, length, count = _SNAPSHOT_HEADER.unpack_from(mapping)
+        if magic != SNAPSHOT_MAGIC:
+            mapping.close()
+            raise ValueError(f"{path} is not a rule table snapshot.")
+        if version != SNAPSHOT_VERSION:
+            mapping.close()
+            raise ValueError(
+                f"{path} is a version {version} snapshot; this build reads version "
+                f"{SNAPSHOT_VERSION}. Export the snapshot again."
+            )
+        table_end = _SNAPSHOT_HEADER.size + length
+        if size != table_end + count * _SNAPSHOT_EXCEPTION.size:
+            mapping.close()
+            raise ValueError(f"{path} is truncated or has trailing data.")
+        overrides = dict(_SNAPSHOT_EXCEPTION.iter_unpack(mapping[table_end:]))
+        table = memoryview(mapping)[_SNAPSHOT_HEADER.size:table_end]
+        return cls(table, bool(flags & _FLAG_HAS_RULES), os.path.abspath(path), overrides)
+
+    def is_restricted_at(self, minute: int, digit: int) -> bool:
+        """
+        Checks whether a digit is restricted during a given minute of the week.
+        Args:
+            minute (int): Minute of the week (0 = Monday 00:00).
+            digit (int): The last digit of the vehicle's license plate.
+        Returns:
+            bool: True if the vehicle is restricted, False otherwise.
+        """
+
+        return self.table[digit * MINUTES_PER_WEEK + minute] == 1
+
+    def is_vehicle_restricted(self, datetime_input: datetime, digit: int) -> bool:
+        """
+        Checks whether a digit is restricted at a given datetime.
+        Args:
+            datetime_input (datetime): The date and time to check.
+            digit (int): The last digit of the vehicle's license plate.
+        Returns:
+            bool: True if the vehicle is restricted, False otherwise.
+        """
+
+        return self.table[digit * MINUTES_PER_WEEK + minute_of_week(datetime_input)] == 1
+
+    def restricted_intervals(self, digit: int) -> List[Tuple[int, int]]:
+        """
+        Returns the merged restricted intervals of a digit over one week.
+        The index is derived from the table on first use and cached.
+        Args:
+            digit (int): The last digit of the vehicle's license plate.
+        Returns:
+            List[Tuple[int, int]]: Sorted, disjoint, non-adjacent (start, end) minute-of-week
+                                   intervals; start is inclusive and end exclusive.
+        """
+
+        intervals = self._intervals.get(digit)
+        if intervals is None:
+            row = bytes(self.table[digit * MINUTES_PER_WEEK:(digit + 1) * MINUTES_PER_WEEK])
+            intervals = []
+            start = row.find(1)
+            while start != -1:
+                end = row.find(0, start)
+                if end == -1:
+                    end = MINUTES_PER_WEEK
+                intervals.append((start, end))
+                start = row.find(1, end)
+            self._intervals[digit] = intervals
+        return intervals
+
+    def minutes_until_unrestricted(self, minute: int, digit: int) -> Optional[int]:
+        """
+        Finds how long a digit stays restricted from a given minute of the week.
+        Args:
+            minute (int): Minute of the week (0 = Monday 00:00).
+            digit (int): The last digit of the vehicle's license plate.
+        Returns:
+            Optional[int]: Minutes until the first unrestricted minute (0 if the minute
+                           itself is unrestricted), or None if the digit is always restricted.
+        """
+
+        intervals = self.restricted_intervals(digit)
+        index = bisect_right(intervals, (minute, MINUTES_PER_WEEK)) - 1
+        if index < 0 or intervals[index][1] <= minute:
+            return 0
+        end = intervals[index][1]
+        if end < MINUTES_PER_WEEK:
+            return end - minute
+        # The interval runs into next Monday, where it may continue
+        first_start, first_end = intervals[0]
+        if first_start != 0:
+            return end - minute
+        if first_end == MINUTES_PER_WEEK:
+            return None
+        return end - minute + first_end
+
+    def minutes_until_restricted(self, minute: int, digit: int) -> Optional[int]:
+        """
+        Finds how long a digit stays unrestricted from a given minute of the week.
+        Args:
+            minute (int): Minute of the week (0 = Monday 00:00).
+            digit (int): The last digit of the vehicle's license plate.
+        Returns:
+            Optional[int]: Minutes until the first restricted minute (0 if the minute
+                           itself is restricted), or None if the digit is never restricted.
+        """
+
+        intervals = self.restricted_intervals(digit)
+        if not intervals:
+            return None
+        index = bisect_right(intervals, (minute, MINUTES_PER_WEEK))
+        if index > 0 and intervals[index - 1][1] > minute:
+            return 0
+        if index < len(intervals):
+            return intervals[index][0] - minute
+        return MINUTES_PER_WEEK - minute + intervals[0][0]
@@ -0,0 +1,199 @@
+"""
+Exception Calendar Module
+
+Records the dates on which the weekly Pico y Placa schedule does not apply as usual:
+holidays on which restrictions are lifted, and dates that a decree restricts following
+the schedule of another weekday.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from .compiled_rule_table import MINUTES_PER_DAY
+
+# Effective weekday of a date on which every restriction is lifted
+LIFTED = -1
+
+
+class ExceptionCalendar:
+    """
+    Overrides the weekday used to evaluate specific dates.
+    Every exception is stored under the date's proleptic Gregorian ordinal, mapped to the
+    weekday whose rules apply on that date, or LIFTED. Looking a date up is therefore a
+    single dict access, whatever the number of exceptions.
+    Attributes:
+        overrides (Mapping[int, int]): A read-only view of the date ordinals mapped to the
+                                       weekday (0-6) whose rules apply on that date, or
+                                       LIFTED. Exceptions are changed through lift,
+                                       restrict_as and remove, which keep the sorted
+                                       ordinals in step.
+    Methods:
+        from_overrides(overrides): Builds a calendar from ordinals mapped to weekdays.
+        lift(day): Lifts every restriction on a date.
+        restrict_as(day, weekday): Applies the rules of another weekday on a date.
+        remove(day): Restores the normal schedule on a date.
+        weekday_of(day): Returns the weekday whose rules apply on a date, or LIFTED.
+        minute_of_week(datetime): Returns the effective minute of the week, or LIFTED.
+        exceptions_between(first, last): Lists the exceptions within a range of dates.
+        next_date(day): Returns the first date with an exception on or after a date.
+        last_date(): Returns the latest date with an exception.
+    """
+
+    __slots__ = ("_overrides", "_ordinals")
+
+    _overrides: Dict[int, int]
+
+    def __init__(self, lifted: Iterable[date] = (),
+                 restricted_as: Optional[Dict[date, int]] = None):
+        self._overrides = {}
+        self._ordinals = None
+        for day in lifted:
+            self.lift(day)
+        for day, weekday in (restricted_as or {}).items():
+            self.restrict_as(day, weekday)
+
+    @classmethod
+    def from_overrides(cls, overrides: Mapping[int, int]) -> "ExceptionCalendar":
+        """
+        Builds a calendar from date ordinals mapped to weekdays, as in overrides.
+        Args:
+            overrides (Mapping[int, int]): Date ordinals mapped to a weekday (0-6) or LIFTED.
+        Returns:
+            ExceptionCalendar: The calendar.
+        Raises:
+            ValueError: If an ordinal is not positive or a weekday is out of range.
+        """
+
+        calendar = cls()
+        for ordinal, weekday in overrides.items():
+            if ordinal < 1 or not LIFTED <= weekday <= 6:
+                raise ValueError(f"Invalid exception: ordinal {ordinal}, weekday {weekday}.")
+            calendar._overrides[ordinal] = weekday
+        return calendar
+
+    @property
+    def overrides(self) -> Mapping[int, int]:
+        """
+        The exceptions, as a read-only view of date ordinals mapped to weekdays.
+        """
+
+        return MappingProxyType(self._overrides)
+
+    def __len__(self) -> int:
+        return len(self._overrides)
+
+    def __contains__(self, day: date) -> bool:
+        return day.toordinal() in self._overrides
+
+    def __iter__(self) -> Iterator[Tuple[date, int]]:
+        return iter([(date.fromordinal(ordinal), self._overrides[ordinal])
+                     for ordinal in self._sorted_ordinals()])
+
+    def lift(self, day: date):
+        """
+        Lifts every restriction on a date, e.g. a national holiday.
+        Args:
+            day (date): The date.
+        """
+
+        self._overrides[day.toordinal()] = LIFTED
+        self._ordinals = None
+
+    def restrict_as(self, day: date, weekday: int):
+        """
+        Applies the rules of another weekday on a date, e.g. a Saturday that a decree
+        restricts like a Monday.
+        Args:
+            day (date): The date.
+            weekday (int): The weekday whose rules apply (0 = Monday, 6 = Sunday).
+        Raises:
+            ValueError: If the weekday is not between 0 and 6.
+        """
+
+        if not 0 <= weekday <= 6:
+            raise ValueError(f"Weekday must be between 0 and 6, got {weekday}.")
+        self._overrides[day.toordinal()] = weekday
+        self._ordinals = None
+
+    def remove(self, day: date):
+        """
+        Restores the normal schedule on a date.
+        Args:
+            day (date): The date.
+        Raises:
+            KeyError: If the date has no exception.
+        """
+
+        del self._overrides[day.toordinal()]
+        self._ordinals = None
+
+    def weekday_of(self, day: date) -> int:
+        """
+        Returns the weekday whose rules apply on a date.
+        Args:
+            day (date): The date (a datetime is also accepted).
+        Returns:
+            int: The date's own weekday unless an exception overrides it, or LIFTED.
+        """
+
+        return self._overrides.get(day.toordinal(), day.weekday())
+
+    def minute_of_week(self, datetime_input: datetime) -> int:
+        """
+        Computes the minute of the week to look up for a datetime.
+        Args:
+            datetime_input (datetime): The date and time.
+        Returns:
+            int: The minute of the week in the effective weekday, or LIFTED.
+        """
+
+        weekday = self._overrides.get(datetime_input.toordinal(), datetime_input.weekday())
+        if weekday == LIFTED:
+            return LIFTED
+        return weekday * MINUTES_PER_DAY + datetime_input.hour * 60 + datetime_input.minute
+
+    def exceptions_between(self, first: date, last: date) -> List[Tuple[date, int]]:
+        """
+        Lists the exceptions within a range of dates.
+        Args:
+            first (date): The first date of the range.
+            last (date): The last date of the range (inclusive).
+        Returns:
+            List[Tuple[date, int]]: (date, effective weekday or LIFTED) pairs in date order.
+        """
+
+        ordinals = self._sorted_ordinals()
+        start = bisect_left(ordinals, first.toordinal())
+        stop = bisect_right(ordinals, last.toordinal())
+        return [(date.fromordinal(ordinal), self._overrides[ordinal])
+                for ordinal in ordinals[start:stop]]
+
+    def next_date(self, day: date) -> Optional[date]:
+        """
+        Returns the first date with an exception on or after a date.
+        Args:
+            day (date): The date to search from.
+        Returns:
+            Optional[date]: The date, or None if no exception falls on or after it.
+        """
+
+        ordinals = self._sorted_ordinals()
+        index = bisect_left(ordinals, day.toordinal())
+        return date.fromordinal(ordinals[index]) if index < len(ordinals) else None
+
+    def last_date(self) -> Optional[date]:
+        """
+        Returns the latest date with an exception.
+        Returns:
+            Optional[date]: The date, or None if the calendar is empty.
+        """
+
+        ordinals = self._sorted_ordinals()
+        return date.fromordinal(ordinals[-1]) if ordinals else None
+
+    def _sorted_ordinals(self) -> List[int]:
+        """Returns the exception ordinals in order, sorting them once per change."""
+        if self._ordinals is None:
+            self._ordinals = sorted(self._overrides)
+        return self._ordinals
@@ -3,10 +3,21 @@ PicoPlacaPredictor Module
 
 Evaluates vehicle circulation restrictions based on license plates, dates, and times.
 """
+from datetime import date as Date, datetime, timedelta
+from functools import lru_cache
+from time import perf_counter
+from typing import Iterable, Iterator, Optional, Tuple, Union
 
 from input import LicensePlateParser, DateTimeParser
 from output import OutputFormatter
+from .pico_placa_rule import PicoPlacaRule
 from .pico_placa_rule_set import PicoPlacaRuleSet, NoRulesDefinedError
+from .compiled_rule_table import CompiledRuleTable, MINUTES_PER_DAY, MINUTES_PER_WEEK
+from .pico_placa_schedule import PicoPlacaSchedule
+from .exception_calendar import ExceptionCalendar, LIFTED
+from .predictor_stats import PredictorStats
+from .prediction_result import (PredictionResult, INVALID_LICENSE_PLATE, INVALID_DATETIME,
+                                NO_RULES, RULE_ERROR)
 
 
 class PicoPlacaPredictor:
@@ -17,14 +28,49 @@ class PicoPlacaPredictor:
     its license plate, date, and time, according to a specific rule set.
     
     Attributes:
-        rule_set (PicoPlacaRuleSet): The rule set defining the restriction parameters
-            including restricted days, times, and license plate digits.
+        rule_set (Union[PicoPlacaRuleSet, PicoPlacaSchedule]): The rule set defining the
+            restriction parameters including restricted days, times, and license plate
+            digits, or a schedule of effective-dated rule sets, in which case every date
+            is checked against the version in force on it.
+        stats (Optional[PredictorStats]): When set, predict_restriction and predict_many
+            record the latency of each stage (plate, datetime, rules, format) and count
+            errors by code. When None, the uninstrumented code paths run unchanged.
     """
 
-    rule_set: PicoPlacaRuleSet
+    rule_set: Union[PicoPlacaRuleSet, PicoPlacaSchedule]
+    stats: Optional[PredictorStats]
 
-    def __init__(self, rule_set: PicoPlacaRuleSet):
+    # Maximum number of parsed plates, (date, time) pairs or dates remembered per batch
+    MOMENT_CACHE_SIZE = 65536
+
+    def __init__(self, rule_set: Union[PicoPlacaRuleSet, PicoPlacaSchedule],
+                 stats: Optional[PredictorStats] = None):
         self.rule_set = rule_set
+        self.stats = stats
+
+    def _is_restricted(self, date_time: datetime, digit: int) -> bool:
+        """
+        Evaluates a restriction through the rule set's compiled lookup table.
+        Rule sets whose boundaries cannot be compiled fall back to the reference engine.
+        Raises:
+            NoRulesDefinedError: If the rule set has no rules.
+        """
+
+        rule_set = self.rule_set
+        if isinstance(rule_set, PicoPlacaSchedule):
+            rule_set = rule_set.rule_set_for(date_time)
+            if rule_set is None:
+                raise NoRulesDefinedError()
+        try:
+            table = rule_set.compile()
+        except ValueError:
+            return rule_set.is_vehicle_restricted(date_time, digit)
+        if not table.has_rules:
+            raise NoRulesDefinedError()
+        if rule_set.exceptions:
+            minute = rule_set.exceptions.minute_of_week(date_time)
+            return minute != LIFTED and table.is_restricted_at(minute, digit)
+        return table.is_vehicle_restricted(date_time, digit)
 
     def predict_restriction(self, license_plate: str, date: str, time: str) -> str:
         """
@@ -45,12 +91,620 @@ class PicoPlacaPredictor:
             str: A formatted message indicating whether the vehicle is restricted or not,
                  or an error message if input validation fails or an unexpected error occurs.
         """
+        if self.stats is not None:
+            return self._predict_restriction_with_stats(license_plate, date, time)
         try:
             last_digit = LicensePlateParser.parse_license_plate(license_plate)
             date_time = DateTimeParser.parse_datetime(date, time)
-            restricted = self.rule_set.is_vehicle_restricted(date_time, last_digit)
+            restricted = self._is_restricted(date_time, last_digit)
             return OutputFormatter.format_prediction(restricted)
         except ValueError as e:
             return f"Error: {str(e)}"
         except NoRulesDefinedError as e:
             return f"Error: {str(e)}"
+
+    def evaluate(self, license_plate: str, date: str, time: str) -> PredictionResult:
+        """
+        Checks a vehicle and returns a structured result instead of a message.
+        Unlike predict_many, the rule that restricts the vehicle is looked up as well,
+        with the rule set's matching_rule.
+        Args:
+            license_plate (str): The vehicle's license plate to check.
+            date (str): The date to check.
+            time (str): The time to check.
+        Returns:
+            PredictionResult: The verdict, with the restricting rule if any, or an error
+                              code if the input is invalid or no rules are in force.
+        """
+
+        if self.stats is not None:
+            return self._evaluate_with_stats(license_plate, date, time)
+        last_digit = LicensePlateParser.try_parse_license_plate(license_plate)
+        if last_digit is None:
+            return PredictionResult(license_plate, date, time, None, INVALID_LICENSE_PLATE)
+        date_time = DateTimeParser.try_parse_datetime(date, time)
+        if date_time is None:
+            return PredictionResult(license_plate, date, time, None, INVALID_DATETIME)
+        try:
+            restricted = self._is_restricted(date_time, last_digit)
+        except NoRulesDefinedError:
+            return PredictionResult(license_plate, date, time, None, NO_RULES)
+        return PredictionResult(license_plate, date, time, restricted, None,
+                                self._matching_rule(date_time, last_digit) if restricted
+                                else None)
+
+    def _evaluate_with_stats(self, license_plate: str, date: str, time: str) -> PredictionResult:
+        """evaluate, timing every stage and counting errors into self.stats."""
+        stats = self.stats
+        began = perf_counter()
+        last_digit = LicensePlateParser.try_parse_license_plate(license_plate)
+        parsed = perf_counter()
+        stats.observe("plate", parsed - began)
+        if last_digit is None:
+            stats.count_error(INVALID_LICENSE_PLATE)
+            return PredictionResult(license_plate, date, time, None, INVALID_LICENSE_PLATE)
+        date_time = DateTimeParser.try_parse_datetime(date, time)
+        began = perf_counter()
+        stats.observe("datetime", began - parsed)
+        if date_time is None:
+            stats.count_error(INVALID_DATETIME)
+            return PredictionResult(license_plate, date, time, None, INVALID_DATETIME)
+        try:
+            restricted = self._is_restricted(date_time, last_digit)
+            rule = self._matching_rule(date_time, last_digit) if restricted else None
+        except NoRulesDefinedError:
+            stats.count_error(NO_RULES)
+            return PredictionResult(license_plate, date, time, None, NO_RULES)
+        except ValueError:
+            stats.count_error(RULE_ERROR)
+            raise
+        finally:
+            stats.observe("rules", perf_counter() - began)
+        return PredictionResult(license_plate, date, time, restricted, None, rule)
+
+    def _matching_rule(self, date_time: datetime, last_digit: int) -> Optional[PicoPlacaRule]:
+        """The rule that restricts a digit at a moment, from the rule set in force then."""
+        rule_set = self.rule_set
+        if isinstance(rule_set, PicoPlacaSchedule):
+            rule_set = rule_set.rule_set_for(date_time)
+        return rule_set.matching_rule(date_time, last_digit)
+
+    def _predict_restriction_with_stats(self, license_plate: str, date: str, time: str) -> str:
+        """predict_restriction, timing every stage and counting errors into self.stats."""
+        stats = self.stats
+        began = perf_counter()
+        try:
+            last_digit = LicensePlateParser.parse_license_plate(license_plate)
+        except ValueError as e:
+            stats.count_error(INVALID_LICENSE_PLATE)
+            return f"Error: {str(e)}"
+        finally:
+            parsed = perf_counter()
+            stats.observe("plate", parsed - began)
+        try:
+            date_time = DateTimeParser.parse_datetime(date, time)
+        except ValueError as e:
+            stats.count_error(INVALID_DATETIME)
+            return f"Error: {str(e)}"
+        finally:
+            began = perf_counter()
+            stats.observe("datetime", began - parsed)
+        try:
+            restricted = self._is_restricted(date_time, last_digit)
+        except NoRulesDefinedError as e:
+            stats.count_error(NO_RULES)
+            return f"Error: {str(e)}"
+        except ValueError as e:
+            stats.count_error(RULE_ERROR)
+            return f"Error: {str(e)}"
+        finally:
+            evaluated = perf_counter()
+            stats.observe("rules", evaluated - began)
+        message = OutputFormatter.format_prediction(restricted)
+        stats.observe("format", perf_counter() - evaluated)
+        return message
+
+    def predict_next_unrestricted(self, license_plate: str, date: str, time: str) -> str:
+        """
+        Predicts when a vehicle with the given license plate may circulate, starting from
+        the specified date and time.
+        Args:
+            license_plate (str): The vehicle's license plate to check.
+            date (str): The date to search from.
+            time (str): The time to search from.
+        Returns:
+            str: A formatted message with the first moment the vehicle may circulate,
+                 or an error message if input validation fails.
+        """
+
+        return self._predict_next(license_plate, date, time, self.rule_set.next_unrestricted,
+                                  OutputFormatter.format_next_unrestricted)
+
+    def predict_next_restricted(self, license_plate: str, date: str, time: str) -> str:
+        """
+        Predicts when a vehicle with the given license plate is next restricted, starting
+        from the specified date and time.
+        Args:
+            license_plate (str): The vehicle's license plate to check.
+            date (str): The date to search from.
+            time (str): The time to search from.
+        Returns:
+            str: A formatted message with the next moment the vehicle is restricted,
+                 or an error message if input validation fails.
+        """
+
+        return self._predict_next(license_plate, date, time, self.rule_set.next_restricted,
+                                  OutputFormatter.format_next_restricted)
+
+    def _predict_next(self, license_plate: str, date: str, time: str, find, format_moment) -> str:
+        try:
+            last_digit = LicensePlateParser.parse_license_plate(license_plate)
+            date_time = DateTimeParser.parse_datetime(date, time)
+            if not self.rule_set.has_rules():
+                raise NoRulesDefinedError()
+            return format_moment(find(date_time, last_digit))
+        except (ValueError, NoRulesDefinedError) as e:
+            return f"Error: {str(e)}"
+
+    def predict_many(self, triples: Iterable[Tuple[str, str, str]]) -> Iterator[PredictionResult]:
+        """
+        Predicts restrictions for a stream of license plate, date and time triples.
+        The rule set is resolved once for the whole batch, inputs are validated without
+        raising exceptions and failures are reported as error codes whose messages are
+        only formatted on demand, which makes this considerably cheaper than calling
+        predict_restriction in a loop.
+        The rule set is resolved when predict_many is called, and the loop suited to it is
+        returned directly, so iterating costs no generator delegation per result.
+        Args:
+            triples (Iterable[Tuple[str, str, str]]): (license_plate, date, time) triples
+                in the same formats accepted by predict_restriction.
+        Returns:
+            Iterator[PredictionResult]: One structured result per triple, in input order.
+        """
+
+        if isinstance(self.rule_set, PicoPlacaSchedule):
+            has_rules = True
+            parse_moment, is_restricted = _scheduled_lookup(self.rule_set)
+        else:
+            table = _compiled_table(self.rule_set)
+            if self.stats is None and table is not None and table.has_rules:
+                return self._predict_many_compiled(triples, table, self.rule_set.exceptions)
+            has_rules, parse_moment, is_restricted = _batch_lookup(self.rule_set)
+        if self.stats is not None:
+            return self._predict_many_with_stats(triples, has_rules, parse_moment,
+                                                 is_restricted)
+        return self._predict_many_lookup(triples, has_rules, parse_moment, is_restricted)
+
+    def _predict_many_lookup(self, triples: Iterable[Tuple[str, str, str]], has_rules: bool,
+                             parse_moment, is_restricted) -> Iterator[PredictionResult]:
+        """The predict_many loop for schedules and rule sets that cannot be compiled."""
+        parse_license_plate = LicensePlateParser.try_parse_license_plate
+        # Batches usually repeat the same plates, so their digits are memoized for the
+        # duration of the batch; invalid plates are remembered as -1. Dates and times are
+        # memoized per string by the parsers themselves (see _batch_lookup).
+        digit_cache = {}
+
+        for license_plate, date, time in triples:
+            last_digit = digit_cache.get(license_plate)
+            if last_digit is None:
+                last_digit = parse_license_plate(license_plate)
+                if last_digit is None:
+                    last_digit = -1
+                if len(digit_cache) >= self.MOMENT_CACHE_SIZE:
+                    digit_cache.clear()
+                digit_cache[license_plate] = last_digit
+            if last_digit < 0:
+                yield PredictionResult(license_plate, date, time, None, INVALID_LICENSE_PLATE)
+                continue
+            moment = parse_moment(date, time)
+            if moment is None:
+                yield PredictionResult(license_plate, date, time, None, INVALID_DATETIME)
+                continue
+            if not has_rules or moment is _NO_RULES_IN_FORCE:
+                yield PredictionResult(license_plate, date, time, None, NO_RULES)
+                continue
+            yield PredictionResult(license_plate, date, time, is_restricted(moment, last_digit))
+
+    def _predict_many_compiled(self, triples: Iterable[Tuple[str, str, str]],
+                               table: CompiledRuleTable,
+                               exceptions: ExceptionCalendar) -> Iterator[PredictionResult]:
+        """
+        The predict_many loop for a compiled rule set. Plates, dates and times are each
+        parsed once per batch, straight to their share of a table position: the digit's
+        row, the date's effective weekday in minutes and the minute of the day. Every
+        other row costs three dict lookups, one addition and one table read. Invalid
+        values and lifted dates are remembered as negative offsets, so one comparison of
+        the sum separates them from ordinary rows.
+        """
+        flags = table.table
+        parse_license_plate = LicensePlateParser.try_parse_license_plate
+        parse_ordinal_minute = DateTimeParser.try_parse_ordinal_minute
+        overrides = exceptions.overrides
+        limit = self.MOMENT_CACHE_SIZE
+        rows = {}
+        days = {}
+        clocks = {}
+
+        def remember(license_plate: str, date: str, time: str) -> Tuple[int, int, int]:
+            """Parses whichever of a row's plate, date and time was not seen before."""
+            row = rows.get(license_plate)
+            if row is None:
+                digit = parse_license_plate(license_plate)
+                row = _INVALID_PLATE if digit is None else digit * MINUTES_PER_WEEK
+                if len(rows) >= limit:
+                    rows.clear()
+                rows[license_plate] = row
+            day = days.get(date)
+            if day is None:
+                # Each half is parsed with a fixed valid partner, which accepts exactly
+                # the strings the combined parse accepts
+                parsed = parse_ordinal_minute(date, "00:00")
+                if parsed is None:
+                    day = _INVALID_MOMENT
+                else:
+                    weekday = overrides.get(parsed[0], (parsed[0] - 1) % 7)
+                    day = _LIFTED_DAY if weekday == LIFTED else weekday * MINUTES_PER_DAY
+                if len(days) >= limit:
+                    days.clear()
+                days[date] = day
+            clock = clocks.get(time)
+            if clock is None:
+                parsed = parse_ordinal_minute(_CLOCK_PARTNER_DATE, time)
+                clock = _INVALID_MOMENT if parsed is None else parsed[1]
+                if len(clocks) >= limit:
+                    clocks.clear()
+                clocks[time] = clock
+            return row, day, clock
+
+        for license_plate, date, time in triples:
+            try:
+                row = rows[license_plate]
+                day = days[date]
+                clock = clocks[time]
+            except KeyError:
+                row, day, clock = remember(license_plate, date, time)
+            position = row + day + clock
+            if position >= 0:
+                yield PredictionResult(license_plate, date, time, flags[position] == 1)
+            elif row < 0:
+                yield PredictionResult(license_plate, date, time, None, INVALID_LICENSE_PLATE)
+            elif day == _INVALID_MOMENT or clock < 0:
+                yield PredictionResult(license_plate, date, time, None, INVALID_DATETIME)
+            else:
+                yield PredictionResult(license_plate, date, time, False)
+
+    def predict_many_epochs(self, pairs: Iterable[Tuple[str, float]],
+                            zone: str) -> Iterator[PredictionResult]:
+        """
+        Predicts restrictions for a stream of license plates and UTC epoch timestamps,
+        as reported by GPS devices, read as local time in a time zone.
+        Timestamps are converted through the zone's shared TimeZoneConverter, whose
+        cached offset transitions make the conversion an add and a range check per row,
+        and are then looked up like predict_many's parsed dates, to the minute.
+        Args:
+            pairs (Iterable[Tuple[str, float]]): (license_plate, epoch_seconds) pairs.
+            zone (str): The IANA time zone the rules apply in, e.g. 'America/Guayaquil'.
+        Yields:
+            PredictionResult: One result per pair, in input order. Its date and time are
+                              the local 'YYYY-MM-DD' and 'HH:MM'; for a timestamp that
+                              cannot be converted, the epoch as text and an empty time.
+        Raises:
+            zoneinfo.ZoneInfoNotFoundError: If the zone is unknown.
+        """
+
+        # Imported here so that zoneinfo is only loaded by callers that convert epochs
+        from input.time_zone_converter import TimeZoneConverter
+
+        ordinal_minute = TimeZoneConverter.for_zone(zone).ordinal_minute
+        resolve, is_restricted = _ordinal_resolver(self.rule_set)
+        local_moment = _local_moment_cache(ordinal_minute, resolve)
+        if self.stats is not None:
+            yield from self._predict_many_epochs_with_stats(pairs, local_moment, is_restricted)
+            return
+        parse_license_plate = LicensePlateParser.try_parse_license_plate
+
+        for license_plate, epoch in pairs:
+            try:
+                date, time, moment = local_moment(epoch)
+            except (TypeError, ValueError, OverflowError):
+                yield PredictionResult(license_plate, str(epoch), "", None, INVALID_DATETIME)
+                continue
+            last_digit = parse_license_plate(license_plate)
+            if last_digit is None:
+                yield PredictionResult(license_plate, date, time, None, INVALID_LICENSE_PLATE)
+                continue
+            if moment is _NO_RULES_IN_FORCE:
+                yield PredictionResult(license_plate, date, time, None, NO_RULES)
+                continue
+            yield PredictionResult(license_plate, date, time, is_restricted(moment, last_digit))
+
+    def _predict_many_epochs_with_stats(self, pairs: Iterable[Tuple[str, float]], local_moment,
+                                        is_restricted) -> Iterator[PredictionResult]:
+        """The predict_many_epochs loop, timing every stage and counting errors into self.stats."""
+        stats = self.stats
+        observe = stats.observe
+        parse_license_plate = LicensePlateParser.try_parse_license_plate
+
+        for license_plate, epoch in pairs:
+            began = perf_counter()
+            try:
+                date, time, moment = local_moment(epoch)
+            except (TypeError, ValueError, OverflowError):
+                stats.count_error(INVALID_DATETIME)
+                yield PredictionResult(license_plate, str(epoch), "", None, INVALID_DATETIME)
+                continue
+            converted = perf_counter()
+            observe("datetime", converted - began)
+            last_digit = parse_license_plate(license_plate)
+            began = perf_counter()
+            observe("plate", began - converted)
+            if last_digit is None:
+                stats.count_error(INVALID_LICENSE_PLATE)
+                yield PredictionResult(license_plate, date, time, None, INVALID_LICENSE_PLATE)
+                continue
+            if moment is _NO_RULES_IN_FORCE:
+                stats.count_error(NO_RULES)
+                yield PredictionResult(license_plate, date, time, None, NO_RULES)
+                continue
+            restricted = is_restricted(moment, last_digit)
+            observe("rules", perf_counter() - began)
+            yield PredictionResult(license_plate, date, time, restricted)
+
+    def evaluate_epoch(self, license_plate: str, epoch: float, zone: str) -> PredictionResult:
+        """
+        Checks a vehicle at a UTC epoch timestamp read as local time in a time zone.
+        Args:
+            license_plate (str): The vehicle's license plate to check.
+            epoch (float): Seconds since 1970-01-01 00:00 UTC.
+            zone (str): The IANA time zone the rules apply in.
+        Returns:
+            PredictionResult: As from predict_many_epochs.
+        Raises:
+            zoneinfo.ZoneInfoNotFoundError: If the zone is unknown.
+        """
+
+        return next(self.predict_many_epochs([(license_plate, epoch)], zone))
+
+    def _predict_many_with_stats(self, triples: Iterable[Tuple[str, str, str]], has_rules: bool,
+                                 parse_moment, is_restricted) -> Iterator[PredictionResult]:
+        """The predict_many loop, timing every stage and counting errors into self.stats."""
+        stats = self.stats
+        observe = stats.observe
+        parse_license_plate = LicensePlateParser.try_parse_license_plate
+
+        for license_plate, date, time in triples:
+            began = perf_counter()
+            last_digit = parse_license_plate(license_plate)
+            parsed = perf_counter()
+            observe("plate", parsed - began)
+            if last_digit is None:
+                stats.count_error(INVALID_LICENSE_PLATE)
+                yield PredictionResult(license_plate, date, time, None, INVALID_LICENSE_PLATE)
+                continue
+            moment = parse_moment(date, time)
+            began = perf_counter()
+            observe("datetime", began - parsed)
+            if moment is None:
+                stats.count_error(INVALID_DATETIME)
+                yield PredictionResult(license_plate, date, time, None, INVALID_DATETIME)
+                continue
+            if not has_rules or moment is _NO_RULES_IN_FORCE:
+                stats.count_error(NO_RULES)
+                yield PredictionResult(license_plate, date, time, None, NO_RULES)
+                continue
+            restricted = is_restricted(moment, last_digit)
+            observe("rules", perf_counter() - began)
+            yield PredictionResult(license_plate, date, time, restricted)
+
+
+# Moment of a scheduled batch row that falls on a date without rules in force
+_NO_RULES_IN_FORCE = object()
+# Offsets remembered by _predict_many_compiled for invalid plates, dates and times and
+# for lifted dates. Each is far below minus the largest table position, so any row
+# holding one sums to a negative position.
+_INVALID_PLATE = -(1 << 40)
+_INVALID_MOMENT = -(1 << 30)
+_LIFTED_DAY = -(1 << 20)
+# Any valid date, paired with times to parse them on their own
+_CLOCK_PARTNER_DATE = "2000-01-03"
+
+
+def _compiled_table(rule_set: PicoPlacaRuleSet) -> Optional[CompiledRuleTable]:
+    """Returns the rule set's compiled table, or None if its rules cannot be compiled."""
+    try:
+        return rule_set.compile()
+    except ValueError:
+        return None
+
+
+def _batch_lookup(rule_set: PicoPlacaRuleSet):
+    """
+    Chooses how a batch parses dates and times and evaluates them against a rule set.
+    Returns:
+        Tuple: (has_rules, parse_moment(date, time), is_restricted(moment, digit)).
+    """
+
+    # With a compiled table only the minute of the week is needed, so dates and
+    # times are parsed straight to it by DateTimeParser's memoized fast path, and no
+    # datetime is built; otherwise the reference engine needs datetimes, which are
+    # memoized here. Exception dates need the date itself, so rows are parsed to their
+    # day ordinal and resolved to the effective minute of the week, or LIFTED.
+    try:
+        table = rule_set.compile()
+    except ValueError:
+        return (rule_set.has_rules(), _memoized_parser(DateTimeParser.try_parse_datetime),
+                rule_set.is_vehicle_restricted)
+    if rule_set.exceptions and table.has_rules:
+        to_moment, is_restricted = _ordinal_lookup(rule_set)
+        return True, _ordinal_parser(to_moment), is_restricted
+    return table.has_rules, DateTimeParser.try_parse_minute_of_week, table.is_restricted_at
+
+
+def _scheduled_lookup(schedule: PicoPlacaSchedule):
+    """
+    Builds the batch parser and lookup for a schedule. Dates and times are parsed to
+    their day ordinal and minute of the day and resolved with _ordinal_resolver.
+    Returns:
+        Tuple: (parse_moment(date, time), is_restricted(moment, digit)).
+    """
+
+    resolve, is_restricted = _ordinal_resolver(schedule)
+    return _ordinal_parser(resolve), is_restricted
+
+
+def _ordinal_parser(resolve):
+    """
+    Returns a parser from date and time strings to resolve(ordinal, minute), going
+    through DateTimeParser's memoized ordinal fast path rather than a datetime.
+    """
+
+    parse_ordinal_minute = DateTimeParser.try_parse_ordinal_minute
+
+    def parse(date: str, time: str):
+        parsed = parse_ordinal_minute(date, time)
+        if parsed is None:
+            return None
+        return resolve(*parsed)
+    return parse
+
+
+def _memoized_parser(parse):
+    """Memoizes a parser of date and time strings for the duration of a batch."""
+    moments = {}
+
+    def memoized(date: str, time: str):
+        key = (date, time)
+        moment = moments.get(key)
+        if moment is None:
+            moment = parse(date, time)
+            if moment is not None:
+                if len(moments) >= PicoPlacaPredictor.MOMENT_CACHE_SIZE:
+                    moments.clear()
+                moments[key] = moment
+        return moment
+    return memoized
+
+
+def _ordinal_resolver(rule_set: Union[PicoPlacaRuleSet, PicoPlacaSchedule]):
+    """
+    Builds the lookup of a day ordinal and minute of the day against a rule set or a
+    schedule. For a schedule, the version in force is found by bisecting on the ordinal
+    and each resolved moment is paired with that version's lookup.
+    Returns:
+        Tuple: (resolve(ordinal, minute), is_restricted(moment, digit)); resolve returns
+               _NO_RULES_IN_FORCE for dates without rules.
+    """
+
+    if not isinstance(rule_set, PicoPlacaSchedule):
+        to_moment, is_restricted_at = _ordinal_lookup(rule_set)
+        if to_moment is None:
+            return lambda ordinal, minute: _NO_RULES_IN_FORCE, is_restricted_at
+        return to_moment, is_restricted_at
+
+    schedule = rule_set
+    # Version lookups, built once per version and remembered per day ordinal
+    lookups = {}
+    by_ordinal = {}
+
+    def resolve(ordinal: int, minute: int):
+        lookup = by_ordinal.get(ordinal)
+        if lookup is None:
+            version = schedule.rule_set_for_ordinal(ordinal)
+            if version is None:
+                lookup = (None, None)
+            else:
+                lookup = lookups.get(id(version))
+                if lookup is None:
+                    lookup = lookups[id(version)] = _ordinal_lookup(version)
+            if len(by_ordinal) >= PicoPlacaPredictor.MOMENT_CACHE_SIZE:
+                by_ordinal.clear()
+            by_ordinal[ordinal] = lookup
+        to_moment, is_restricted_at = lookup
+        if to_moment is None:
+            return _NO_RULES_IN_FORCE
+        return is_restricted_at, to_moment(ordinal, minute)
+
+    def is_restricted(moment, digit: int) -> bool:
+        return moment[0](moment[1], digit)
+    return resolve, is_restricted
+
+
+def _local_moment_cache(ordinal_minute, resolve):
+    """
+    Builds the per-batch conversion of epochs to local date and time text and a resolved
+    moment, remembering dates and moments as predict_many remembers parsed strings.
+    Returns:
+        Callable: local_moment(epoch) -> (date, time, moment).
+    """
+
+    clocks = _clock_texts()
+    dates = {}
+    moments = {}
+
+    def local_moment(epoch: float):
+        key = ordinal_minute(epoch)
+        ordinal, minute = key
+        date = dates.get(ordinal)
+        if date is None:
+            date = Date.fromordinal(ordinal).isoformat()
+            if len(dates) >= PicoPlacaPredictor.MOMENT_CACHE_SIZE:
+                dates.clear()
+            dates[ordinal] = date
+        moment = moments.get(key)
+        if moment is None:
+            moment = resolve(ordinal, minute)
+            if len(moments) >= PicoPlacaPredictor.MOMENT_CACHE_SIZE:
+                moments.clear()
+            moments[key] = moment
+        return date, clocks[minute], moment
+    return local_moment
+
+
+@lru_cache(maxsize=1)
+def _clock_texts() -> Tuple[str, ...]:
+    """The 'HH:MM' text of every minute of the day."""
+    return tuple(f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(MINUTES_PER_DAY))
+
+
+def _ordinal_lookup(rule_set: PicoPlacaRuleSet):
+    """
+    Chooses how a day ordinal and minute of the day are evaluated against a rule set.
+    Returns:
+        Tuple: (to_moment(ordinal, minute), is_restricted(moment, digit)), with to_moment
+               None if the rule set has no rules.
+    """
+
+    try:
+        table = rule_set.compile()
+    except ValueError:
+        if not rule_set.has_rules():
+            return None, None
+        return _ordinal_to_datetime, rule_set.is_vehicle_restricted
+    if not table.has_rules:
+        return None, None
+    if rule_set.exceptions:
+        overrides = rule_set.exceptions.overrides
+
+        def effective_minute(ordinal: int, minute: int) -> int:
+            weekday = overrides.get(ordinal, (ordinal - 1) % 7)
+            return LIFTED if weekday == LIFTED else weekday * MINUTES_PER_DAY + minute
+        return effective_minute, _unless_lifted(table.is_restricted_at)
+    return _ordinal_to_minute_of_week, table.is_restricted_at
+
+
+def _ordinal_to_minute_of_week(ordinal: int, minute: int) -> int:
+    """Converts a day ordinal and minute of the day into the minute of the week."""
+    # Ordinal 1, 0001-01-01, was a Monday
+    return (ordinal - 1) % 7 * MINUTES_PER_DAY + minute
+
+
+def _ordinal_to_datetime(ordinal: int, minute: int) -> datetime:
+    """Converts a day ordinal and minute of the day into a datetime."""
+    return datetime.fromordinal(ordinal) + timedelta(minutes=minute)
+
+
+def _unless_lifted(is_restricted_at):
+    """Wraps a minute-of-week lookup so that LIFTED moments are never restricted."""
+    def is_restricted(minute: int, digit: int) -> bool:
+        return minute != LIFTED and is_restricted_at(minute, digit)
+    return is_restricted
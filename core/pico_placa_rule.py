@@ -3,38 +3,74 @@ Pico y Placa Rule Module
 
 Defines individual restriction rules based on day of week, time of day, and license plate digits.
 """
-from typing import List
+from typing import FrozenSet, Iterable
 from datetime import time
 
 
 class PicoPlacaRule:
     """
     Represents a Pico y Placa restriction rule.
-    The Pico y Placa (license plate restriction) rule specifies which vehicles are 
-    restricted from driving based on the day of the week, time of day, and the last 
+    The Pico y Placa (license plate restriction) rule specifies which vehicles are
+    restricted from driving based on the day of the week, time of day, and the last
     digit of the license plate number.
+    Rules are immutable values: their fields cannot be reassigned after construction,
+    and two rules with the same days, digits and times are equal and hash alike, so
+    rule sets can cache whatever they derive from them.
     Attributes:
-        days_of_week (List[int]): Days of the week when the rule is in effect (0-6, 
-                                 where 0 is Monday and 6 is Sunday).
-        restricted_digits (List[int]): License plate ending digits that are restricted.
+        days_of_week (FrozenSet[int]): Days of the week when the rule is in effect (0-6,
+                                       where 0 is Monday and 6 is Sunday).
+        restricted_digits (FrozenSet[int]): License plate ending digits that are restricted.
         start_time (time): Starting time for the restriction period.
         end_time (time): Ending time for the restriction period.
     Methods:
-        is_restricted(day_of_week, current_time, digit): Determines if a vehicle is 
+        is_restricted(day_of_week, current_time, digit): Determines if a vehicle is
                                                        restricted based on the rule.
     """
 
-    days_of_week: List[int]
-    restricted_digits: List[int]
+    __slots__ = ("days_of_week", "restricted_digits", "start_time", "end_time", "_hash")
+
+    days_of_week: FrozenSet[int]
+    restricted_digits: FrozenSet[int]
     start_time: time
     end_time: time
 
-    def __init__(self, days_of_week: List[int], restricted_digits: List[int],
+    def __init__(self, days_of_week: Iterable[int], restricted_digits: Iterable[int],
                   start_time: time, end_time: time):
-        self.days_of_week = days_of_week
-        self.restricted_digits = restricted_digits
-        self.start_time = start_time
-        self.end_time = end_time
+        # Any iterable is accepted, lists included, and stored as a frozenset
+        days_of_week = frozenset(days_of_week)
+        restricted_digits = frozenset(restricted_digits)
+        object.__setattr__(self, "days_of_week", days_of_week)
+        object.__setattr__(self, "restricted_digits", restricted_digits)
+        object.__setattr__(self, "start_time", start_time)
+        object.__setattr__(self, "end_time", end_time)
+        object.__setattr__(self, "_hash", hash((days_of_week, restricted_digits,
+                                                start_time, end_time)))
+
+    def __setattr__(self, name: str, value):
+        raise AttributeError(f"PicoPlacaRule is immutable; cannot set '{name}'.")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"PicoPlacaRule is immutable; cannot delete '{name}'.")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PicoPlacaRule):
+            return NotImplemented
+        return (self._hash == other._hash
+                and self.start_time == other.start_time and self.end_time == other.end_time
+                and self.days_of_week == other.days_of_week
+                and self.restricted_digits == other.restricted_digits)
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __repr__(self) -> str:
+        return (f"PicoPlacaRule(days_of_week={sorted(self.days_of_week)}, "
+                f"restricted_digits={sorted(self.restricted_digits)}, "
+                f"start_time={self.start_time!r}, end_time={self.end_time!r})")
+
+    def __reduce__(self):
+        return PicoPlacaRule, (self.days_of_week, self.restricted_digits,
+                               self.start_time, self.end_time)
 
     def is_restricted(self, day_of_week: int, current_time: time, digit: int) -> bool:
         """
@@ -47,8 +83,8 @@ class PicoPlacaRule:
             bool: True if the vehicle is restricted from circulation, False otherwise.
         Note:
             A vehicle is restricted if all of the following conditions are met:
-            - The day of the week is in the rule's list of restricted days
-            - The last digit of the license plate is in the rule's list of restricted digits
+            - The day of the week is in the rule's set of restricted days
+            - The last digit of the license plate is in the rule's set of restricted digits
             - The current time is within the restricted time frame (between start_time and end_time)
         """
 
@@ -3,50 +3,170 @@ Pico y Placa Rule Set Module
 
 Manages collections of restriction rules and evaluates vehicle circulation permissions.
 """
-from datetime import datetime
-from typing import List, Dict
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Iterable, Iterator, Mapping, Optional, Sequence, Tuple
 
 from .pico_placa_rule import PicoPlacaRule
+from .compiled_rule_table import CompiledRuleTable, MINUTES_PER_DAY, minute_of_week
+from .exception_calendar import ExceptionCalendar, LIFTED
+from .rule_index import RuleIndex
+from .rule_optimizer import distinct_rules, optimize_rules
 
 
 class NoRulesDefinedError(Exception):
     """Exception raised when attempting to check restrictions with no rules defined."""
 
+    def __init__(self, message: str = "No Pico y Placa rules are defined in the ruleset."):
+        super().__init__(message)
+
 class PicoPlacaRuleSet:
     """
     PicoPlacaRuleSet is a class that manages a collection of pico y placa rules.
     This class allows adding rules and checking whether a vehicle with a specific 
     last digit in its license plate is restricted from circulation at a given datetime.
     Attributes:
-        rules_by_day (dict): A dictionary mapping weekdays (0-6) to lists of PicoPlacaRule objects.
+        rules_by_day (Mapping[int, Sequence[PicoPlacaRule]]): A read-only view mapping
+            weekdays (0-6) to their rules. Rules are changed through add_rule and optimize,
+            which also invalidate the compiled table and index.
+        exceptions (ExceptionCalendar): Dates on which restrictions are lifted or follow the
+                                        rules of another weekday. It is consulted before the
+                                        weekday rules by every lookup and query.
     Methods:
         __init__(): Initializes a dictionary of rules indexed by weekday.
+        from_rules(rules, compiled): Builds a rule set, optionally with a precompiled table.
+        load_snapshot(path): Builds a rule set from a memory-mapped compiled table snapshot.
+        save_snapshot(path): Writes the compiled table to a binary snapshot file.
         add_rule(rule): Adds a rule to the rule set for the appropriate weekdays.
         has_rules(): Checks if any rules are defined.
         is_vehicle_restricted(datetime, digit): Checks if a vehicle with the given digit 
                                                             is restricted at the specified datetime.
+        matching_rule(datetime, digit): Finds the first rule restricting the vehicle by
+                                        evaluating the rules one by one.
+        compile(): Builds (or returns the cached) CompiledRuleTable for constant-time lookups.
+        optimize(): Replaces the rules with an equivalent, smaller set.
+        next_unrestricted(datetime, digit): Finds when a vehicle may circulate again.
+        next_restricted(datetime, digit): Finds when a vehicle is next restricted.
+        restriction_calendar(digit, start_date, end_date): Lazily yields every restricted
+                                                            interval over a date range.
+    Note:
+        is_vehicle_restricted looks rules up in a RuleIndex, in logarithmic time and with
+        exact boundaries. matching_rule evaluates the rules one by one and serves as the
+        reference engine; results from the index and the compiled table can be diffed
+        against it.
+        A rule set loaded with load_snapshot holds only the compiled table and no rule
+        objects: lookups, next-change queries and calendars are answered from the table,
+        matching_rule always returns None, and no rules can be added.
     """
 
-    rules_by_day: Dict[int, List[PicoPlacaRule]]
+    _rules_by_day: Dict[int, Tuple[PicoPlacaRule, ...]]
+    _rules_view: Mapping[int, Tuple[PicoPlacaRule, ...]]
+    _compiled: Optional[CompiledRuleTable]
+    _index: Optional[RuleIndex]
+    exceptions: ExceptionCalendar
+    _table_only: bool
 
     def __init__(self):
         # Initialize for all days of the week
-        self.rules_by_day = {0:[], 1:[], 2:[], 3:[], 4:[], 5:[], 6:[]}
+        self._rules_by_day = {0:(), 1:(), 2:(), 3:(), 4:(), 5:(), 6:()}
+        self._rules_view = MappingProxyType(self._rules_by_day)
+        self.exceptions = ExceptionCalendar()
+        self._compiled = None
+        self._index = None
+        self._table_only = False
+
+    @property
+    def rules_by_day(self) -> Mapping[int, Sequence[PicoPlacaRule]]:
+        """
+        The rules of every weekday, as a read-only view that follows add_rule and optimize.
+        """
+
+        return self._rules_view
+
+    def __getstate__(self) -> dict:
+        # A mappingproxy cannot be pickled, so it is rebuilt on unpickling
+        state = self.__dict__.copy()
+        del state["_rules_view"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._rules_view = MappingProxyType(self._rules_by_day)
+
+    @classmethod
+    def from_rules(cls, rules: Iterable[PicoPlacaRule],
+                   compiled: Optional[CompiledRuleTable] = None) -> "PicoPlacaRuleSet":
+        """
+        Builds a rule set from a sequence of rules.
+        Args:
+            rules (Iterable[PicoPlacaRule]): The rules, in evaluation order.
+            compiled (Optional[CompiledRuleTable]): A table previously compiled from the same
+                                                    rules, used instead of compiling again.
+        Returns:
+            PicoPlacaRuleSet: The rule set.
+        """
+
+        rule_set = cls()
+        for rule in rules:
+            rule_set.add_rule(rule)
+        rule_set._compiled = compiled
+        return rule_set
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> "PicoPlacaRuleSet":
+        """
+        Builds a rule set from a snapshot written by save_snapshot.
+        The compiled table is memory-mapped rather than read, and no rule objects are
+        created, so loading costs the same whatever the number of rules.
+        Args:
+            path (str): The snapshot file.
+        Returns:
+            PicoPlacaRuleSet: A rule set backed only by the mapped table.
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If the file is not a compatible snapshot.
+        """
+
+        rule_set = cls()
+        rule_set._compiled = CompiledRuleTable.load_snapshot(path)
+        rule_set._table_only = True
+        rule_set.exceptions = ExceptionCalendar.from_overrides(rule_set._compiled.overrides)
+        return rule_set
+
+    def save_snapshot(self, path: str):
+        """
+        Compiles the rule set and writes the table, with the exception dates, to a binary
+        snapshot file.
+        Args:
+            path (str): The snapshot file to write.
+        Raises:
+            ValueError: If a rule boundary is not aligned to a whole minute.
+            OSError: If the file cannot be written.
+        """
+
+        self.compile().save_snapshot(path, self.exceptions.overrides)
 
     def add_rule(self, rule: PicoPlacaRule):
         """
         Add a rule to the rule set.
         This method adds a PicoPlacaRule to the rule set, organizing it by the days of the week
         that the rule applies to. For each day specified in the rule's days_of_week attribute,
-        the rule is appended to the corresponding list in the rules_by_day dictionary.
+        the rule is appended to that weekday's rules.
         Args:
             rule (PicoPlacaRule): The rule to add to the rule set.
         Returns:
             None
+        Raises:
+            ValueError: If the rule set was loaded from a snapshot.
         """
 
+        if self._table_only:
+            raise ValueError("Rules cannot be added to a rule set loaded from a snapshot.")
         for day in rule.days_of_week:
-            self.rules_by_day[day].append(rule)
+            self._rules_by_day[day] += (rule,)
+        self._compiled = None
+        self._index = None
 
     def has_rules(self) -> bool:
         """
@@ -55,7 +175,9 @@ class PicoPlacaRuleSet:
             bool: True if there is at least one day with at least one rule, False otherwise.
         """
 
-        return any(len(rules) > 0 for rules in self.rules_by_day.values())
+        if self._table_only:
+            return self._compiled.has_rules
+        return any(len(rules) > 0 for rules in self._rules_by_day.values())
 
     def is_vehicle_restricted(self, datetime_input: datetime, digit: int,
                                 raise_on_no_rules: bool = True) -> bool:
@@ -78,12 +200,296 @@ class PicoPlacaRuleSet:
 
         if not self.has_rules():
             if raise_on_no_rules:
-                raise NoRulesDefinedError("No Pico y Placa rules are defined in the ruleset.")
+                raise NoRulesDefinedError()
+            return False
+
+        weekday = self.exceptions.weekday_of(datetime_input)
+        if weekday == LIFTED:
             return False
+        index = self._index
+        if index is None:
+            if self._table_only:
+                return self._compiled.is_restricted_at(
+                    weekday * MINUTES_PER_DAY + datetime_input.hour * 60 + datetime_input.minute,
+                    digit)
+            index = self._index = _build_index(self._rules_key())
+        return index.is_restricted(weekday, datetime_input.time(), digit)
+
+    def matching_rule(self, datetime_input: datetime, digit: int) -> Optional[PicoPlacaRule]:
+        """
+        Finds the first rule that restricts a vehicle at the given datetime.
+        The rules of the day are evaluated one by one, in the order they were added.
+        Args:
+            datetime_input (datetime): The date and time to check for restriction.
+            digit (int): The last digit of the vehicle's license plate.
+        Returns:
+            Optional[PicoPlacaRule]: The restricting rule, or None if the vehicle is not
+                                     restricted.
+        """
 
-        day = datetime_input.weekday()
+        day = self.exceptions.weekday_of(datetime_input)
+        if day == LIFTED:
+            return None
         current_time = datetime_input.time()
-        for rule in self.rules_by_day[day]:
+        for rule in self._rules_by_day[day]:
             if rule.is_restricted(day, current_time, digit):
-                return True
-        return False
+                return rule
+        return None
+
+    def compile(self) -> CompiledRuleTable:
+        """
+        Compiles the rule set into a minute-of-week lookup table.
+        The table is cached and reused until another rule is added. Since rules are
+        immutable, tables are also shared between rule sets holding the same rules, e.g.
+        schedule versions that only change exception dates.
+        Returns:
+            CompiledRuleTable: The compiled, immutable lookup table.
+        Raises:
+            ValueError: If a rule boundary is not aligned to a whole minute.
+        """
+
+        if self._compiled is None:
+            self._compiled = _compile(self._rules_key())
+        return self._compiled
+
+    def optimize(self) -> int:
+        """
+        Replaces the rules with an equivalent, smaller set.
+        Overlapping and adjacent windows of the same weekday and digit are merged, digits
+        and weekdays sharing a window are gathered into one rule, and rules that restrict
+        nothing are dropped. The result is checked against the original week tables before
+        it is kept; if it would not have fewer rules, the rule set is left unchanged.
+        matching_rule returns the rewritten rules afterwards.
+        Returns:
+            int: The number of rules eliminated.
+        Raises:
+            ValueError: If the rule set was loaded from a snapshot.
+            RuntimeError: If the rewritten rules do not restrict exactly the same moments.
+        """
+
+        if self._table_only:
+            raise ValueError("A rule set loaded from a snapshot cannot be optimized.")
+        original = distinct_rules(self._rules_by_day)
+        optimized = optimize_rules(self._rules_by_day)
+        if not optimized and original:
+            # Keep one rule so that has_rules() and NoRulesDefinedError behave as before
+            optimized = original[:1]
+        if len(optimized) >= len(original):
+            return 0
+
+        rules_by_day = {day: [] for day in range(7)}
+        for rule in optimized:
+            for day in sorted(rule.days_of_week):
+                rules_by_day[day].append(rule)
+        key = tuple(tuple(rules_by_day[day]) for day in range(7))
+        before, after = _build_index(self._rules_key()), _build_index(key)
+        if before.starts != after.starts or before.ends != after.ends \
+                or not _same_table(self._rules_key(), key):
+            raise RuntimeError("Optimized rules do not restrict the same moments.")
+
+        # Updated in place, so that the rules_by_day view stays current
+        self._rules_by_day.update(zip(range(7), key))
+        self._compiled = None
+        self._index = after
+        return len(original) - len(optimized)
+
+    def _rules_key(self) -> Tuple[Tuple[PicoPlacaRule, ...], ...]:
+        """Returns the rules of every weekday as a hashable key for the shared caches."""
+        return tuple(self._rules_by_day[day] for day in range(7))
+
+    def next_unrestricted(self, datetime_input: datetime, digit: int) -> Optional[datetime]:
+        """
+        Finds the first moment, at or after the given datetime, when a vehicle may circulate.
+        The query is answered from the compiled table's per-digit interval index with a
+        binary search, instead of probing minute by minute.
+        Args:
+            datetime_input (datetime): The date and time to search from.
+            digit (int): The last digit of the vehicle's license plate.
+        Returns:
+            Optional[datetime]: datetime_input itself if the vehicle is not restricted then,
+                                otherwise the start of the first unrestricted minute, or
+                                None if the vehicle is restricted at all times.
+        Raises:
+            ValueError: If a rule boundary is not aligned to a whole minute.
+        """
+
+        return self._next_change(datetime_input, digit,
+                                 self.compile().minutes_until_unrestricted, False)
+
+    def next_restricted(self, datetime_input: datetime, digit: int) -> Optional[datetime]:
+        """
+        Finds the first moment, at or after the given datetime, when a vehicle is restricted.
+        Args:
+            datetime_input (datetime): The date and time to search from.
+            digit (int): The last digit of the vehicle's license plate.
+        Returns:
+            Optional[datetime]: datetime_input itself if the vehicle is restricted then,
+                                otherwise the start of the first restricted minute, or None
+                                if the vehicle is never restricted.
+        Raises:
+            ValueError: If a rule boundary is not aligned to a whole minute.
+        """
+
+        return self._next_change(datetime_input, digit,
+                                 self.compile().minutes_until_restricted, True)
+
+    def restriction_calendar(self, digit: int, start_date: date,
+                             end_date: date) -> Iterator[Tuple[datetime, datetime]]:
+        """
+        Lazily yields every restricted interval of a digit over a range of dates.
+        The weekly pattern is built once from the per-day rule lists, with overlapping and
+        adjacent windows merged, and then repeated week by week, so the cost grows with
+        the number of intervals produced rather than with the number of minutes covered.
+        Args:
+            digit (int): The last digit of the vehicle's license plate.
+            start_date (date): The first date of the range.
+            end_date (date): The last date of the range (inclusive).
+        Yields:
+            Tuple[datetime, datetime]: Merged (start, end) intervals in chronological order;
+                                       start is inclusive and end exclusive. Intervals are
+                                       clipped to the range.
+        Note:
+            When the range contains exception dates, the range is walked day by day
+            instead, following the effective weekday of each date.
+        """
+
+        pattern = self._weekly_pattern(digit)
+        if not pattern or end_date < start_date:
+            return
+        if self.exceptions.exceptions_between(start_date, end_date):
+            yield from self._daily_calendar(pattern, start_date, end_date)
+            return
+        range_start = datetime.combine(start_date, time())
+        range_end = datetime.combine(end_date + timedelta(days=1), time())
+        week_start = range_start - timedelta(days=start_date.weekday())
+        one_week = timedelta(weeks=1)
+        while week_start < range_end:
+            for offset_start, offset_end in pattern:
+                start = week_start + offset_start
+                if start >= range_end:
+                    return
+                end = week_start + offset_end
+                if end > range_start:
+                    yield max(start, range_start), min(end, range_end)
+            week_start += one_week
+
+    def _next_change(self, datetime_input: datetime, digit: int, minutes_until,
+                     restricted: bool) -> Optional[datetime]:
+        """
+        Finds the first moment at which a digit is (or is no longer) restricted.
+        The weekly table answers for the run of ordinary days up to the next exception
+        date, found by bisecting the calendar; only exception days themselves are searched
+        one at a time, in their effective weekday.
+        """
+
+        moment = datetime_input
+        while True:
+            exception_date = self.exceptions.next_date(moment.date())
+            minute = moment.hour * 60 + moment.minute
+            if exception_date is None:
+                return _advance(moment, minutes_until(minute_of_week(moment), digit))
+            if exception_date > moment.date():
+                delta = minutes_until(minute_of_week(moment), digit)
+                ordinary = (exception_date - moment.date()).days * MINUTES_PER_DAY - minute
+                if delta is not None and delta < ordinary:
+                    return _advance(moment, delta)
+                moment = datetime.combine(exception_date, time())
+                minute = 0
+            weekday = self.exceptions.weekday_of(moment)
+            if weekday == LIFTED:
+                if not restricted:
+                    return moment
+            else:
+                delta = minutes_until(weekday * MINUTES_PER_DAY + minute, digit)
+                if delta is not None and minute + delta < MINUTES_PER_DAY:
+                    return _advance(moment, delta)
+            moment = datetime.combine(moment.date() + timedelta(days=1), time())
+
+    def _daily_calendar(self, pattern: List[Tuple[timedelta, timedelta]], start_date: date,
+                        end_date: date) -> Iterator[Tuple[datetime, datetime]]:
+        """Expands a weekly pattern day by day, following each date's effective weekday."""
+        one_day = timedelta(days=1)
+        windows_by_weekday = [[] for _ in range(7)]
+        for start, end in pattern:
+            for weekday in range(start.days, min(7, (end - timedelta.resolution).days + 1)):
+                day_start = timedelta(days=weekday)
+                windows_by_weekday[weekday].append(
+                    (max(start, day_start) - day_start, min(end, day_start + one_day) - day_start))
+
+        pending = None
+        day = start_date
+        while day <= end_date:
+            weekday = self.exceptions.weekday_of(day)
+            if weekday != LIFTED:
+                midnight = datetime.combine(day, time())
+                for start, end in windows_by_weekday[weekday]:
+                    if pending is not None and midnight + start <= pending[1]:
+                        pending = (pending[0], max(pending[1], midnight + end))
+                    else:
+                        if pending is not None:
+                            yield pending
+                        pending = (midnight + start, midnight + end)
+            day += one_day
+        if pending is not None:
+            yield pending
+
+    def _weekly_pattern(self, digit: int) -> List[Tuple[timedelta, timedelta]]:
+        """Merges the restricted windows of a digit into offsets from Monday 00:00."""
+        if self._table_only:
+            return [(timedelta(minutes=start), timedelta(minutes=end))
+                    for start, end in self._compiled.restricted_intervals(digit)]
+        pattern = []
+        for day in range(7):
+            windows = sorted((rule.start_time, rule.end_time) for rule in self._rules_by_day[day]
+                             if digit in rule.restricted_digits and rule.start_time < rule.end_time)
+            day_offset = timedelta(days=day)
+            for start_time, end_time in windows:
+                start = day_offset + _time_to_timedelta(start_time)
+                end = day_offset + _time_to_timedelta(end_time)
+                if pattern and start <= pattern[-1][1]:
+                    if end > pattern[-1][1]:
+                        pattern[-1] = (pattern[-1][0], end)
+                else:
+                    pattern.append((start, end))
+        return pattern
+
+
+def _time_to_timedelta(value: time) -> timedelta:
+    """Converts a time of day into the offset since midnight."""
+    return timedelta(hours=value.hour, minutes=value.minute, seconds=value.second,
+                     microseconds=value.microsecond)
+
+
+def _advance(datetime_input: datetime, minutes: Optional[int]) -> Optional[datetime]:
+    """Moves a datetime forward to the start of the minute that is the given minutes away."""
+    if minutes is None:
+        return None
+    if minutes == 0:
+        return datetime_input
+    return datetime_input.replace(second=0, microsecond=0) + timedelta(minutes=minutes)
+
+
+# Number of distinct rule combinations whose compiled forms are kept for reuse
+SHARED_CACHE_SIZE = 64
+
+
+@lru_cache(maxsize=SHARED_CACHE_SIZE)
+def _compile(rules_key: Tuple[Tuple[PicoPlacaRule, ...], ...]) -> CompiledRuleTable:
+    """Compiles per-day rules, sharing the table between rule sets with equal rules."""
+    return CompiledRuleTable.from_rules(dict(enumerate(rules_key)))
+
+
+@lru_cache(maxsize=SHARED_CACHE_SIZE)
+def _build_index(rules_key: Tuple[Tuple[PicoPlacaRule, ...], ...]) -> RuleIndex:
+    """Indexes per-day rules, sharing the index between rule sets with equal rules."""
+    return RuleIndex.from_rules(dict(enumerate(rules_key)))
+
+
+def _same_table(rules_key: Tuple[Tuple[PicoPlacaRule, ...], ...],
+                other_key: Tuple[Tuple[PicoPlacaRule, ...], ...]) -> bool:
+    """Compares the compiled tables of two rule combinations, when both compile."""
+    try:
+        table = _compile(rules_key)
+    except ValueError:
+        return True
+    return table.table == _compile(other_key).table
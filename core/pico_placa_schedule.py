@@ -0,0 +1,211 @@
+"""
+Pico y Placa Schedule Module
+
+Keeps the successive versions of a city's rules, each in force from its effective date,
+so that every date is evaluated with the rules that applied on it.
+"""
+from bisect import bisect_right
+from datetime import date, datetime, time
+from typing import Iterator, List, Optional, Tuple
+
+from .pico_placa_rule_set import PicoPlacaRuleSet, NoRulesDefinedError
+
+
+class PicoPlacaSchedule:
+    """
+    A sequence of effective-dated rule set versions.
+    Each version is in force from its effective date (inclusive) until the effective date
+    of the next one; dates before the first version have no rules. The active version of
+    a date is found by binary search over the effective dates, and each version keeps its
+    own compiled table, so a lookup costs one bisect more than a single rule set.
+    Attributes:
+        effective_dates (List[date]): The effective dates, in ascending order.
+        rule_sets (List[PicoPlacaRuleSet]): The rule set of each version.
+    Methods:
+        add_version(effective_from, rule_set): Adds a version.
+        rule_set_for(day): Returns the rule set in force on a date.
+        rule_set_for_ordinal(ordinal): Same, for a date ordinal.
+        has_rules(): Checks if any version has rules.
+        is_vehicle_restricted(datetime, digit): Checks a datetime against its version.
+        next_unrestricted(datetime, digit): Finds when a vehicle may circulate again.
+        next_restricted(datetime, digit): Finds when a vehicle is next restricted.
+        restriction_calendar(digit, start_date, end_date): Lazily yields every restricted
+                                                            interval over a date range.
+    """
+
+    effective_dates: List[date]
+    rule_sets: List[PicoPlacaRuleSet]
+
+    def __init__(self):
+        self.effective_dates = []
+        self.rule_sets = []
+        self._ordinals = []
+
+    def add_version(self, effective_from: date, rule_set: PicoPlacaRuleSet):
+        """
+        Adds a rule set version.
+        Args:
+            effective_from (date): The first date on which the version is in force.
+            rule_set (PicoPlacaRuleSet): The rules of the version.
+        Raises:
+            ValueError: If a version with the same effective date already exists.
+        """
+
+        ordinal = effective_from.toordinal()
+        index = bisect_right(self._ordinals, ordinal)
+        if index and self._ordinals[index - 1] == ordinal:
+            raise ValueError(
+                f"A rule set version effective from {effective_from.isoformat()} already exists."
+            )
+        self._ordinals.insert(index, ordinal)
+        self.effective_dates.insert(index, effective_from)
+        self.rule_sets.insert(index, rule_set)
+
+    def rule_set_for(self, day: date) -> Optional[PicoPlacaRuleSet]:
+        """
+        Returns the rule set in force on a date.
+        Args:
+            day (date): The date (a datetime is also accepted).
+        Returns:
+            Optional[PicoPlacaRuleSet]: The active version, or None before the first one.
+        """
+
+        return self.rule_set_for_ordinal(day.toordinal())
+
+    def rule_set_for_ordinal(self, ordinal: int) -> Optional[PicoPlacaRuleSet]:
+        """
+        Returns the rule set in force on a date given as its proleptic Gregorian ordinal.
+        Args:
+            ordinal (int): The date ordinal, as returned by date.toordinal().
+        Returns:
+            Optional[PicoPlacaRuleSet]: The active version, or None before the first one.
+        """
+
+        index = bisect_right(self._ordinals, ordinal) - 1
+        return self.rule_sets[index] if index >= 0 else None
+
+    def has_rules(self) -> bool:
+        """
+        Check if any version has rules.
+        Returns:
+            bool: True if at least one version has at least one rule, False otherwise.
+        """
+
+        return any(rule_set.has_rules() for rule_set in self.rule_sets)
+
+    def is_vehicle_restricted(self, datetime_input: datetime, digit: int,
+                              raise_on_no_rules: bool = True) -> bool:
+        """
+        Determines if a vehicle is restricted under the rules in force at a datetime.
+        Args:
+            datetime_input (datetime): The date and time to check for restriction.
+            digit (int): The last digit of the vehicle's license plate.
+            raise_on_no_rules (bool, optional): Whether to raise an exception if no rules
+                                             are in force. Defaults to True.
+        Returns:
+            bool: True if the vehicle is restricted, False otherwise.
+        Raises:
+            NoRulesDefinedError: If no version is in force on the date, or the active one
+                                 has no rules, and raise_on_no_rules is True.
+        """
+
+        rule_set = self.rule_set_for(datetime_input)
+        if rule_set is None:
+            if raise_on_no_rules:
+                raise NoRulesDefinedError()
+            return False
+        return rule_set.is_vehicle_restricted(datetime_input, digit, raise_on_no_rules)
+
+    def next_unrestricted(self, datetime_input: datetime, digit: int) -> Optional[datetime]:
+        """
+        Finds the first moment, at or after the given datetime, when a vehicle may circulate.
+        Args:
+            datetime_input (datetime): The date and time to search from.
+            digit (int): The last digit of the vehicle's license plate.
+        Returns:
+            Optional[datetime]: The moment, or None if the vehicle stays restricted forever.
+        Raises:
+            ValueError: If a rule boundary is not aligned to a whole minute.
+        """
+
+        return self._next_change(datetime_input, digit, PicoPlacaRuleSet.next_unrestricted,
+                                 False)
+
+    def next_restricted(self, datetime_input: datetime, digit: int) -> Optional[datetime]:
+        """
+        Finds the first moment, at or after the given datetime, when a vehicle is restricted.
+        Args:
+            datetime_input (datetime): The date and time to search from.
+            digit (int): The last digit of the vehicle's license plate.
+        Returns:
+            Optional[datetime]: The moment, or None if the vehicle is never restricted again.
+        Raises:
+            ValueError: If a rule boundary is not aligned to a whole minute.
+        """
+
+        return self._next_change(datetime_input, digit, PicoPlacaRuleSet.next_restricted, True)
+
+    def restriction_calendar(self, digit: int, start_date: date,
+                             end_date: date) -> Iterator[Tuple[datetime, datetime]]:
+        """
+        Lazily yields every restricted interval of a digit over a range of dates, each date
+        following the version in force on it.
+        Args:
+            digit (int): The last digit of the vehicle's license plate.
+            start_date (date): The first date of the range.
+            end_date (date): The last date of the range (inclusive).
+        Yields:
+            Tuple[datetime, datetime]: Merged (start, end) intervals in chronological order;
+                                       start is inclusive and end exclusive.
+        """
+
+        pending = None
+        for first, last, rule_set in self._spans(start_date, end_date):
+            for start, end in rule_set.restriction_calendar(digit, first, last):
+                if pending is not None and start <= pending[1]:
+                    pending = (pending[0], max(pending[1], end))
+                else:
+                    if pending is not None:
+                        yield pending
+                    pending = (start, end)
+        if pending is not None:
+            yield pending
+
+    def _spans(self, start_date: date,
+               end_date: date) -> Iterator[Tuple[date, date, PicoPlacaRuleSet]]:
+        """Splits a date range into the parts covered by each version."""
+        index = max(bisect_right(self._ordinals, start_date.toordinal()) - 1, 0)
+        while index < len(self.rule_sets):
+            first = max(start_date, self.effective_dates[index])
+            if index + 1 < len(self.rule_sets):
+                last = min(end_date, date.fromordinal(self._ordinals[index + 1] - 1))
+            else:
+                last = end_date
+            if first > end_date:
+                return
+            if first <= last:
+                yield first, last, self.rule_sets[index]
+            index += 1
+
+    def _next_change(self, datetime_input: datetime, digit: int, find,
+                     restricted: bool) -> Optional[datetime]:
+        """Searches version by version until the change happens before the next version."""
+        moment = datetime_input
+        index = bisect_right(self._ordinals, moment.toordinal()) - 1
+        if index < 0:
+            # No rules before the first version: the vehicle may circulate
+            if not restricted:
+                return moment
+            if not self.rule_sets:
+                return None
+            index = 0
+            moment = datetime.combine(self.effective_dates[0], time())
+        while True:
+            found = find(self.rule_sets[index], moment, digit)
+            if index + 1 == len(self.rule_sets):
+                return found
+            boundary = datetime.combine(self.effective_dates[index + 1], time())
+            if found is not None and found < boundary:
+                return found
+            index += 1
+            moment = boundary
@@ -0,0 +1,76 @@
+"""
+Prediction Result Module
+
+Defines the structured result produced by batch restriction predictions.
+"""
+from typing import NamedTuple, Optional
+
+from input import LicensePlateParser, DateTimeParser
+from .pico_placa_rule import PicoPlacaRule
+from .pico_placa_rule_set import NoRulesDefinedError
+
+# Error codes reported by PredictionResult.error_code
+INVALID_LICENSE_PLATE = "invalid_license_plate"
+INVALID_DATETIME = "invalid_datetime"
+NO_RULES = "no_rules"
+# Error code of batch input records that could not be read, see RecordWriter
+INVALID_RECORD = "invalid_record"
+# Error code counted by PredictorStats when evaluating the rules raises ValueError,
+# e.g. for a datetime the rule set cannot represent
+RULE_ERROR = "rule_error"
+
+# Values of PredictionResult.verdict
+RESTRICTED = "restricted"
+NOT_RESTRICTED = "not_restricted"
+ERROR = "error"
+
+
+class PredictionResult(NamedTuple):
+    """
+    The outcome of evaluating one license plate, date and time triple.
+    Failures are recorded as an error code; the human-readable message is only built
+    when the error property is read, so batches that merely count or filter failures
+    never pay for message formatting. Being a named tuple, a result carries no
+    per-instance dictionary.
+    Attributes:
+        license_plate (str): The license plate as it was received.
+        date (str): The date string as it was received.
+        time (str): The time string as it was received.
+        restricted (Optional[bool]): Whether the vehicle is restricted, or None if the
+                                     input could not be evaluated.
+        error_code (Optional[str]): INVALID_LICENSE_PLATE, INVALID_DATETIME or NO_RULES
+                                    when evaluation failed, None otherwise.
+        rule (Optional[PicoPlacaRule]): The rule that restricts the vehicle, when it was
+                                        looked up (see PicoPlacaPredictor.evaluate).
+    """
+
+    license_plate: str
+    date: str
+    time: str
+    restricted: Optional[bool]
+    error_code: Optional[str] = None
+    rule: Optional[PicoPlacaRule] = None
+
+    @property
+    def verdict(self) -> str:
+        """
+        RESTRICTED, NOT_RESTRICTED or ERROR.
+        """
+
+        if self.error_code is not None:
+            return ERROR
+        return RESTRICTED if self.restricted else NOT_RESTRICTED
+
+    @property
+    def error(self) -> Optional[str]:
+        """
+        The error message for a failed evaluation, None otherwise.
+        """
+
+        if self.error_code is None:
+            return None
+        if self.error_code == INVALID_LICENSE_PLATE:
+            return LicensePlateParser.format_error(self.license_plate)
+        if self.error_code == INVALID_DATETIME:
+            return DateTimeParser.format_error(self.date, self.time)
+        return str(NoRulesDefinedError())
@@ -0,0 +1,157 @@
+"""
+Predictor Stats Module
+
+Collects call counts, latency histograms and error counts for the stages of a
+prediction, and reports them as a text summary or in the Prometheus text format.
+"""
+from bisect import bisect_left
+from typing import Dict, List
+
+# Stages timed by an instrumented PicoPlacaPredictor, in pipeline order
+STAGES = ("plate", "datetime", "rules", "format")
+
+# Upper bounds, in seconds, of the latency histogram buckets; a last bucket takes the rest
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3,
+                   1e-2, 1e-1)
+
+
+class PredictorStats:
+    """
+    Per-stage latency histograms and error counts of a predictor.
+    A predictor only records into a PredictorStats when one is passed to it; without one
+    it runs its uninstrumented code paths and pays nothing for the feature.
+    Attributes:
+        counts (Dict[str, int]): Number of timed calls per stage.
+        sums (Dict[str, float]): Total seconds spent per stage.
+        buckets (Dict[str, List[int]]): Calls per latency bucket and stage; entry i counts
+                                        calls slower than LATENCY_BUCKETS[i - 1] and at
+                                        most LATENCY_BUCKETS[i].
+        errors (Dict[str, int]): Failed predictions per PredictionResult error code.
+    Methods:
+        observe(stage, seconds): Records the latency of one call.
+        count_error(code): Records a failed prediction.
+        merge(other): Adds the counts of another instance, e.g. from a worker process.
+        reset(): Clears every count.
+        summary(): Formats a human-readable report.
+        to_prometheus(): Formats the counts in the Prometheus text exposition format.
+    """
+
+    __slots__ = ("counts", "sums", "buckets", "errors")
+
+    counts: Dict[str, int]
+    sums: Dict[str, float]
+    buckets: Dict[str, List[int]]
+    errors: Dict[str, int]
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Clears every count.
+        """
+
+        self.counts = dict.fromkeys(STAGES, 0)
+        self.sums = dict.fromkeys(STAGES, 0.0)
+        self.buckets = {stage: [0] * (len(LATENCY_BUCKETS) + 1) for stage in STAGES}
+        self.errors = {}
+
+    def observe(self, stage: str, seconds: float):
+        """
+        Records the latency of one call.
+        Args:
+            stage (str): One of STAGES.
+            seconds (float): How long the call took.
+        """
+
+        self.counts[stage] += 1
+        self.sums[stage] += seconds
+        self.buckets[stage][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def count_error(self, code: str):
+        """
+        Records a failed prediction.
+        Args:
+            code (str): The PredictionResult error code.
+        """
+
+        self.errors[code] = self.errors.get(code, 0) + 1
+
+    def merge(self, other: "PredictorStats"):
+        """
+        Adds the counts of another instance.
+        Args:
+            other (PredictorStats): The counts to add, e.g. those of a worker process.
+        """
+
+        for stage in STAGES:
+            self.counts[stage] += other.counts[stage]
+            self.sums[stage] += other.sums[stage]
+            self.buckets[stage] = [mine + theirs for mine, theirs
+                                   in zip(self.buckets[stage], other.buckets[stage])]
+        for code, count in other.errors.items():
+            self.errors[code] = self.errors.get(code, 0) + count
+
+    def summary(self) -> str:
+        """
+        Formats a human-readable report with the calls, mean latency and approximate
+        median and 99th percentile of every stage, followed by the error counts.
+        Percentiles are the upper bound of the histogram bucket they fall in.
+        Returns:
+            str: The report, one line per stage and error code.
+        """
+
+        lines = [f"{'stage':10} {'calls':>10} {'total s':>10} {'mean us':>10} "
+                 f"{'p50 us':>10} {'p99 us':>10}"]
+        for stage in STAGES:
+            count = self.counts[stage]
+            if not count:
+                continue
+            lines.append(f"{stage:10} {count:>10} {self.sums[stage]:>10.3f} "
+                         f"{self.sums[stage] / count * 1e6:>10.2f} "
+                         f"{_percentile(self.buckets[stage], count, 0.50):>10} "
+                         f"{_percentile(self.buckets[stage], count, 0.99):>10}")
+        for code in sorted(self.errors):
+            lines.append(f"errors[{code}]: {self.errors[code]}")
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        """
+        Formats the counts in the Prometheus text exposition format, as the
+        picoplaca_stage_duration_seconds histogram and the picoplaca_errors_total counter.
+        Returns:
+            str: The exposition text, ending with a newline.
+        """
+
+        lines = ["# HELP picoplaca_stage_duration_seconds Latency of each prediction stage.",
+                 "# TYPE picoplaca_stage_duration_seconds histogram"]
+        for stage in STAGES:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, self.buckets[stage]):
+                cumulative += count
+                lines.append(f'picoplaca_stage_duration_seconds_bucket{{stage="{stage}",'
+                             f'le="{bound!r}"}} {cumulative}')
+            lines.append(f'picoplaca_stage_duration_seconds_bucket{{stage="{stage}",'
+                         f'le="+Inf"}} {self.counts[stage]}')
+            lines.append(f'picoplaca_stage_duration_seconds_sum{{stage="{stage}"}} '
+                         f'{self.sums[stage]!r}')
+            lines.append(f'picoplaca_stage_duration_seconds_count{{stage="{stage}"}} '
+                         f'{self.counts[stage]}')
+        lines.append("# HELP picoplaca_errors_total Failed predictions by error code.")
+        lines.append("# TYPE picoplaca_errors_total counter")
+        for code in sorted(self.errors):
+            lines.append(f'picoplaca_errors_total{{code="{code}"}} {self.errors[code]}')
+        return "\n".join(lines) + "\n"
+
+
+def _percentile(buckets: List[int], count: int, fraction: float) -> str:
+    """Returns the upper bound, in microseconds, of the bucket holding a percentile."""
+    rank = fraction * count
+    seen = 0
+    for index, bucket in enumerate(buckets):
+        seen += bucket
+        if seen >= rank:
+            if index == len(LATENCY_BUCKETS):
+                return f">{LATENCY_BUCKETS[-1] * 1e6:g}"
+            return f"{LATENCY_BUCKETS[index] * 1e6:g}"
+    return "-"
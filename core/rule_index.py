@@ -0,0 +1,102 @@
+"""
+Rule Index Module
+
+Indexes a rule set's per-day rules by digit and time so lookups take logarithmic time in
+the number of rules.
+"""
+from bisect import bisect_right
+from datetime import time
+from typing import Dict, List, Tuple
+
+
+def time_to_microseconds(value: time) -> int:
+    """
+    Converts a time of day into microseconds since midnight.
+    Args:
+        value (time): The time to convert.
+    Returns:
+        int: Microseconds elapsed since 00:00.
+    """
+
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000 + value.microsecond
+
+
+class RuleIndex:
+    """
+    An exact, per-(weekday, digit) index of restricted windows.
+    For every weekday and digit the windows of all matching rules are merged into
+    disjoint intervals kept as two sorted lists of start and end times. A lookup is one
+    binary search over the starts. Unlike CompiledRuleTable, boundaries keep their full
+    microsecond precision.
+    Attributes:
+        starts (Dict[Tuple[int, int], List[int]]): Interval starts, in microseconds since
+            midnight, keyed by (weekday, digit).
+        ends (Dict[Tuple[int, int], List[int]]): The matching interval ends.
+    Methods:
+        from_rules(rules_by_day): Builds the index from a rule set's per-day rule lists.
+        is_restricted(day, time, digit): Checks a weekday and time of day for a digit.
+    """
+
+    __slots__ = ("starts", "ends")
+
+    starts: Dict[Tuple[int, int], List[int]]
+    ends: Dict[Tuple[int, int], List[int]]
+
+    def __init__(self, starts: Dict[Tuple[int, int], List[int]],
+                 ends: Dict[Tuple[int, int], List[int]]):
+        self.starts = starts
+        self.ends = ends
+
+    @classmethod
+    def from_rules(cls, rules_by_day: dict) -> "RuleIndex":
+        """
+        Builds the index from per-day rule lists.
+        Args:
+            rules_by_day (dict): A mapping of weekday (0-6) to the PicoPlacaRule objects
+                                 that apply on that day.
+        Returns:
+            RuleIndex: The index.
+        """
+
+        windows: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+        for day, rules in rules_by_day.items():
+            for rule in rules:
+                if not rule.start_time < rule.end_time:
+                    continue
+                window = (time_to_microseconds(rule.start_time),
+                          time_to_microseconds(rule.end_time))
+                for digit in rule.restricted_digits:
+                    windows.setdefault((day, digit), []).append(window)
+
+        starts, ends = {}, {}
+        for key, intervals in windows.items():
+            intervals.sort()
+            merged_starts, merged_ends = [], []
+            for start, end in intervals:
+                if merged_ends and start <= merged_ends[-1]:
+                    if end > merged_ends[-1]:
+                        merged_ends[-1] = end
+                else:
+                    merged_starts.append(start)
+                    merged_ends.append(end)
+            starts[key] = merged_starts
+            ends[key] = merged_ends
+        return cls(starts, ends)
+
+    def is_restricted(self, day: int, current_time: time, digit: int) -> bool:
+        """
+        Determines whether a digit is restricted at a weekday and time of day.
+        Args:
+            day (int): Day of the week (0 = Monday, 6 = Sunday).
+            current_time (time): The time of day to check.
+            digit (int): The last digit of the vehicle's license plate.
+        Returns:
+            bool: True if the vehicle is restricted, False otherwise.
+        """
+
+        starts = self.starts.get((day, digit))
+        if not starts:
+            return False
+        moment = time_to_microseconds(current_time)
+        index = bisect_right(starts, moment) - 1
+        return index >= 0 and moment < self.ends[(day, digit)][index]
@@ -0,0 +1,84 @@
+"""
+Rule Optimizer Module
+
+Rewrites a rule set's rules into an equivalent, smaller set by merging overlapping and
+adjacent windows, grouping identical windows and dropping rules that restrict nothing.
+"""
+from datetime import time
+from typing import Dict, FrozenSet, List, Mapping, Sequence, Tuple
+
+from .pico_placa_rule import PicoPlacaRule
+
+
+def distinct_rules(rules_by_day: Mapping[int, Sequence[PicoPlacaRule]]) -> List[PicoPlacaRule]:
+    """
+    Lists the rule objects of a rule set once each, in the order they were added.
+    Args:
+        rules_by_day (Mapping[int, Sequence[PicoPlacaRule]]): A rule set's per-day rules.
+    Returns:
+        List[PicoPlacaRule]: Every rule object, including duplicates that are equal but
+                             were added separately.
+    """
+
+    seen = set()
+    rules = []
+    for day in sorted(rules_by_day):
+        for rule in rules_by_day[day]:
+            if id(rule) not in seen:
+                seen.add(id(rule))
+                rules.append(rule)
+    return rules
+
+
+def optimize_rules(rules_by_day: Mapping[int, Sequence[PicoPlacaRule]]) -> List[PicoPlacaRule]:
+    """
+    Builds the smallest rule list, in a canonical form, that restricts exactly the same
+    (weekday, digit, time) moments as the given rules.
+    The windows of every (weekday, digit) pair are merged into disjoint intervals. The
+    digits sharing an interval on a weekday are then gathered into one rule, and rules
+    with the same interval and digits on several weekdays are gathered into one rule for
+    all of those days. Empty windows disappear along the way.
+    Args:
+        rules_by_day (Mapping[int, Sequence[PicoPlacaRule]]): A rule set's per-day rules.
+    Returns:
+        List[PicoPlacaRule]: The rewritten rules, ordered by first weekday and start time.
+    """
+
+    # (weekday, digit) -> disjoint, sorted windows
+    windows: Dict[Tuple[int, int], List[Tuple[time, time]]] = {}
+    for day, rules in rules_by_day.items():
+        for rule in rules:
+            if not rule.start_time < rule.end_time:
+                continue
+            for digit in rule.restricted_digits:
+                windows.setdefault((day, digit), []).append((rule.start_time, rule.end_time))
+
+    # (weekday, window) -> digits
+    digits_by_window: Dict[Tuple[int, Tuple[time, time]], set] = {}
+    for (day, digit), intervals in windows.items():
+        for window in _merge(intervals):
+            digits_by_window.setdefault((day, window), set()).add(digit)
+
+    # (window, digits) -> weekdays
+    days_by_group: Dict[Tuple[Tuple[time, time], FrozenSet[int]], set] = {}
+    for (day, window), digits in digits_by_window.items():
+        days_by_group.setdefault((window, frozenset(digits)), set()).add(day)
+
+    optimized = [PicoPlacaRule(days, digits, start, end)
+                 for ((start, end), digits), days in days_by_group.items()]
+    optimized.sort(key=lambda rule: (min(rule.days_of_week), rule.start_time, rule.end_time,
+                                     sorted(rule.restricted_digits)))
+    return optimized
+
+
+def _merge(intervals: List[Tuple[time, time]]) -> List[Tuple[time, time]]:
+    """Merges overlapping and adjacent (start, end) windows."""
+    intervals.sort()
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
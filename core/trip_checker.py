@@ -0,0 +1,147 @@
+"""
+Trip Checker Module
+
+Detects trips whose time span overlaps a restricted window, and measures the overlap.
+"""
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+from typing import Iterable, Iterator, NamedTuple, Tuple
+
+from .compiled_rule_table import DIGITS, MINUTES_PER_DAY, MINUTES_PER_WEEK
+from .exception_calendar import LIFTED
+from .pico_placa_rule_set import PicoPlacaRuleSet, NoRulesDefinedError
+
+# 0001-01-01 was a Monday, so whole weeks counted from it line up with the table
+_REFERENCE_MONDAY = datetime(1, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_MINUTE_US = 60 * 1_000_000
+_DAY_US = MINUTES_PER_DAY * _MINUTE_US
+_WEEK_US = MINUTES_PER_WEEK * _MINUTE_US
+
+
+class TripResult(NamedTuple):
+    """
+    The outcome of checking one trip.
+    Attributes:
+        overlaps (bool): Whether any part of the trip falls in a restricted window.
+        overlap (timedelta): How much of the trip falls in restricted windows.
+    """
+
+    overlaps: bool
+    overlap: timedelta
+
+    @property
+    def overlap_minutes(self) -> float:
+        """
+        The restricted part of the trip in minutes.
+        """
+
+        return self.overlap / timedelta(minutes=1)
+
+
+class TripChecker:
+    """
+    Checks trips, given as (digit, start, end), against a rule set.
+    Instead of sampling each trip, the checker keeps, per digit, the cumulative number
+    of restricted minutes up to every minute of the week. The restricted time before any
+    instant is then whole weeks times the weekly total plus one prefix lookup, and the
+    overlap of a trip is the difference between its end and its start, at constant cost
+    per trip whatever its length. Exception dates inside a trip are then corrected for
+    one by one, replacing the weekly schedule of each such date by its effective one.
+    Attributes:
+        rule_set (PicoPlacaRuleSet): The rule set trips are checked against.
+    Methods:
+        check(digit, start, end): Checks a single trip.
+        check_trips(trips): Checks a stream of trips.
+    """
+
+    rule_set: PicoPlacaRuleSet
+
+    def __init__(self, rule_set: PicoPlacaRuleSet):
+        self.rule_set = rule_set
+        self._table = None
+        self._prefix = None
+
+    def check(self, digit: int, start: datetime, end: datetime) -> TripResult:
+        """
+        Checks whether a trip overlaps a restricted window.
+        Args:
+            digit (int): The last digit of the vehicle's license plate.
+            start (datetime): When the trip starts (inclusive).
+            end (datetime): When the trip ends (exclusive). Trips that end before they
+                            start are treated as empty.
+        Returns:
+            TripResult: Whether the trip overlaps and by how much.
+        Raises:
+            NoRulesDefinedError: If no rules are defined in the ruleset.
+            ValueError: If a rule boundary is not aligned to a whole minute.
+        """
+
+        self._prepare()
+        if end <= start:
+            return TripResult(False, timedelta(0))
+        restricted = (self._restricted_before(digit, end)
+                      - self._restricted_before(digit, start))
+        exceptions = self.rule_set.exceptions
+        if exceptions:
+            last_day = (end - _MICROSECOND).date()
+            for day, weekday in exceptions.exceptions_between(start.date(), last_day):
+                midnight = datetime.combine(day, time())
+                first = max(start - midnight, timedelta(0)) // _MICROSECOND
+                last = min(end - midnight, timedelta(days=1)) // _MICROSECOND
+                restricted -= self._restricted_within_day(digit, day.weekday(), first, last)
+                if weekday != LIFTED:
+                    restricted += self._restricted_within_day(digit, weekday, first, last)
+        return TripResult(restricted > 0, timedelta(microseconds=restricted))
+
+    def check_trips(self, trips: Iterable[Tuple[int, datetime, datetime]]) -> Iterator[TripResult]:
+        """
+        Checks a stream of trips.
+        Args:
+            trips (Iterable[Tuple[int, datetime, datetime]]): (digit, start, end) trips.
+        Yields:
+            TripResult: One result per trip, in input order.
+        Raises:
+            NoRulesDefinedError: If no rules are defined in the ruleset.
+            ValueError: If a rule boundary is not aligned to a whole minute.
+        """
+
+        check = self.check
+        for digit, start, end in trips:
+            yield check(digit, start, end)
+
+    def _prepare(self):
+        """Builds the per-digit prefix sums for the current compiled table."""
+        table = self.rule_set.compile()
+        if table is self._table:
+            return
+        if not table.has_rules:
+            raise NoRulesDefinedError()
+        flags = table.table
+        self._prefix = [
+            list(accumulate(flags[digit * MINUTES_PER_WEEK:(digit + 1) * MINUTES_PER_WEEK],
+                            initial=0))
+            for digit in range(DIGITS)]
+        self._table = table
+
+    def _restricted_before(self, digit: int, moment: datetime) -> int:
+        """Restricted microseconds between the reference Monday and a moment."""
+        weeks, within = divmod((moment - _REFERENCE_MONDAY) // _MICROSECOND, _WEEK_US)
+        return (weeks * self._prefix[digit][MINUTES_PER_WEEK] * _MINUTE_US
+                + self._restricted_in_week(digit, within))
+
+    def _restricted_in_week(self, digit: int, within: int) -> int:
+        """Restricted microseconds between Monday 00:00 and an offset into the week."""
+        minute, partial = divmod(within, _MINUTE_US)
+        if minute == MINUTES_PER_WEEK:
+            return self._prefix[digit][MINUTES_PER_WEEK] * _MINUTE_US
+        restricted = self._prefix[digit][minute] * _MINUTE_US
+        if self._table.table[digit * MINUTES_PER_WEEK + minute]:
+            restricted += partial
+        return restricted
+
+    def _restricted_within_day(self, digit: int, weekday: int, first: int, last: int) -> int:
+        """Restricted microseconds between two offsets into a day of the weekly schedule."""
+        day_start = weekday * _DAY_US
+        return (self._restricted_in_week(digit, day_start + last)
+                - self._restricted_in_week(digit, day_start + first))
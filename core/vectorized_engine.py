@@ -0,0 +1,137 @@
+"""
+Vectorized Engine Module
+
+Evaluates Pico y Placa restrictions over whole columns of plate digits and timestamps
+using NumPy. NumPy is an optional dependency and is only required by this module.
+"""
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without NumPy installed
+    np = None
+
+from .compiled_rule_table import MINUTES_PER_DAY, MINUTES_PER_WEEK
+from .exception_calendar import LIFTED
+from .pico_placa_rule_set import PicoPlacaRuleSet, NoRulesDefinedError
+from .rule_index import time_to_microseconds
+
+# 1970-01-01, the datetime64 epoch, was a Thursday (weekday 3)
+_EPOCH_WEEKDAY = 3
+_EPOCH_ORDINAL = 719163
+_MICROSECONDS_PER_DAY = MINUTES_PER_DAY * 60 * 1_000_000
+
+
+class VectorizedEngine:
+    """
+    Evaluates restrictions for arrays of digits and timestamps in bulk.
+    Minute-aligned rule sets are evaluated by gathering from the compiled lookup table;
+    rule sets with sub-minute boundaries are evaluated rule by rule with array
+    comparisons. Both produce the same results as PicoPlacaRuleSet.is_vehicle_restricted,
+    including the rule set's exception dates, which are resolved through a dense array
+    indexed by day so that each row costs one lookup.
+    Attributes:
+        rule_set (PicoPlacaRuleSet): The rule set being evaluated.
+    Methods:
+        is_restricted(digits, timestamps): Returns a boolean restriction mask.
+    """
+
+    rule_set: PicoPlacaRuleSet
+
+    def __init__(self, rule_set: PicoPlacaRuleSet):
+        if np is None:
+            raise ImportError("VectorizedEngine requires NumPy (pip install numpy).")
+        self.rule_set = rule_set
+
+    def is_restricted(self, digits, timestamps, raise_on_no_rules: bool = True):
+        """
+        Determines which (digit, timestamp) pairs are restricted.
+        Args:
+            digits (array-like): Last license plate digits (0-9), e.g. a uint8 array.
+            timestamps (array-like): Naive local timestamps as datetime64 values of any
+                                     resolution. NaT entries are reported as not restricted.
+            raise_on_no_rules (bool, optional): Whether to raise an exception if no rules
+                                             are defined. Defaults to True.
+        Returns:
+            numpy.ndarray: A boolean mask with one entry per input row.
+        Raises:
+            ValueError: If the arrays have different shapes.
+            IndexError: If a digit is outside the range 0-9.
+            NoRulesDefinedError: If no rules are defined in the ruleset and
+                                 raise_on_no_rules is True.
+        """
+
+        digits = np.asarray(digits)
+        timestamps = np.asarray(timestamps, dtype="datetime64[us]")
+        if digits.shape != timestamps.shape:
+            raise ValueError(
+                f"digits and timestamps must have the same shape, "
+                f"got {digits.shape} and {timestamps.shape}."
+            )
+        if not self.rule_set.has_rules():
+            if raise_on_no_rules:
+                raise NoRulesDefinedError()
+            return np.zeros(digits.shape, dtype=bool)
+
+        weekdays = self._effective_weekdays(timestamps) if self.rule_set.exceptions else None
+        try:
+            table = self.rule_set.compile()
+        except ValueError:
+            mask = self._evaluate_rules(digits, timestamps, weekdays)
+        else:
+            mask = self._gather(table, digits, timestamps, weekdays)
+        if np.isnat(timestamps).any():
+            mask &= ~np.isnat(timestamps)
+        return mask
+
+    def _effective_weekdays(self, timestamps):
+        """Returns the weekday whose rules apply to every row, or LIFTED."""
+        days = timestamps.astype("datetime64[D]").astype(np.int64)
+        weekdays = np.mod(days + _EPOCH_WEEKDAY, 7)
+        overrides = self.rule_set.exceptions.overrides
+        first = min(overrides) - _EPOCH_ORDINAL
+        codes = np.full(max(overrides) - _EPOCH_ORDINAL - first + 1, 7, dtype=np.int8)
+        for ordinal, weekday in overrides.items():
+            codes[ordinal - _EPOCH_ORDINAL - first] = weekday
+        offsets = days - first
+        in_range = (offsets >= 0) & (offsets < codes.size)
+        override = codes[np.where(in_range, offsets, 0)]
+        return np.where(in_range & (override != 7), override, weekdays)
+
+    @staticmethod
+    def _gather(table, digits, timestamps, weekdays=None):
+        """Looks every row up in the compiled minute-of-week table."""
+        if digits.size and (digits.min() < 0 or digits.max() > 9):
+            raise IndexError("License plate digits must be between 0 and 9.")
+        flags = np.frombuffer(table.table, dtype=np.bool_)
+        minutes = timestamps.astype("datetime64[m]").astype(np.int64)
+        if weekdays is None:
+            minutes += _EPOCH_WEEKDAY * MINUTES_PER_DAY
+            index = np.mod(minutes, MINUTES_PER_WEEK, out=minutes)
+        else:
+            index = np.mod(minutes, MINUTES_PER_DAY, out=minutes)
+            index += np.maximum(weekdays, 0) * MINUTES_PER_DAY
+        index += digits.astype(np.int64) * MINUTES_PER_WEEK
+        mask = flags[index]
+        if weekdays is not None:
+            mask &= weekdays != LIFTED
+        return mask
+
+    def _evaluate_rules(self, digits, timestamps, weekdays=None):
+        """Evaluates every rule window as array comparisons."""
+        micros = timestamps.astype(np.int64)
+        days = np.floor_divide(micros, _MICROSECONDS_PER_DAY)
+        time_of_day = micros - days * _MICROSECONDS_PER_DAY
+        if weekdays is None:
+            weekdays = np.mod(days + _EPOCH_WEEKDAY, 7)
+
+        mask = np.zeros(digits.shape, dtype=bool)
+        for day, rules in self.rule_set.rules_by_day.items():
+            if not rules:
+                continue
+            on_day = weekdays == day
+            for rule in rules:
+                start = time_to_microseconds(rule.start_time)
+                end = time_to_microseconds(rule.end_time)
+                mask |= (on_day & np.isin(digits, list(rule.restricted_digits))
+                         & (time_of_day >= start) & (time_of_day < end))
+        return mask
+
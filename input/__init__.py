@@ -2,7 +2,33 @@
 Input package for the PicoPlaca system.
 Contains modules for parsing and validating user inputs.
 """
-from .date_time_parser import DateTimeParser
-from .license_plate_parser import LicensePlateParser
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ["DateTimeParser", "LicensePlateParser"]
+if TYPE_CHECKING:
+    from .date_time_parser import DateTimeParser
+    from .license_plate_parser import LicensePlateParser
+    from .time_zone_converter import TimeZoneConverter
+
+_EXPORTS = {
+    "DateTimeParser": ".date_time_parser",
+    "LicensePlateParser": ".license_plate_parser",
+    "TimeZoneConverter": ".time_zone_converter",
+}
+
+__all__ = ["DateTimeParser", "LicensePlateParser", "TimeZoneConverter"]
+
+
+def __getattr__(name: str):
+    """Imports an export on first access."""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """Lists the exports alongside the names already loaded."""
+    return sorted(set(globals()) | set(__all__))
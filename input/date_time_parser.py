@@ -3,7 +3,16 @@ Date Time Parser Module
 
 Converts string representations of dates and times into datetime objects for restriction rules.
 """
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+
+_MINUTES_PER_DAY = 24 * 60
+_MINUTES_PER_WEEK = 7 * _MINUTES_PER_DAY
+# 1970-01-01, the Unix epoch, was a Thursday (weekday 3)
+_EPOCH_WEEKDAY = 3
+# Days in each month of a non-leap year, and days before the start of each month
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+_DAYS_BEFORE_MONTH = (0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
 
 
 class DateTimeParser:
@@ -17,6 +26,18 @@ class DateTimeParser:
             datetime: The parsed datetime object.
         Raises:
             ValueError: If the string format is invalid or cannot be parsed.
+        try_parse_datetime(date_str: str, time_str: str) -> Optional[datetime]:
+            Same as parse_datetime, but returns None instead of raising.
+        parse_date(date_str: str) -> date:
+            Parses a date string on its own.
+        try_parse_minute_of_week(date_str: str, time_str: str) -> Optional[int]:
+            Parses straight to the minute of the week, without building a datetime.
+        try_parse_ordinal_minute(date_str: str, time_str: str) -> Optional[Tuple[int, int]]:
+            Parses straight to the date ordinal and the minute of the day.
+        minute_of_week_from_epoch(seconds: float) -> int:
+            Converts epoch seconds to the minute of the week.
+        format_error(date_str: str, time_str: str) -> str:
+            Builds the error message for an unparseable date and time.
     """
 
     @staticmethod
@@ -33,9 +54,245 @@ class DateTimeParser:
                       with the expected format 'YYYY-MM-DD HH:MM'.
         """
 
-        date_time_str: str = date_str + " " + time_str
+        date_time = DateTimeParser.try_parse_datetime(date_str, time_str)
+        if date_time is None:
+            raise ValueError(DateTimeParser.format_error(date_str, time_str))
+        return date_time
+
+    @staticmethod
+    def parse_date(date_str: str) -> date:
+        """
+        Parses a date string on its own.
+        Args:
+            date_str (str): The date string in format 'YYYY-MM-DD'.
+        Returns:
+            date: The parsed date.
+        Raises:
+            ValueError: If the string cannot be parsed with the format 'YYYY-MM-DD'.
+        """
+
+        date_time = DateTimeParser.try_parse_datetime(date_str, "00:00")
+        if date_time is None:
+            raise ValueError(f"Unable to parse '{date_str}'. Expected format: 'YYYY-MM-DD'")
+        return date_time.date()
+
+    @staticmethod
+    def try_parse_datetime(date_str: str, time_str: str) -> Optional[datetime]:
+        """
+        Combines and parses date and time strings without raising on invalid input.
+        Args:
+            date_str (str): The date string in format 'YYYY-MM-DD'.
+            time_str (str): The time string in format 'HH:MM'.
+        Returns:
+            Optional[datetime]: The parsed date and time, or None if they cannot be parsed.
+        """
+
+        # Canonical dates and times are memoized as midnight and an offset from it, so a
+        # datetime is built by one addition, without splitting the strings again
+        midnight = _MIDNIGHTS.get(date_str)
+        if midnight is None:
+            midnight = _midnight(date_str)
+        delta = _CLOCK_DELTAS.get(time_str)
+        if delta is None:
+            delta = _clock_delta(time_str)
+        if midnight is not None and delta is not None:
+            return midnight + delta
         try:
-            return datetime.strptime(date_time_str, "%Y-%m-%d %H:%M")
-        except ValueError as exc:
-            error_msg = "Unable to parse '{}'. Expected format: 'YYYY-MM-DD HH:MM'"
-            raise ValueError(error_msg.format(date_time_str)) from exc
+            # Anything but the canonical zero-padded layout goes through strptime,
+            # which accepts a few looser spellings such as '2023-1-2 8:00'
+            return datetime.strptime(date_str + " " + time_str, "%Y-%m-%d %H:%M")
+        except ValueError:
+            return None
+
+    @staticmethod
+    def try_parse_minute_of_week(date_str: str, time_str: str) -> Optional[int]:
+        """
+        Parses date and time strings directly into the minute of the week.
+        This accepts exactly what try_parse_datetime accepts, but canonical inputs are
+        validated and converted with integer arithmetic only, and the results for each
+        distinct date and time string are memoized, since that is all the compiled rule
+        table needs.
+        Args:
+            date_str (str): The date string in format 'YYYY-MM-DD'.
+            time_str (str): The time string in format 'HH:MM'.
+        Returns:
+            Optional[int]: Minutes since Monday 00:00, or None if the strings cannot be
+                           parsed.
+        """
+
+        day = _DAY_OFFSETS.get(date_str)
+        if day is None:
+            day = _day_offset(date_str)
+        clock = _CLOCK_OFFSETS.get(time_str)
+        if clock is None:
+            clock = _clock_offset(time_str)
+        if day is not None and clock is not None:
+            return day + clock
+
+        date_time = DateTimeParser.try_parse_datetime(date_str, time_str)
+        if date_time is None:
+            return None
+        return date_time.weekday() * _MINUTES_PER_DAY + date_time.hour * 60 + date_time.minute
+
+    @staticmethod
+    def try_parse_ordinal_minute(date_str: str, time_str: str) -> Optional[Tuple[int, int]]:
+        """
+        Parses date and time strings into the date's proleptic Gregorian ordinal (as
+        date.toordinal) and the minute of the day, for lookups that depend on the date
+        itself. Canonical inputs take the same memoized fast path as
+        try_parse_minute_of_week.
+        Args:
+            date_str (str): The date string in format 'YYYY-MM-DD'.
+            time_str (str): The time string in format 'HH:MM'.
+        Returns:
+            Optional[Tuple[int, int]]: (ordinal, minutes since midnight), or None if the
+                                       strings cannot be parsed.
+        """
+
+        ordinal = _DAY_ORDINALS.get(date_str)
+        if ordinal is None:
+            ordinal = _day_ordinal(date_str)
+        clock = _CLOCK_OFFSETS.get(time_str)
+        if clock is None:
+            clock = _clock_offset(time_str)
+        if ordinal is not None and clock is not None:
+            return ordinal, clock
+
+        date_time = DateTimeParser.try_parse_datetime(date_str, time_str)
+        if date_time is None:
+            return None
+        return date_time.toordinal(), date_time.hour * 60 + date_time.minute
+
+    @staticmethod
+    def minute_of_week_from_epoch(seconds: float) -> int:
+        """
+        Converts Unix epoch seconds into the minute of the week.
+        The epoch value is read as wall-clock time, with no time zone conversion.
+        Args:
+            seconds (float): Seconds since 1970-01-01 00:00.
+        Returns:
+            int: Minutes since Monday 00:00.
+        """
+
+        return (int(seconds // 60) + _EPOCH_WEEKDAY * _MINUTES_PER_DAY) % _MINUTES_PER_WEEK
+
+    @staticmethod
+    def format_error(date_str: str, time_str: str) -> str:
+        """
+        Builds the message reported for an unparseable date and time.
+        Args:
+            date_str (str): The date string that failed to parse.
+            time_str (str): The time string that failed to parse.
+        Returns:
+            str: A message describing the expected format.
+        """
+
+        return (f"Unable to parse '{date_str} {time_str}'. "
+                "Expected format: 'YYYY-MM-DD HH:MM'")
+
+
+# Memoized minute offsets, ordinals, midnights and clock offsets of canonical date and
+# time strings seen so far
+_DAY_OFFSETS = {}
+_DAY_ORDINALS = {}
+_MIDNIGHTS = {}
+_CLOCK_OFFSETS = {}
+_CLOCK_DELTAS = {}
+_OFFSET_CACHE_SIZE = 65536
+
+
+def _midnight(date_str: str) -> Optional[datetime]:
+    """
+    Validates a canonical 'YYYY-MM-DD' date and returns midnight of that day,
+    or None if it is not a valid canonical date.
+    """
+
+    ordinal = _DAY_ORDINALS.get(date_str)
+    if ordinal is None:
+        ordinal = _day_ordinal(date_str)
+        if ordinal is None:
+            return None
+    midnight = datetime.fromordinal(ordinal)
+    if len(_MIDNIGHTS) >= _OFFSET_CACHE_SIZE:
+        _MIDNIGHTS.clear()
+    _MIDNIGHTS[date_str] = midnight
+    return midnight
+
+
+def _day_offset(date_str: str) -> Optional[int]:
+    """
+    Validates a canonical 'YYYY-MM-DD' date and returns its weekday in minutes,
+    or None if it is not a valid canonical date.
+    """
+
+    ordinal = _DAY_ORDINALS.get(date_str)
+    if ordinal is None:
+        ordinal = _day_ordinal(date_str)
+        if ordinal is None:
+            return None
+    offset = (ordinal - 1) % 7 * _MINUTES_PER_DAY
+    if len(_DAY_OFFSETS) >= _OFFSET_CACHE_SIZE:
+        _DAY_OFFSETS.clear()
+    _DAY_OFFSETS[date_str] = offset
+    return offset
+
+
+def _day_ordinal(date_str: str) -> Optional[int]:
+    """
+    Validates a canonical 'YYYY-MM-DD' date and returns its proleptic Gregorian
+    ordinal, or None if it is not a valid canonical date.
+    """
+
+    if len(date_str) != 10 or date_str[4] != "-" or date_str[7] != "-":
+        return None
+    digits = date_str[:4] + date_str[5:7] + date_str[8:]
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    year, month, day = int(date_str[:4]), int(date_str[5:7]), int(date_str[8:])
+    if year < 1 or not 1 <= month <= 12 or day < 1:
+        return None
+    leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if day > _DAYS_IN_MONTH[month] + (leap and month == 2):
+        return None
+    # Proleptic Gregorian ordinal, as date.toordinal(): 0001-01-01 is day 1, a Monday
+    previous = year - 1
+    ordinal = (previous * 365 + previous // 4 - previous // 100 + previous // 400
+               + _DAYS_BEFORE_MONTH[month] + (leap and month > 2) + day)
+    if len(_DAY_ORDINALS) >= _OFFSET_CACHE_SIZE:
+        _DAY_ORDINALS.clear()
+    _DAY_ORDINALS[date_str] = ordinal
+    return ordinal
+
+
+def _clock_offset(time_str: str) -> Optional[int]:
+    """
+    Validates a canonical 'HH:MM' time and returns its minutes since midnight,
+    or None if it is not a valid canonical time.
+    """
+
+    if len(time_str) != 5 or time_str[2] != ":":
+        return None
+    digits = time_str[:2] + time_str[3:]
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    hour, minute = int(time_str[:2]), int(time_str[3:])
+    if hour > 23 or minute > 59:
+        return None
+    offset = hour * 60 + minute
+    _CLOCK_OFFSETS[time_str] = offset
+    return offset
+
+
+def _clock_delta(time_str: str) -> Optional[timedelta]:
+    """
+    Validates a canonical 'HH:MM' time and returns its offset from midnight,
+    or None if it is not a valid canonical time.
+    """
+
+    offset = _CLOCK_OFFSETS.get(time_str)
+    if offset is None:
+        offset = _clock_offset(time_str)
+        if offset is None:
+            return None
+    delta = _CLOCK_DELTAS[time_str] = timedelta(minutes=offset)
+    return delta
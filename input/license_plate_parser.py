@@ -4,6 +4,9 @@ License Plate Parser Module
 Validates license plates and extracts the last digit used for determining driving restrictions.
 """
 import re
+from typing import Optional
+
+_LICENSE_PLATE_PATTERN = re.compile(r"[A-Z]{3}-[0-9]{3,4}\Z")
 
 
 class LicensePlateParser:
@@ -22,6 +25,10 @@ class LicensePlateParser:
                 int: The last digit of the license plate as an integer if the format is valid.
             Raises:
                 ValueError: If the license plate format is invalid.
+        try_parse_license_plate(license_plate: str) -> Optional[int]:
+            Same as parse_license_plate, but returns None instead of raising.
+        format_error(license_plate: str) -> str:
+            Builds the error message for an invalid license plate.
     """
 
     @staticmethod
@@ -38,10 +45,37 @@ class LicensePlateParser:
             ValueError: If the license plate format is invalid.
         """
 
-        if re.match("^[A-Z]{3}-[0-9]{3,4}$", license_plate):
-            return int(license_plate[-1])
-        else:
-            raise ValueError(
-                f"Invalid license plate format: '{license_plate}'. "
-                "Expected format: 'XXX-###' or 'XXX-####'"
-            )
+        digit = LicensePlateParser.try_parse_license_plate(license_plate)
+        if digit is None:
+            raise ValueError(LicensePlateParser.format_error(license_plate))
+        return digit
+
+    @staticmethod
+    def try_parse_license_plate(license_plate: str) -> Optional[int]:
+        """
+        Extracts the last digit of a license plate string without raising on invalid input.
+        This is the validation path used by batch predictions, where invalid rows are
+        common and the cost of building exceptions and messages would dominate.
+        Args:
+            license_plate (str): The license plate string to parse.
+        Returns:
+            Optional[int]: The last digit of the license plate, or None if the format is
+                           invalid.
+        """
+
+        if _LICENSE_PLATE_PATTERN.match(license_plate):
+            return ord(license_plate[-1]) - 48
+        return None
+
+    @staticmethod
+    def format_error(license_plate: str) -> str:
+        """
+        Builds the message reported for an invalid license plate.
+        Args:
+            license_plate (str): The invalid license plate string.
+        Returns:
+            str: A message describing the expected format.
+        """
+
+        return (f"Invalid license plate format: '{license_plate}'. "
+                "Expected format: 'XXX-###' or 'XXX-####'")
@@ -0,0 +1,117 @@
+"""
+Record Reader Module
+
+Streams license plate, date and time records from CSV or JSON-lines input for batch checks.
+"""
+import csv
+import json
+from typing import Dict, Iterator, NamedTuple, Optional, TextIO, Tuple
+
+FIELDS = ("plate", "date", "time")
+FORMATS = ("csv", "jsonl")
+
+
+class Record(NamedTuple):
+    """
+    A single input record.
+    Attributes:
+        line_number (int): The line of the input where the record starts.
+        fields (Dict[str, str]): The record's fields as read, passed through to the output.
+        triple (Optional[Tuple[str, str, str]]): The (plate, date, time) values to check,
+                                                 or None if the record is malformed.
+        error (Optional[str]): Why the record is malformed, None otherwise.
+    """
+
+    line_number: int
+    fields: Dict[str, str]
+    triple: Optional[Tuple[str, str, str]]
+    error: Optional[str] = None
+
+
+class RecordReader:
+    """
+    Reads records lazily from a text stream, one at a time, so memory use does not
+    depend on the size of the input.
+    CSV input must have a header row with 'plate', 'date' and 'time' columns; JSON-lines
+    input must have one object with those keys per line. Extra columns or keys are kept
+    and passed through. Malformed records are yielded with an error instead of aborting.
+    Attributes:
+        stream (TextIO): The text stream to read from.
+        format (str): Either 'csv' or 'jsonl'.
+        first_line (int): The line number reported for the first line of the stream, for
+                          streams that hold a slice of a larger file.
+    """
+
+    stream: TextIO
+    format: str
+    first_line: int
+
+    def __init__(self, stream: TextIO, fmt: str, first_line: int = 1):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported input format: '{fmt}'. Expected one of {FORMATS}")
+        self.stream = stream
+        self.format = fmt
+        self.first_line = first_line
+
+    @staticmethod
+    def detect_format(path: str) -> str:
+        """
+        Guesses the record format from a file name.
+        Args:
+            path (str): The file name, or '-' for standard input.
+        Returns:
+            str: 'jsonl' for .jsonl, .ndjson and .json files, 'csv' otherwise.
+        """
+
+        if path.lower().endswith((".jsonl", ".ndjson", ".json")):
+            return "jsonl"
+        return "csv"
+
+    def __iter__(self) -> Iterator[Record]:
+        if self.format == "csv":
+            return self._read_csv()
+        return self._read_jsonl()
+
+    def _read_csv(self) -> Iterator[Record]:
+        reader = csv.DictReader(self.stream)
+        offset = self.first_line - 1
+        missing = [name for name in FIELDS if name not in (reader.fieldnames or ())]
+        if missing:
+            yield Record(self.first_line, {}, None,
+                         f"line {self.first_line}: missing CSV column(s): {', '.join(missing)}")
+            return
+        line_number = reader.line_num + offset
+        try:
+            for row in reader:
+                line_number = reader.line_num + offset
+                yield _make_record(line_number, row)
+        except csv.Error as exc:
+            yield Record(line_number + 1, {}, None, f"line {line_number + 1}: {exc}")
+
+    def _read_jsonl(self) -> Iterator[Record]:
+        for line_number, line in enumerate(self.stream, start=self.first_line):
+            if not line.strip():
+                continue
+            try:
+                fields = json.loads(line)
+            except ValueError as exc:
+                yield Record(line_number, {}, None, f"line {line_number}: invalid JSON: {exc}")
+                continue
+            if not isinstance(fields, dict):
+                yield Record(line_number, {}, None,
+                             f"line {line_number}: expected a JSON object")
+                continue
+            yield _make_record(line_number, fields)
+
+
+def _make_record(line_number: int, fields: dict) -> Record:
+    """Validates that a record has string plate, date and time fields."""
+    values = []
+    for name in FIELDS:
+        value = fields.get(name)
+        if not isinstance(value, str):
+            reason = "missing" if value is None else "not a string"
+            return Record(line_number, fields, None,
+                          f"line {line_number}: field '{name}' is {reason}")
+        values.append(value)
+    return Record(line_number, fields, tuple(values))
@@ -0,0 +1,366 @@
+"""
+Rule Config Loader Module
+
+Loads Pico y Placa rule sets from JSON or TOML files that describe one or more named
+regions, and caches the parsed and compiled result on disk in a user-private directory.
+"""
+import base64
+import hashlib
+import json
+import os
+import zlib
+from datetime import date, time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+from core.compiled_rule_table import CompiledRuleTable, DIGITS, MINUTES_PER_WEEK
+from core.exception_calendar import ExceptionCalendar
+from core.pico_placa_rule import PicoPlacaRule
+from core.pico_placa_rule_set import PicoPlacaRuleSet
+
+# Bumped whenever the layout of the cache file changes
+CACHE_FORMAT = 3
+
+# Overrides the directory caches are kept in
+CACHE_DIR_VARIABLE = "PICOPLACA_CACHE_DIR"
+
+DAY_NAMES = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+class RuleConfigError(ValueError):
+    """Exception raised when a rule configuration file is invalid."""
+
+
+class RuleConfigLoader:
+    """
+    Loads rule sets from declarative configuration files.
+    A configuration holds named regions, each with a list of rules. Every rule names its
+    days (0-6 or day names), its restricted digits and one or more time windows:
+        {
+          "default_region": "quito",
+          "regions": {
+            "quito": {
+              "rules": [
+                {"days": ["monday"], "digits": [1, 2],
+                 "windows": [["06:00", "09:30"], ["16:00", "20:00"]]}
+              ],
+              "exceptions": {
+                "lifted": ["2023-12-25"],
+                "restricted_as": {"2023-12-23": "monday"}
+              }
+            }
+          }
+        }
+    TOML files follow the same structure. Each window becomes one PicoPlacaRule. The
+    optional exceptions become the rule set's ExceptionCalendar: 'lifted' dates have no
+    restrictions and 'restricted_as' dates follow the rules of the given weekday.
+    Parsed rules and their compiled tables are cached as plain JSON, together with the
+    SHA-256 of the source contents, so later loads of an unchanged file skip both parsing
+    and compilation. Caches are kept in a directory only the current user can write
+    ($PICOPLACA_CACHE_DIR, else $XDG_CACHE_HOME/picoplaca or ~/.cache/picoplaca), and
+    their contents are validated like a configuration, so a cache is never executed.
+    Methods:
+        load(path, region, use_cache): Loads the rule set of a region.
+        parse(data, path): Converts a decoded configuration into per-region rules and
+                           exception calendars.
+        cache_path(path): Returns where the cache of a configuration file is kept.
+    """
+
+    @staticmethod
+    def load(path: str, region: Optional[str] = None, use_cache: bool = True) -> PicoPlacaRuleSet:
+        """
+        Loads the rule set of a region from a JSON or TOML file.
+        Args:
+            path (str): The configuration file; '.toml' files are read as TOML, others as JSON.
+            region (Optional[str]): The region to load. Defaults to the file's
+                                    'default_region', or to its only region.
+            use_cache (bool): Whether to read and write the on-disk cache.
+        Returns:
+            PicoPlacaRuleSet: The region's rule set, with its compiled table attached when
+                              every rule boundary is minute-aligned.
+        Raises:
+            OSError: If the file cannot be read.
+            RuleConfigError: If the file is invalid or the region does not exist.
+        """
+
+        with open(path, "rb") as source:
+            content = source.read()
+        digest = hashlib.sha256(content).hexdigest()
+        cache_file = RuleConfigLoader.cache_path(path)
+
+        regions = _read_cache(cache_file, digest) if use_cache else None
+        if regions is None:
+            default, parsed = RuleConfigLoader.parse(_decode(path, content), path)
+            regions = {"default_region": default, "regions": {
+                name: (rules, _try_compile(rules), exceptions)
+                for name, (rules, exceptions) in parsed.items()}}
+            if use_cache:
+                _write_cache(cache_file, digest, regions)
+
+        name = _select_region(path, regions, region)
+        rules, compiled, exceptions = regions["regions"][name]
+        rule_set = PicoPlacaRuleSet.from_rules(rules, compiled)
+        rule_set.exceptions = exceptions
+        return rule_set
+
+    @staticmethod
+    def parse(data: dict, path: str = "<config>") -> Tuple[
+            Optional[str], Dict[str, Tuple[List[PicoPlacaRule], ExceptionCalendar]]]:
+        """
+        Converts a decoded configuration into per-region rules and exception calendars.
+        Args:
+            data (dict): The decoded JSON or TOML document.
+            path (str): The file name used in error messages.
+        Returns:
+            Tuple[Optional[str], Dict[str, Tuple[List[PicoPlacaRule], ExceptionCalendar]]]:
+                The default region, if any, and the rules and exceptions of every region.
+        Raises:
+            RuleConfigError: If the configuration is invalid.
+        """
+
+        if not isinstance(data, dict) or not isinstance(data.get("regions"), dict) \
+                or not data["regions"]:
+            raise RuleConfigError(f"{path}: expected a non-empty 'regions' table")
+        default = data.get("default_region")
+        if default is not None and default not in data["regions"]:
+            raise RuleConfigError(f"{path}: default_region '{default}' is not defined")
+
+        regions = {}
+        for name, region in data["regions"].items():
+            if not isinstance(region, dict) or not isinstance(region.get("rules"), list):
+                raise RuleConfigError(f"{path}: region '{name}' needs a 'rules' list")
+            rules = []
+            for number, entry in enumerate(region["rules"], start=1):
+                rules.extend(_parse_rule(entry, f"{path}: region '{name}', rule {number}"))
+            exceptions = _parse_exceptions(region.get("exceptions", {}),
+                                           f"{path}: region '{name}', exceptions")
+            regions[name] = (rules, exceptions)
+        return default, regions
+
+    @staticmethod
+    def cache_path(path: str) -> str:
+        """
+        Returns where the cache of a configuration file is kept.
+        Args:
+            path (str): The configuration file.
+        Returns:
+            str: A JSON file in the cache directory, named after the configuration's
+                 absolute path.
+        """
+
+        directory = os.environ.get(CACHE_DIR_VARIABLE)
+        if not directory:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+                os.path.expanduser("~"), ".cache")
+            directory = os.path.join(base, "picoplaca")
+        absolute = os.path.realpath(path)
+        key = hashlib.sha256(absolute.encode("utf-8", "surrogateescape")).hexdigest()[:32]
+        return os.path.join(directory, f"{os.path.basename(absolute)}.{key}.json")
+
+
+def _decode(path: str, content: bytes) -> dict:
+    """Decodes the raw contents of a configuration file."""
+    try:
+        if path.lower().endswith(".toml"):
+            if tomllib is None:
+                raise RuleConfigError(
+                    f"{path}: reading TOML needs Python 3.11 or the 'tomli' package")
+            return tomllib.loads(content.decode("utf-8"))
+        return json.loads(content)
+    except RuleConfigError:
+        raise
+    except ValueError as exc:
+        raise RuleConfigError(f"{path}: {exc}") from exc
+
+
+def _parse_rule(entry: dict, where: str) -> List[PicoPlacaRule]:
+    """Converts one rule entry into a PicoPlacaRule per time window."""
+    if not isinstance(entry, dict):
+        raise RuleConfigError(f"{where}: expected a table")
+    days = [_parse_day(day, where) for day in _require_list(entry, "days", where)]
+    digits = _require_list(entry, "digits", where)
+    for digit in digits:
+        if type(digit) is not int or not 0 <= digit <= 9:
+            raise RuleConfigError(f"{where}: digit {digit!r} is not between 0 and 9")
+    windows = _require_list(entry, "windows", where)
+    rules = []
+    for window in windows:
+        if not isinstance(window, list) or len(window) != 2:
+            raise RuleConfigError(f"{where}: window {window!r} must be a [start, end] pair")
+        start, end = (_parse_time(value, where) for value in window)
+        if not start < end:
+            raise RuleConfigError(f"{where}: window {window!r} ends before it starts")
+        rules.append(PicoPlacaRule(days_of_week=days, restricted_digits=digits,
+                                   start_time=start, end_time=end))
+    return rules
+
+
+def _parse_exceptions(entry: dict, where: str) -> ExceptionCalendar:
+    """Converts a region's exceptions table into an ExceptionCalendar."""
+    if not isinstance(entry, dict):
+        raise RuleConfigError(f"{where}: expected a table")
+    lifted = entry.get("lifted", [])
+    restricted_as = entry.get("restricted_as", {})
+    if not isinstance(lifted, list) or not isinstance(restricted_as, dict):
+        raise RuleConfigError(f"{where}: 'lifted' must be a list and 'restricted_as' a table")
+    calendar = ExceptionCalendar()
+    for value in lifted:
+        calendar.lift(_parse_date(value, where))
+    for value, weekday in restricted_as.items():
+        calendar.restrict_as(_parse_date(value, where), _parse_day(weekday, where))
+    return calendar
+
+
+def _require_list(entry: dict, key: str, where: str) -> list:
+    """Returns a non-empty list field of a rule entry."""
+    value = entry.get(key)
+    if not isinstance(value, list) or not value:
+        raise RuleConfigError(f"{where}: '{key}' must be a non-empty list")
+    return value
+
+
+def _parse_day(value, where: str) -> int:
+    """Converts a day number (0 = Monday) or day name into a weekday."""
+    if type(value) is int and 0 <= value <= 6:
+        return value
+    if isinstance(value, str) and value.lower() in DAY_NAMES:
+        return DAY_NAMES.index(value.lower())
+    raise RuleConfigError(f"{where}: unknown day {value!r}")
+
+
+def _parse_date(value, where: str) -> date:
+    """Converts a 'YYYY-MM-DD' string, or a TOML local date, into a date."""
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+    raise RuleConfigError(f"{where}: invalid date {value!r}, expected YYYY-MM-DD")
+
+
+def _parse_time(value, where: str) -> time:
+    """Converts an 'HH:MM' string, or a TOML local time, into a naive whole-minute time."""
+    parsed = None
+    if isinstance(value, time):
+        parsed = value
+    elif isinstance(value, str):
+        try:
+            parsed = time.fromisoformat(value)
+        except ValueError:
+            pass
+    # Zone-aware times cannot be compared with the naive ones rules are checked against
+    if parsed is None or parsed.tzinfo is not None or parsed.second or parsed.microsecond:
+        raise RuleConfigError(f"{where}: invalid time {value!r}, expected HH:MM")
+    return parsed
+
+
+def _try_compile(rules: List[PicoPlacaRule]) -> Optional[CompiledRuleTable]:
+    """Compiles a region's rules, or returns None if they are not minute-aligned."""
+    try:
+        return PicoPlacaRuleSet.from_rules(rules).compile()
+    except ValueError:
+        return None
+
+
+def _select_region(path: str, regions: dict, region: Optional[str]) -> str:
+    """Resolves the requested region name against a configuration."""
+    names = regions["regions"]
+    if region is None:
+        region = regions["default_region"]
+        if region is None:
+            if len(names) != 1:
+                raise RuleConfigError(
+                    f"{path}: choose a region, one of: {', '.join(sorted(names))}")
+            region, = names
+    if region not in names:
+        raise RuleConfigError(
+            f"{path}: unknown region '{region}', expected one of: {', '.join(sorted(names))}")
+    return region
+
+
+def _read_cache(cache_file: str, digest: str) -> Optional[dict]:
+    """Returns the cached regions if the cache is valid and matches the source digest."""
+    try:
+        with open(cache_file, "rb") as cache:
+            cached = json.load(cache)
+        if not isinstance(cached, dict) or cached.get("format") != CACHE_FORMAT \
+                or cached.get("sha256") != digest:
+            return None
+        default = cached["default_region"]
+        if default is not None and not isinstance(default, str):
+            return None
+        return {"default_region": default,
+                "regions": {name: _decode_region(region)
+                            for name, region in cached["regions"].items()}}
+    except (OSError, ValueError, TypeError, KeyError, AttributeError, zlib.error):
+        return None
+
+
+def _write_cache(cache_file: str, digest: str, regions: dict):
+    """Writes the cache atomically; an unwritable directory just means no cache."""
+    document = {"format": CACHE_FORMAT, "sha256": digest,
+                "default_region": regions["default_region"],
+                "regions": {name: _encode_region(*region)
+                            for name, region in regions["regions"].items()}}
+    temporary = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_file), mode=0o700, exist_ok=True)
+        with open(temporary, "w", encoding="utf-8") as cache:
+            json.dump(document, cache, separators=(",", ":"))
+        os.replace(temporary, cache_file)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def _encode_region(rules: List[PicoPlacaRule], compiled: Optional[CompiledRuleTable],
+                   exceptions: ExceptionCalendar) -> dict:
+    """Converts a parsed region into JSON-ready plain data."""
+    return {"rules": [[sorted(rule.days_of_week), sorted(rule.restricted_digits),
+                       rule.start_time.isoformat(), rule.end_time.isoformat()]
+                      for rule in rules],
+            "table": None if compiled is None else {
+                "has_rules": compiled.has_rules,
+                "flags": base64.b64encode(zlib.compress(bytes(compiled.table))).decode("ascii")},
+            "exceptions": [[ordinal, weekday]
+                           for ordinal, weekday in sorted(exceptions.overrides.items())]}
+
+
+def _decode_region(region: dict) -> Tuple[List[PicoPlacaRule], Optional[CompiledRuleTable],
+                                          ExceptionCalendar]:
+    """Rebuilds a parsed region from cached plain data, raising ValueError if it is invalid."""
+    rules = []
+    for days, digits, start, end in region["rules"]:
+        if not all(type(day) is int and 0 <= day <= 6 for day in days) \
+                or not all(type(digit) is int and 0 <= digit <= 9 for digit in digits):
+            raise ValueError("invalid cached rule")
+        rules.append(PicoPlacaRule(days, digits, _decode_time(start), _decode_time(end)))
+    compiled = None
+    if region["table"] is not None:
+        flags = zlib.decompress(base64.b64decode(region["table"]["flags"], validate=True),
+                                bufsize=DIGITS * MINUTES_PER_WEEK)
+        compiled = CompiledRuleTable(flags, bool(region["table"]["has_rules"]))
+    overrides = {}
+    for ordinal, weekday in region["exceptions"]:
+        if type(ordinal) is not int or type(weekday) is not int:
+            raise ValueError("invalid cached exception")
+        overrides[ordinal] = weekday
+    return rules, compiled, ExceptionCalendar.from_overrides(overrides)
+
+
+def _decode_time(value) -> time:
+    """Reads a cached 'HH:MM' time as _parse_time does, raising ValueError if it is invalid."""
+    if not isinstance(value, str):
+        raise ValueError("invalid cached time")
+    return _parse_time(value, "cache")
@@ -0,0 +1,225 @@
+"""
+Time Zone Converter Module
+
+Converts UTC epoch timestamps into local wall-clock time for a time zone, using a table
+of the zone's offset transitions built once per zone.
+"""
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from math import isfinite
+from typing import List, Tuple
+from zoneinfo import ZoneInfo
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without NumPy installed
+    np = None
+
+_SECONDS_PER_DAY = 24 * 60 * 60
+# date.toordinal() of 1970-01-01
+_EPOCH_ORDINAL = 719163
+_UTC_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Epoch seconds covered by the transition table: 1970-01-01 to 2100-01-01 UTC.
+# Timestamps outside it are converted through zoneinfo directly.
+TABLE_START = 0
+TABLE_END = 4102444800
+
+
+class TimeZoneConverter:
+    """
+    Converts UTC epoch seconds into local time in one time zone.
+    On construction the zone is probed once a day across the table range and every
+    change of offset is narrowed down to the second, giving a sorted list of transitions
+    and the offset in force between each pair. A conversion is then the epoch plus the
+    offset of its segment. The segment of the last conversion is remembered, so a stream
+    of nearby timestamps costs a range check and an add per row, and only a move into
+    another segment costs a bisection. Offsets are assumed not to change twice within a
+    day, which holds for every zone in the tz database.
+    Use for_zone() to share one converter, and its table, per zone.
+    Attributes:
+        zone (str): The IANA time zone name, e.g. 'America/Guayaquil'.
+        transitions (List[int]): Epoch seconds at which the offset changes, ascending.
+        offsets (List[int]): Offsets in seconds; offsets[i] applies before transitions[i]
+                             and offsets[-1] after the last transition.
+    Methods:
+        for_zone(zone): Returns the shared converter of a zone.
+        local_seconds(epoch): Converts to local wall-clock epoch seconds.
+        to_local(epoch): Converts to a naive local datetime.
+        ordinal_minute(epoch): Converts to the local date ordinal and minute of the day.
+        to_local_array(epochs): Converts an array to naive local datetime64 values.
+    """
+
+    zone: str
+    transitions: List[int]
+    offsets: List[int]
+
+    def __init__(self, zone: str):
+        self.zone = zone
+        self._zone_info = ZoneInfo(zone)
+        self.transitions, self.offsets = _transitions(self._zone_info)
+        self._transition_array = None
+        self._offset_array = None
+        # (start, end, offset) of the segment of the last conversion
+        self._segment = self._segment_of(TABLE_START)
+
+    @staticmethod
+    def for_zone(zone: str) -> "TimeZoneConverter":
+        """
+        Returns the converter of a zone, building its transition table on first use.
+        Args:
+            zone (str): The IANA time zone name.
+        Returns:
+            TimeZoneConverter: A converter shared by every caller asking for the zone.
+        Raises:
+            zoneinfo.ZoneInfoNotFoundError: If the zone is unknown.
+        """
+
+        return _converter(zone)
+
+    def local_seconds(self, epoch: float) -> float:
+        """
+        Converts UTC epoch seconds into local wall-clock seconds since 1970-01-01 00:00.
+        Args:
+            epoch (float): Seconds since 1970-01-01 00:00 UTC.
+        Returns:
+            float: The local wall-clock time, as epoch seconds read without a zone.
+        """
+
+        start, end, offset = self._segment
+        if start <= epoch < end:
+            return epoch + offset
+        if TABLE_START <= epoch < TABLE_END:
+            segment = self._segment = self._segment_of(epoch)
+            return epoch + segment[2]
+        return epoch + self._probe(epoch)
+
+    def to_local(self, epoch: float) -> datetime:
+        """
+        Converts UTC epoch seconds into a naive local datetime.
+        Args:
+            epoch (float): Seconds since 1970-01-01 00:00 UTC.
+        Returns:
+            datetime: The local wall-clock time, without tzinfo.
+        Raises:
+            OverflowError: If the time is outside the range of datetime.
+        """
+
+        return datetime(1970, 1, 1) + timedelta(seconds=self.local_seconds(epoch))
+
+    def ordinal_minute(self, epoch: float) -> Tuple[int, int]:
+        """
+        Converts UTC epoch seconds into the local date's ordinal (as date.toordinal) and
+        the minute of the day, the form the predictor looks moments up in.
+        Args:
+            epoch (float): Seconds since 1970-01-01 00:00 UTC.
+        Returns:
+            Tuple[int, int]: (ordinal, minutes since local midnight).
+        """
+
+        days, seconds = divmod(self.local_seconds(epoch), _SECONDS_PER_DAY)
+        return int(days) + _EPOCH_ORDINAL, int(seconds // 60)
+
+    def to_local_array(self, epochs):
+        """
+        Converts an array of UTC epoch seconds into naive local datetime64 values, ready
+        for VectorizedEngine.is_restricted. When every epoch falls in one segment, as in
+        a batch recorded within a few hours, the whole array gets a single offset;
+        otherwise each row's segment is found by a vectorized bisection.
+        Args:
+            epochs (array-like): Seconds since 1970-01-01 00:00 UTC, integer or float.
+                                 NaN entries become NaT.
+        Returns:
+            numpy.ndarray: datetime64[us] local wall-clock times.
+        Raises:
+            ImportError: If NumPy is not installed.
+        """
+
+        if np is None:
+            raise ImportError("TimeZoneConverter.to_local_array requires NumPy "
+                              "(pip install numpy).")
+        epochs = np.asarray(epochs)
+        if epochs.dtype.kind == "f":
+            valid = np.isfinite(epochs)
+            micros = np.floor(np.where(valid, epochs, 0) * 1_000_000).astype(np.int64)
+            seconds = np.floor_divide(micros, 1_000_000)
+        else:
+            valid = None
+            seconds = epochs.astype(np.int64)
+            micros = seconds * 1_000_000
+
+        if seconds.size:
+            low, high = seconds.min(), seconds.max()
+            start, end, offset = self._segment
+            if not start <= low <= high < end and TABLE_START <= low and high < TABLE_END:
+                start, end, offset = self._segment_of(int(low))
+            if start <= low and high < end:
+                micros += offset * 1_000_000
+            else:
+                micros += self._offset_rows(seconds) * 1_000_000
+
+        local = micros.astype("datetime64[us]")
+        if valid is not None:
+            local[~valid] = np.datetime64("NaT")
+        return local
+
+    def _offset_rows(self, seconds):
+        """Finds the offset of every row, probing zoneinfo for rows outside the table."""
+        if self._transition_array is None:
+            self._transition_array = np.array(self.transitions, dtype=np.int64)
+            self._offset_array = np.array(self.offsets, dtype=np.int64)
+        offsets = self._offset_array[np.searchsorted(self._transition_array, seconds,
+                                                     side="right")]
+        outside = (seconds < TABLE_START) | (seconds >= TABLE_END)
+        for row in np.flatnonzero(outside):
+            offsets[row] = self._probe(int(seconds[row]))
+        return offsets
+
+    def _segment_of(self, epoch: float) -> Tuple[float, float, int]:
+        """Finds the (start, end, offset) segment holding an epoch inside the table."""
+        index = bisect_right(self.transitions, epoch)
+        start = self.transitions[index - 1] if index else TABLE_START
+        end = self.transitions[index] if index < len(self.transitions) else TABLE_END
+        return start, end, self.offsets[index]
+
+    def _probe(self, epoch: float) -> int:
+        """Asks zoneinfo for the offset of one instant."""
+        if not isfinite(epoch):
+            raise ValueError(f"Invalid epoch timestamp: {epoch!r}")
+        return _offset_at(self._zone_info, int(epoch // 1))
+
+
+@lru_cache(maxsize=None)
+def _converter(zone: str) -> TimeZoneConverter:
+    """The shared converter of each zone."""
+    return TimeZoneConverter(zone)
+
+
+def _offset_at(zone_info: ZoneInfo, epoch: int) -> int:
+    """Returns the UTC offset of a zone, in seconds, at an instant."""
+    return int((_UTC_EPOCH + timedelta(seconds=epoch)).astimezone(zone_info)
+               .utcoffset().total_seconds())
+
+
+def _transitions(zone_info: ZoneInfo) -> Tuple[List[int], List[int]]:
+    """Probes a zone daily across the table range and bisects every change of offset."""
+    transitions = []
+    offsets = [_offset_at(zone_info, TABLE_START)]
+    before = TABLE_START
+    for after in range(TABLE_START + _SECONDS_PER_DAY, TABLE_END + _SECONDS_PER_DAY,
+                       _SECONDS_PER_DAY):
+        after = min(after, TABLE_END - 1)
+        offset = _offset_at(zone_info, after)
+        if offset != offsets[-1]:
+            low, high = before, after
+            while high - low > 1:
+                middle = (low + high) // 2
+                if _offset_at(zone_info, middle) == offsets[-1]:
+                    low = middle
+                else:
+                    high = middle
+            transitions.append(high)
+            offsets.append(offset)
+        before = after
+    return transitions, offsets
@@ -2,6 +2,29 @@
 Output package for the PicoPlaca system.
 Contains modules for formatting and presenting results to users.
 """
-from .output_formatter import OutputFormatter
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .output_formatter import OutputFormatter
+
+_EXPORTS = {
+    "OutputFormatter": ".output_formatter",
+}
 
 __all__ = ["OutputFormatter"]
+
+
+def __getattr__(name: str):
+    """Imports an export on first access."""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """Lists the exports alongside the names already loaded."""
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,58 @@
+"""
+Interval Writer Module
+
+Writes restriction calendar intervals as CSV or JSON-lines records.
+"""
+import csv
+import json
+from datetime import datetime
+from typing import TextIO
+
+FORMATS = ("csv", "jsonl")
+
+
+class IntervalWriter:
+    """
+    Streams restricted intervals to a text stream, one record per interval.
+    Each record has the license plate and the interval's start and end as ISO 8601
+    'YYYY-MM-DDTHH:MM' timestamps (seconds are added only when present).
+    Attributes:
+        stream (TextIO): The text stream to write to.
+        format (str): Either 'csv' or 'jsonl'.
+    """
+
+    stream: TextIO
+    format: str
+
+    def __init__(self, stream: TextIO, fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported output format: '{fmt}'. Expected one of {FORMATS}")
+        self.stream = stream
+        self.format = fmt
+        self._csv_writer = None
+
+    def write(self, license_plate: str, start: datetime, end: datetime):
+        """
+        Writes one interval.
+        Args:
+            license_plate (str): The license plate the interval applies to.
+            start (datetime): When the restriction starts (inclusive).
+            end (datetime): When the restriction ends (exclusive).
+        """
+
+        start_text, end_text = _isoformat(start), _isoformat(end)
+        if self.format == "jsonl":
+            self.stream.write(json.dumps({"plate": license_plate, "start": start_text,
+                                          "end": end_text}) + "\n")
+            return
+        if self._csv_writer is None:
+            self._csv_writer = csv.writer(self.stream, lineterminator="\n")
+            self._csv_writer.writerow(("plate", "start", "end"))
+        self._csv_writer.writerow((license_plate, start_text, end_text))
+
+
+def _isoformat(moment: datetime) -> str:
+    """Formats a datetime with minute precision unless it has seconds."""
+    if moment.second or moment.microsecond:
+        return moment.isoformat()
+    return moment.isoformat(timespec="minutes")
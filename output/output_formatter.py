@@ -1,8 +1,37 @@
 """
 Output Formatter Module
 
-Provides utilities for formatting prediction results into human-readable messages.
+Provides utilities for formatting prediction results into human-readable messages, and
+encoders that write structured results to binary streams in machine-readable formats.
 """
+import json
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional
+
+from core.prediction_result import (PredictionResult, INVALID_LICENSE_PLATE, INVALID_DATETIME,
+                                    NO_RULES, RESTRICTED, NOT_RESTRICTED)
+
+# Number of results encoded before each write to the stream
+ENCODE_CHUNK_SIZE = 4096
+
+# One byte per result in the binary format
+BINARY_CODES = {NOT_RESTRICTED: 0, RESTRICTED: 1, INVALID_LICENSE_PLATE: 2,
+                INVALID_DATETIME: 3, NO_RULES: 4}
+
+# The leading columns of RecordWriter's CSV output, which adds any extra input columns
+# and an error message
+CSV_HEADER = "plate,date,time,verdict,error_code\n"
+
+# Preallocated record endings, keyed by error code, or by verdict for valid results
+_JSONL_ENDINGS = {code: f'","verdict":"error","error_code":"{code}"}}\n'
+                  for code in (INVALID_LICENSE_PLATE, INVALID_DATETIME, NO_RULES)}
+_JSONL_ENDINGS[RESTRICTED] = '","verdict":"restricted"}\n'
+_JSONL_ENDINGS[NOT_RESTRICTED] = '","verdict":"not_restricted"}\n'
+_CSV_ENDINGS = {code: f",error,{code}\n"
+                for code in (INVALID_LICENSE_PLATE, INVALID_DATETIME, NO_RULES)}
+_CSV_ENDINGS[RESTRICTED] = ",restricted,\n"
+_CSV_ENDINGS[NOT_RESTRICTED] = ",not_restricted,\n"
+
 
 class OutputFormatter:
     """
@@ -13,6 +42,20 @@ class OutputFormatter:
     Methods:
         format_prediction(is_restricted: bool) -> str: Formats the restriction prediction 
         as a descriptive message.
+        format_next_unrestricted(moment: Optional[datetime]) -> str: Formats when a vehicle
+        may circulate again.
+        format_next_restricted(moment: Optional[datetime]) -> str: Formats when a vehicle
+        is next restricted.
+        write_results(results, stream, fmt) -> int: Encodes results with a registered
+        encoder ('jsonl', 'csv' or 'binary' unless more are registered).
+        register_encoder(fmt, encoder): Adds or replaces an encoder.
+        write_jsonl(results, stream) -> int: Writes results as JSON lines.
+        write_csv(results, stream, header) -> int: Writes results as CSV rows.
+        write_binary(results, stream) -> int: Writes one status byte per result.
+    Note:
+        The encoders write verdicts and error codes rather than sentences. Constant parts
+        of every record are preallocated, and records are encoded in chunks that are
+        written to the stream in one call each.
     """
 
     @staticmethod
@@ -31,3 +74,195 @@ class OutputFormatter:
             return "Vehicle is restricted to circulate at this time and date"
         else:
             return "Vehicle is not restricted to circulate at this time and date"
+
+    @staticmethod
+    def format_next_unrestricted(moment: Optional[datetime]) -> str:
+        """
+        Format the first moment a vehicle may circulate into a human-readable message.
+        Args:
+            moment (Optional[datetime]): When the vehicle may circulate, or None if it is
+                                         always restricted.
+        Returns:
+            str: A message indicating when the vehicle may circulate.
+        """
+
+        if moment is None:
+            return "Vehicle is restricted to circulate at all times"
+        return f"Vehicle may circulate from {moment:%Y-%m-%d %H:%M}"
+
+    @staticmethod
+    def format_next_restricted(moment: Optional[datetime]) -> str:
+        """
+        Format the next moment a vehicle is restricted into a human-readable message.
+        Args:
+            moment (Optional[datetime]): When the vehicle is next restricted, or None if it
+                                         is never restricted.
+        Returns:
+            str: A message indicating when the vehicle is next restricted.
+        """
+
+        if moment is None:
+            return "Vehicle is never restricted to circulate"
+        return f"Vehicle is restricted to circulate from {moment:%Y-%m-%d %H:%M}"
+
+    @staticmethod
+    def write_results(results: Iterable[PredictionResult], stream: BinaryIO, fmt: str) -> int:
+        """
+        Encodes results with the encoder registered for a format.
+        Args:
+            results (Iterable[PredictionResult]): The results, e.g. from predict_many.
+            stream (BinaryIO): The binary stream to write to, ideally buffered.
+            fmt (str): The format name.
+        Returns:
+            int: The number of results written.
+        Raises:
+            ValueError: If no encoder is registered for the format.
+        """
+
+        encoder = _ENCODERS.get(fmt)
+        if encoder is None:
+            raise ValueError(f"Unsupported result format: '{fmt}'. "
+                             f"Expected one of {tuple(sorted(_ENCODERS))}")
+        return encoder(results, stream)
+
+    @staticmethod
+    def register_encoder(fmt: str,
+                         encoder: Callable[[Iterable[PredictionResult], BinaryIO], int]):
+        """
+        Adds or replaces the encoder of a format.
+        Args:
+            fmt (str): The format name.
+            encoder (Callable[[Iterable[PredictionResult], BinaryIO], int]): Writes results to
+                a binary stream and returns how many it wrote.
+        """
+
+        _ENCODERS[fmt] = encoder
+
+    @staticmethod
+    def write_jsonl(results: Iterable[PredictionResult], stream: BinaryIO) -> int:
+        """
+        Writes one JSON object per result, with plate, date, time, verdict and, for failed
+        results, error_code. Results with a matched rule also get a 'rule' object.
+        Args:
+            results (Iterable[PredictionResult]): The results.
+            stream (BinaryIO): The binary stream to write to.
+        Returns:
+            int: The number of results written.
+        """
+
+        rules = {}
+        count = 0
+        parts: List[str] = []
+        append = parts.append
+        for result in results:
+            append('{"plate":"')
+            append(_json_text(result.license_plate))
+            append('","date":"')
+            append(_json_text(result.date))
+            append('","time":"')
+            append(_json_text(result.time))
+            ending = _JSONL_ENDINGS[result.error_code or
+                                   (RESTRICTED if result.restricted else NOT_RESTRICTED)]
+            if result.rule is not None:
+                rule = rules.get(result.rule)
+                if rule is None:
+                    rule = rules[result.rule] = _json_rule(result.rule)
+                ending = ending[:-2] + rule + "}\n"
+            append(ending)
+            count += 1
+            if count % ENCODE_CHUNK_SIZE == 0:
+                stream.write("".join(parts).encode("utf-8"))
+                parts.clear()
+        if parts:
+            stream.write("".join(parts).encode("utf-8"))
+        return count
+
+    @staticmethod
+    def write_csv(results: Iterable[PredictionResult], stream: BinaryIO,
+                  header: bool = True) -> int:
+        """
+        Writes one CSV row per result, with the columns of CSV_HEADER.
+        Args:
+            results (Iterable[PredictionResult]): The results.
+            stream (BinaryIO): The binary stream to write to.
+            header (bool): Whether to write the header row first.
+        Returns:
+            int: The number of results written.
+        """
+
+        count = 0
+        parts: List[str] = [CSV_HEADER] if header else []
+        append = parts.append
+        for result in results:
+            append(_csv_text(result.license_plate))
+            append(",")
+            append(_csv_text(result.date))
+            append(",")
+            append(_csv_text(result.time))
+            append(_CSV_ENDINGS[result.error_code or
+                                (RESTRICTED if result.restricted else NOT_RESTRICTED)])
+            count += 1
+            if count % ENCODE_CHUNK_SIZE == 0:
+                stream.write("".join(parts).encode("utf-8"))
+                parts.clear()
+        if parts:
+            stream.write("".join(parts).encode("utf-8"))
+        return count
+
+    @staticmethod
+    def write_binary(results: Iterable[PredictionResult], stream: BinaryIO) -> int:
+        """
+        Writes one byte per result, in input order, holding its BINARY_CODES value. The
+        inputs are not repeated, so the output is meant to be read alongside them.
+        Args:
+            results (Iterable[PredictionResult]): The results.
+            stream (BinaryIO): The binary stream to write to.
+        Returns:
+            int: The number of results written.
+        """
+
+        restricted, not_restricted = BINARY_CODES[RESTRICTED], BINARY_CODES[NOT_RESTRICTED]
+        count = 0
+        chunk = bytearray()
+        append = chunk.append
+        for result in results:
+            if result.error_code is not None:
+                append(BINARY_CODES[result.error_code])
+            else:
+                append(restricted if result.restricted else not_restricted)
+            count += 1
+            if count % ENCODE_CHUNK_SIZE == 0:
+                stream.write(chunk)
+                chunk.clear()
+        if chunk:
+            stream.write(chunk)
+        return count
+
+
+_ENCODERS: Dict[str, Callable[[Iterable[PredictionResult], BinaryIO], int]] = {
+    "jsonl": OutputFormatter.write_jsonl,
+    "csv": OutputFormatter.write_csv,
+    "binary": OutputFormatter.write_binary,
+}
+
+
+def _json_text(value: str) -> str:
+    """Returns the contents of a JSON string literal, escaping only when needed."""
+    if value.isprintable() and '"' not in value and "\\" not in value:
+        return value
+    return json.dumps(value, ensure_ascii=False)[1:-1]
+
+
+def _json_rule(rule) -> str:
+    """Encodes a matched rule as the members of a JSON 'rule' object."""
+    return ',"rule":' + json.dumps({"days": sorted(rule.days_of_week),
+                                    "digits": sorted(rule.restricted_digits),
+                                    "start": rule.start_time.isoformat(),
+                                    "end": rule.end_time.isoformat()}, separators=(",", ":"))
+
+
+def _csv_text(value: str) -> str:
+    """Returns a CSV field, quoted only when it contains a separator, quote or newline."""
+    if "," in value or '"' in value or "\n" in value or "\r" in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
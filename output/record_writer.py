@@ -0,0 +1,83 @@
+"""
+Record Writer Module
+
+Writes batch check results as CSV or JSON-lines records with a verdict column.
+"""
+import csv
+import json
+from typing import List, Optional, TextIO
+
+from core.prediction_result import RESTRICTED, NOT_RESTRICTED, ERROR, INVALID_RECORD
+from input.record_reader import FORMATS
+
+INPUT_COLUMNS = ("plate", "date", "time")
+RESULT_COLUMNS = ("verdict", "error_code", "error")
+
+
+class RecordWriter:
+    """
+    Streams output records, one per input record, to a text stream.
+    Every record keeps its original fields and gains a 'verdict' column ('restricted',
+    'not_restricted' or 'error'), and an 'error_code' and 'error' column saying why a
+    record could not be checked. The verdict and error code are those of
+    OutputFormatter.write_csv and write_jsonl, so both schemas read the same way; records
+    the reader rejected have the error code INVALID_RECORD. In JSON-lines output the
+    'error_code' and 'error' keys are only present on failed records.
+    CSV columns are the input columns followed by any extra columns of the first record.
+    Attributes:
+        stream (TextIO): The text stream to write to.
+        format (str): Either 'csv' or 'jsonl'.
+    """
+
+    stream: TextIO
+    format: str
+
+    def __init__(self, stream: TextIO, fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported output format: '{fmt}'. Expected one of {FORMATS}")
+        self.stream = stream
+        self.format = fmt
+        self._csv_writer = None
+
+    def write(self, fields: dict, restricted: Optional[bool], error: Optional[str] = None,
+              error_code: Optional[str] = None):
+        """
+        Writes one record.
+        Args:
+            fields (dict): The record's original fields.
+            restricted (Optional[bool]): The verdict, or None if the record failed.
+            error (Optional[str]): The error message for failed records.
+            error_code (Optional[str]): The error code for failed records, as in
+                                        PredictionResult; defaults to INVALID_RECORD.
+        """
+
+        if error is not None:
+            verdict = ERROR
+            error_code = error_code or INVALID_RECORD
+        else:
+            verdict = RESTRICTED if restricted else NOT_RESTRICTED
+
+        if self.format == "jsonl":
+            record = dict(fields)
+            record["verdict"] = verdict
+            if error is not None:
+                record["error_code"] = error_code
+                record["error"] = error
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            return
+
+        if self._csv_writer is None:
+            self._start_csv(list(fields))
+        row = dict(fields)
+        row["verdict"] = verdict
+        row["error_code"] = error_code or ""
+        row["error"] = error or ""
+        self._csv_writer.writerow(row)
+
+    def _start_csv(self, columns: List[str]):
+        columns = list(INPUT_COLUMNS) + [
+            name for name in columns if isinstance(name, str)
+            and name not in INPUT_COLUMNS and name not in RESULT_COLUMNS]
+        self._csv_writer = csv.DictWriter(self.stream, columns + list(RESULT_COLUMNS),
+                                          extrasaction="ignore", lineterminator="\n")
+        self._csv_writer.writeheader()
@@ -0,0 +1,33 @@
+"""
+Service package for the PicoPlaca system.
+Contains long-running modes that keep the rule set and predictor in memory.
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .http_server import PicoPlacaHttpServer
+    from .violation_watcher import ViolationWatcher, Violation
+
+_EXPORTS = {
+    "PicoPlacaHttpServer": ".http_server",
+    "ViolationWatcher": ".violation_watcher",
+    "Violation": ".violation_watcher",
+}
+
+__all__ = ["PicoPlacaHttpServer", "ViolationWatcher", "Violation"]
+
+
+def __getattr__(name: str):
+    """Imports an export on first access."""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """Lists the exports alongside the names already loaded."""
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,220 @@
+"""
+HTTP Server Module
+
+A minimal asyncio HTTP/1.1 server, built only on the standard library, that answers
+restriction checks with a predictor that is created once for the lifetime of the process.
+"""
+import asyncio
+import json
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from core import PicoPlacaPredictor, PredictionResult
+
+# Largest request body accepted by POST /check
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large"}
+
+
+class PicoPlacaHttpServer:
+    """
+    Serves restriction checks over HTTP with keep-alive connections.
+    Endpoints:
+        GET /check?plate=XXX-###&date=YYYY-MM-DD&time=HH:MM
+            Checks a single vehicle and returns one JSON result object.
+        POST /check
+            Takes a JSON array of {"plate", "date", "time"} objects and returns a JSON
+            array of results in the same order.
+        GET /metrics
+            Returns the metrics callable's text or, without one, the predictor's stats
+            in the Prometheus text format, when the predictor was created with stats
+            enabled.
+    Each result object echoes plate, date and time and carries either "restricted"
+    (a boolean) or "error" (a message).
+    Attributes:
+        predictor (PicoPlacaPredictor): The predictor used for every request.
+        host (str): The interface to listen on.
+        port (int): The TCP port to listen on (0 picks a free port).
+        metrics (Optional[Callable[[], str]]): Renders GET /metrics for another
+            long-running mode, such as ViolationWatcher.to_prometheus.
+    """
+
+    predictor: PicoPlacaPredictor
+    host: str
+    port: int
+    metrics: Optional[Callable[[], str]]
+
+    def __init__(self, predictor: PicoPlacaPredictor, host: str = "127.0.0.1", port: int = 8080,
+                 metrics: Optional[Callable[[], str]] = None):
+        self.predictor = predictor
+        self.host = host
+        self.port = port
+        self.metrics = metrics
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> asyncio.AbstractServer:
+        """
+        Starts listening. When port is 0 the chosen port is stored back in self.port.
+        Returns:
+            asyncio.AbstractServer: The running server.
+        """
+
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    def close(self):
+        """Stops listening for new connections."""
+        if self._server is not None:
+            self._server.close()
+
+    async def serve_forever(self):
+        """Starts the server and serves requests until cancelled."""
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        ConnectionError):
+                    break
+                keep_alive = await self._handle_request(head, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, head: bytes, reader: asyncio.StreamReader,
+                              writer: asyncio.StreamWriter) -> bool:
+        """Answers one request and returns whether the connection stays open."""
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            _respond(writer, 400, {"error": "Malformed request line"}, False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+
+        body = b""
+        if "content-length" in headers:
+            try:
+                length = int(headers["content-length"])
+            except ValueError:
+                _respond(writer, 400, {"error": "Invalid Content-Length"}, False)
+                return False
+            if length > MAX_BODY_SIZE:
+                _respond(writer, 413, {"error": "Request body too large"}, False)
+                return False
+            try:
+                body = await reader.readexactly(length)
+            except asyncio.IncompleteReadError:
+                return False
+        elif "transfer-encoding" in headers:
+            _respond(writer, 411, {"error": "Content-Length is required"}, False)
+            return False
+
+        url = urlsplit(target)
+        if url.path == "/metrics":
+            if method != "GET":
+                status, payload = 405, {"error": f"Method {method} is not allowed"}
+            elif self.metrics is not None:
+                _respond_text(writer, 200, self.metrics(), keep_alive)
+                return keep_alive
+            elif self.predictor.stats is None:
+                status, payload = 404, {"error": "Stats are not enabled"}
+            else:
+                _respond_text(writer, 200, self.predictor.stats.to_prometheus(), keep_alive)
+                return keep_alive
+        elif url.path != "/check":
+            status, payload = 404, {"error": f"No such endpoint: {url.path}"}
+        elif method == "GET":
+            status, payload = self._check_one(url.query)
+        elif method == "POST":
+            status, payload = self._check_many(body)
+        else:
+            status, payload = 405, {"error": f"Method {method} is not allowed"}
+        _respond(writer, status, payload, keep_alive)
+        return keep_alive
+
+    def _check_one(self, query: str) -> Tuple[int, dict]:
+        params = parse_qs(query)
+        triple = []
+        for name in ("plate", "date", "time"):
+            values = params.get(name)
+            if not values:
+                return 400, {"error": f"Missing query parameter '{name}'"}
+            triple.append(values[0])
+        result, = self.predictor.predict_many([tuple(triple)])
+        return 200, _result_to_dict(result)
+
+    def _check_many(self, body: bytes) -> Tuple[int, List[dict]]:
+        try:
+            checks = json.loads(body)
+        except ValueError as exc:
+            return 400, {"error": f"Invalid JSON body: {exc}"}
+        if not isinstance(checks, list):
+            return 400, {"error": "Expected a JSON array of checks"}
+        triples = []
+        for index, check in enumerate(checks):
+            if not isinstance(check, dict) or not all(
+                    isinstance(check.get(name), str) for name in ("plate", "date", "time")):
+                return 400, {"error": f"Check {index} needs string plate, date and time fields"}
+            triples.append((check["plate"], check["date"], check["time"]))
+        return 200, [_result_to_dict(result) for result in self.predictor.predict_many(triples)]
+
+
+def _result_to_dict(result: PredictionResult) -> dict:
+    """
+    Converts a prediction result into the object 'check --format jsonl' writes, with the
+    error message added for failed results.
+    """
+
+    payload = {"plate": result.license_plate, "date": result.date, "time": result.time,
+               "verdict": result.verdict}
+    if result.error_code is not None:
+        payload["error_code"] = result.error_code
+        payload["error"] = result.error
+    return payload
+
+
+def _respond(writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+    """Writes a JSON response."""
+    _write_response(writer, status, "application/json", json.dumps(payload).encode("utf-8"),
+                    keep_alive)
+
+
+def _respond_text(writer: asyncio.StreamWriter, status: int, text: str, keep_alive: bool):
+    """Writes a Prometheus text exposition response."""
+    _write_response(writer, status, "text/plain; version=0.0.4; charset=utf-8",
+                    text.encode("utf-8"), keep_alive)
+
+
+def _write_response(writer: asyncio.StreamWriter, status: int, content_type: str, body: bytes,
+                    keep_alive: bool):
+    """Writes a response with its headers."""
+    writer.write(
+        f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        f"\r\n".encode("latin-1") + body)
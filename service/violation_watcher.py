@@ -0,0 +1,365 @@
+"""
+Violation Watcher Module
+
+Consumes a live stream of vehicle position events and alerts when a moving vehicle
+enters its restricted window, keeping only a small state per tracked vehicle.
+"""
+import asyncio
+import json
+import time
+from typing import BinaryIO, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from core import PicoPlacaPredictor
+
+# Bytes read from a source at a time; a chunk is split into lines and queued as a batch
+CHUNK_SIZE = 64 * 1024
+
+# Error code of events that are not JSON objects with a string plate and a numeric ts
+INVALID_EVENT = "invalid_event"
+
+# Error code of events stamped further ahead of the wall clock than max_clock_skew
+FUTURE_EVENT = "future_event"
+
+_DECODER = json.JSONDecoder()
+
+
+class Violation(NamedTuple):
+    """
+    An alert that a moving vehicle entered its restricted window.
+    Attributes:
+        license_plate (str): The vehicle's license plate.
+        epoch (float): The UTC epoch seconds of the event that raised the alert.
+        date (str): The local date of the event, as 'YYYY-MM-DD'.
+        time (str): The local time of the event, as 'HH:MM'.
+    """
+
+    license_plate: str
+    epoch: float
+    date: str
+    time: str
+
+    def to_json(self) -> bytes:
+        """
+        Encodes the alert as one JSON line.
+        Returns:
+            bytes: The UTF-8 JSON object, ending with a newline.
+        """
+
+        return (json.dumps({"event": "violation", "plate": self.license_plate,
+                            "ts": self.epoch, "date": self.date, "time": self.time})
+                + "\n").encode("utf-8")
+
+
+class ViolationWatcher:
+    """
+    Watches position events and emits a Violation on each transition into restriction.
+    Events are JSON lines such as {"plate": "ABC-1234", "ts": 1696251600, "speed": 32.5},
+    with ts in UTC epoch seconds read as local time in the watcher's zone. A vehicle is
+    moving when speed is absent or positive. Events are evaluated in batches through the
+    predictor's predict_many_epochs, and each vehicle keeps only the time it was last
+    seen and whether it has already been reported in the current restricted window: the
+    first moving event inside a window raises one alert, later pings in the same window
+    raise none, and the first event outside it re-arms the vehicle.
+    Vehicles are kept in order of their last event, so those idle for longer than
+    idle_timeout seconds of event time are evicted from the front after every batch and
+    memory stays proportional to the active fleet. Events stamped more than
+    max_clock_skew seconds ahead of the wall clock are rejected: a single far-future
+    timestamp would otherwise advance event time past every tracked vehicle, evicting
+    vehicles still inside their window and then blocking eviction for good.
+    Sources feed a bounded queue of line batches and alerts go through a second bounded
+    queue to the writer. A full queue suspends reading, so a slow consumer pushes back
+    on the producer instead of growing buffers.
+    Attributes:
+        predictor (PicoPlacaPredictor): Evaluates the events.
+        zone (str): The IANA time zone the rules apply in.
+        idle_timeout (float): Seconds without events after which a vehicle is evicted.
+        queue_size (int): Capacity, in batches, of each queue.
+        max_clock_skew (float): Seconds an event may be stamped ahead of the wall clock.
+        clock (Callable[[], float]): Returns the wall clock in UTC epoch seconds.
+        events (int): Events accepted and evaluated; rejected ones are counted in errors.
+        violations (int): Alerts emitted.
+        evicted (int): Vehicles evicted for being idle.
+        errors (Dict[str, int]): Rejected events per error code.
+        queue_peak (int): Most batches waiting in the event queue at once.
+    Methods:
+        process_lines(lines): Evaluates a batch of event lines.
+        evict_idle(now): Forgets the vehicles idle since before now - idle_timeout.
+        run_stream(source, target): Watches a binary stream until it ends.
+        serve_socket(path, target): Watches the connections of a Unix socket.
+        summary(): Formats a human-readable report of the counters.
+        to_prometheus(): Formats the counters in the Prometheus text format.
+    """
+
+    predictor: PicoPlacaPredictor
+    zone: str
+    idle_timeout: float
+    queue_size: int
+    max_clock_skew: float
+    clock: Callable[[], float]
+    events: int
+    violations: int
+    evicted: int
+    errors: Dict[str, int]
+    queue_peak: int
+
+    def __init__(self, predictor: PicoPlacaPredictor, zone: str,
+                 idle_timeout: float = 900.0, queue_size: int = 64,
+                 max_clock_skew: float = 300.0, clock: Callable[[], float] = time.time):
+        self.predictor = predictor
+        self.zone = zone
+        self.idle_timeout = idle_timeout
+        self.queue_size = queue_size
+        self.max_clock_skew = max_clock_skew
+        self.clock = clock
+        self.events = 0
+        self.violations = 0
+        self.evicted = 0
+        self.errors = {}
+        self.queue_peak = 0
+        # plate -> (last seen epoch, reported in the current window), oldest first
+        self._vehicles: Dict[str, Tuple[float, bool]] = {}
+        self._latest = float("-inf")
+        self._queue: Optional[asyncio.Queue] = None
+
+    @property
+    def tracked(self) -> int:
+        """
+        The number of vehicles currently holding state.
+        """
+
+        return len(self._vehicles)
+
+    def process_lines(self, lines: List[bytes]) -> List[Violation]:
+        """
+        Evaluates a batch of event lines, updates the vehicles' state and evicts idle ones.
+        Args:
+            lines (List[bytes]): JSON event lines; blank lines are skipped.
+        Returns:
+            List[Violation]: The alerts raised by the batch, in event order.
+        """
+
+        # The batch is decoded once, and each line parsed with raw_decode, which skips
+        # the per-call encoding detection and whitespace checks of json.loads
+        decode = _DECODER.raw_decode
+        events = []
+        for line in b"\n".join(lines).decode("utf-8", "replace").split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event, end = decode(line)
+                if end != len(line):
+                    raise ValueError(line)
+                plate = event["plate"]
+                epoch = event["ts"]
+                speed = event.get("speed")
+                if not isinstance(plate, str) or isinstance(epoch, bool):
+                    raise TypeError(plate)
+                moving = speed is None or speed > 0
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self._count_error(INVALID_EVENT)
+                continue
+            events.append((plate, epoch, moving))
+
+        vehicles = self._vehicles
+        latest = self._latest
+        horizon = self.clock() + self.max_clock_skew
+        violations = []
+        rejected = 0
+        results = self.predictor.predict_many_epochs(
+            [(plate, epoch) for plate, epoch, _ in events], self.zone)
+        for (plate, epoch, moving), result in zip(events, results):
+            if result.error_code is not None:
+                self._count_error(result.error_code)
+                rejected += 1
+                continue
+            if epoch > horizon:
+                self._count_error(FUTURE_EVENT)
+                rejected += 1
+                continue
+            # Moved to the end, so the dict stays ordered by last event
+            state = vehicles.pop(plate, None)
+            reported = state is not None and state[1]
+            if not result.restricted:
+                reported = False
+            elif moving and not reported:
+                reported = True
+                violations.append(Violation(plate, epoch, result.date, result.time))
+            vehicles[plate] = (epoch, reported)
+            if epoch > latest:
+                latest = epoch
+        self._latest = latest
+        self.events += len(events) - rejected
+        self.violations += len(violations)
+        self.evict_idle(latest)
+        return violations
+
+    def evict_idle(self, now: float) -> int:
+        """
+        Forgets the vehicles whose last event is older than now - idle_timeout. Vehicles
+        are scanned from the least recently seen and the scan stops at the first active
+        one, so with events out of order a few idle vehicles may linger until later.
+        Args:
+            now (float): The current time, in UTC epoch seconds.
+        Returns:
+            int: The number of vehicles evicted.
+        """
+
+        cutoff = now - self.idle_timeout
+        vehicles = self._vehicles
+        idle = []
+        for plate, (last_seen, _) in vehicles.items():
+            if last_seen >= cutoff:
+                break
+            idle.append(plate)
+        for plate in idle:
+            del vehicles[plate]
+        self.evicted += len(idle)
+        return len(idle)
+
+    async def run_stream(self, source: BinaryIO, target: BinaryIO):
+        """
+        Watches the events of a binary stream, such as standard input, until it ends.
+        Reads and writes run in the default executor, so blocking pipes and files never
+        stall the event loop.
+        Args:
+            source (BinaryIO): The event lines.
+            target (BinaryIO): Where alerts are written as JSON lines.
+        """
+
+        loop = asyncio.get_running_loop()
+        read = getattr(source, "read1", source.read)
+        queue = self._queue = asyncio.Queue(self.queue_size)
+        consumer = asyncio.ensure_future(self._consume(queue, target))
+        try:
+            await self._feed(lambda: loop.run_in_executor(None, read, CHUNK_SIZE))
+            await queue.put(None)
+            await consumer
+        finally:
+            consumer.cancel()
+
+    async def serve_socket(self, path: str, target: BinaryIO):
+        """
+        Watches the events sent by every connection to a Unix socket, until cancelled.
+        Args:
+            path (str): The socket path to listen on.
+            target (BinaryIO): Where alerts are written as JSON lines.
+        """
+
+        queue = self._queue = asyncio.Queue(self.queue_size)
+        consumer = asyncio.ensure_future(self._consume(queue, target))
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            try:
+                await self._feed(lambda: reader.read(CHUNK_SIZE))
+            except ConnectionError:
+                pass
+            finally:
+                writer.close()
+
+        server = await asyncio.start_unix_server(handle, path)
+        try:
+            async with server:
+                await asyncio.gather(server.serve_forever(), consumer)
+        finally:
+            consumer.cancel()
+
+    async def _feed(self, read_chunk):
+        """Splits the chunks of one source into line batches and queues them."""
+        queue = self._queue
+        pending = b""
+        while True:
+            chunk = await read_chunk()
+            if not chunk:
+                break
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            if lines:
+                await queue.put(lines)
+                if queue.qsize() > self.queue_peak:
+                    self.queue_peak = queue.qsize()
+        if pending:
+            await queue.put([pending])
+
+    async def _consume(self, queue: asyncio.Queue, target: BinaryIO):
+        """Evaluates queued batches and passes their alerts to a bounded writer queue."""
+        loop = asyncio.get_running_loop()
+        alerts = asyncio.Queue(self.queue_size)
+
+        async def write():
+            while True:
+                data = await alerts.get()
+                if data is None:
+                    return
+                await loop.run_in_executor(None, _write, target, data)
+
+        writer = asyncio.ensure_future(write())
+        try:
+            while True:
+                lines = await queue.get()
+                if lines is None:
+                    break
+                violations = self.process_lines(lines)
+                if violations:
+                    await alerts.put(b"".join(violation.to_json() for violation in violations))
+            await alerts.put(None)
+            await writer
+        finally:
+            writer.cancel()
+
+    def _count_error(self, code: str):
+        """Counts a rejected event."""
+        self.errors[code] = self.errors.get(code, 0) + 1
+
+    def summary(self) -> str:
+        """
+        Formats a human-readable report of the watch counters, followed by the
+        predictor's stage stats when it has them, each under its own heading.
+        Returns:
+            str: The report, one counter per line.
+        """
+
+        lines = ["watch counters:", f"events: {self.events}", f"violations: {self.violations}",
+                 f"tracked vehicles: {self.tracked}", f"evicted vehicles: {self.evicted}",
+                 f"queue peak: {self.queue_peak}"]
+        for code in sorted(self.errors):
+            lines.append(f"errors[{code}]: {self.errors[code]}")
+        if self.predictor.stats is not None:
+            lines += ["", "predictor stats:", self.predictor.stats.summary()]
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        """
+        Formats the watch counters in the Prometheus text exposition format, followed by
+        the predictor's stage stats when it has them.
+        Returns:
+            str: The exposition text, ending with a newline.
+        """
+
+        lines = []
+        for name, kind, text, value in (
+                ("picoplaca_watch_events_total", "counter", "Events accepted and evaluated.",
+                 self.events),
+                ("picoplaca_watch_violations_total", "counter", "Violation alerts emitted.",
+                 self.violations),
+                ("picoplaca_watch_evicted_total", "counter",
+                 "Vehicles evicted for being idle.", self.evicted),
+                ("picoplaca_watch_tracked_vehicles", "gauge", "Vehicles holding state.",
+                 self.tracked),
+                ("picoplaca_watch_queued_batches", "gauge", "Event batches waiting.",
+                 self._queue.qsize() if self._queue is not None else 0)):
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        lines.append("# HELP picoplaca_watch_rejected_total Rejected events by error code.")
+        lines.append("# TYPE picoplaca_watch_rejected_total counter")
+        for code in sorted(self.errors):
+            lines.append(f'picoplaca_watch_rejected_total{{code="{code}"}} {self.errors[code]}')
+        text = "\n".join(lines) + "\n"
+        if self.predictor.stats is not None:
+            text += self.predictor.stats.to_prometheus()
+        return text
+
+
+def _write(target: BinaryIO, data: bytes):
+    """Writes and flushes alerts, so they reach a pipe as soon as they are raised."""
+    target.write(data)
+    target.flush()
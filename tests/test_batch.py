@@ -0,0 +1,166 @@
+"""
+Test module for the batch processing pipeline.
+
+Contains tests for BatchProcessor and the streaming batch mode of the command-line interface.
+"""
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from batch import BatchProcessor, BatchSummary, ParallelBatchProcessor
+from cli import setup_default_rules
+from core import PicoPlacaPredictor
+from core.predictor_stats import PredictorStats
+from input.record_reader import RecordReader
+from output.output_formatter import BINARY_CODES
+from output.record_writer import RecordWriter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestBatchProcessor(unittest.TestCase):
+    """Test cases for the BatchProcessor class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.processor = BatchProcessor(PicoPlacaPredictor(setup_default_rules()))
+
+    def test_process_keeps_order_and_reports_errors(self):
+        """Test that every record gets a verdict in input order, including malformed ones."""
+        source = io.StringIO("plate,date,time\n"
+                             "ABC-121,2023-10-02,08:00\n"
+                             "ABC-121\n"
+                             "INVALID,2023-10-02,08:00\n"
+                             "ABC-123,2023-10-02,08:00\n")
+        target = io.StringIO()
+
+        summary = self.processor.process(RecordReader(source, "csv"),
+                                         RecordWriter(target, "csv"))
+
+        self.assertEqual(summary, BatchSummary(records=4, restricted=1, errors=2))
+        rows = [line.split(",")[3:5] for line in target.getvalue().splitlines()[1:]]
+        self.assertEqual(rows, [["restricted", ""], ["error", "invalid_record"],
+                                ["error", "invalid_license_plate"], ["not_restricted", ""]])
+
+
+class TestParallelBatchProcessor(unittest.TestCase):
+    """Test cases for the ParallelBatchProcessor class."""
+
+    CSV_INPUT = ("plate,date,time,id\n"
+                 + "".join(f"ABC-12{n % 10},2023-10-0{2 + n % 5},0{n % 10}:15,{n}\n"
+                           for n in range(40))
+                 + "broken\n"
+                 + "XYZ-100,2023-10-06,17:30,last\n")
+    JSONL_INPUT = "".join(
+        f'{{"plate": "ABC-12{n % 10}", "date": "2023-10-02", "time": "08:0{n % 10}"}}\n'
+        for n in range(30)) + "not json\n"
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.rule_set = setup_default_rules()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.directory.cleanup()
+
+    def _compare(self, content, fmt):
+        path = os.path.join(self.directory.name, "input." + fmt)
+        with open(path, "w", encoding="utf-8", newline="") as handle:
+            handle.write(content)
+
+        expected = io.StringIO()
+        expected_summary = BatchProcessor(PicoPlacaPredictor(self.rule_set)).process(
+            RecordReader(io.StringIO(content, newline=""), fmt), RecordWriter(expected, fmt))
+        actual = io.StringIO()
+        summary = ParallelBatchProcessor(self.rule_set, workers=2, chunk_size=64).process(
+            path, fmt, actual)
+
+        self.assertEqual(actual.getvalue(), expected.getvalue())
+        self.assertEqual(summary, expected_summary)
+
+    def test_csv_matches_single_process(self):
+        """Test that parallel CSV output, including error line numbers, is unchanged."""
+        self._compare(self.CSV_INPUT, "csv")
+
+    def test_jsonl_matches_single_process(self):
+        """Test that parallel JSON-lines output is unchanged."""
+        self._compare(self.JSONL_INPUT, "jsonl")
+
+    def test_quoted_line_breaks_fall_back_to_one_process(self):
+        """Test that a CSV record spanning lines is checked in order, as in one process."""
+        content = self.CSV_INPUT.replace("last\n", '"two\nlines"\n') + "broken\n" + "".join(
+            f"ABC-12{n % 10},2023-10-03,08:{n % 60:02d},{n}\n" for n in range(20))
+        self._compare(content, "csv")
+
+    def test_worker_stats_are_merged(self):
+        """Test that stats collected by the workers match a single-process run."""
+        path = os.path.join(self.directory.name, "input.csv")
+        with open(path, "w", encoding="utf-8", newline="") as handle:
+            handle.write(self.CSV_INPUT)
+
+        expected = PredictorStats()
+        BatchProcessor(PicoPlacaPredictor(self.rule_set, expected)).process(
+            RecordReader(io.StringIO(self.CSV_INPUT, newline=""), "csv"),
+            RecordWriter(io.StringIO(), "csv"))
+        stats = PredictorStats()
+        ParallelBatchProcessor(self.rule_set, workers=2, chunk_size=64, stats=stats).process(
+            path, "csv", io.StringIO())
+
+        self.assertEqual(stats.counts, expected.counts)
+        self.assertEqual(stats.errors, expected.errors)
+        self.assertEqual(stats.counts["format"], 42)
+
+    def test_missing_csv_column_reported_once(self):
+        """Test that a bad CSV header produces a single error record."""
+        self._compare("plate,date\n" + "ABC-123,2023-10-02\n" * 20, "csv")
+
+
+class TestBatchCommandLine(unittest.TestCase):
+    """Test cases for the --input/--output options of cli.py."""
+
+    def test_jsonl_file_to_stdout(self):
+        """Test a JSON-lines file checked through the command line."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checks.jsonl")
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write('{"plate": "XYZ-100", "date": "2023-10-06", "time": "17:30"}\n')
+                handle.write('{"plate": "XYZ-100", "date": "2023-10-07", "time": "17:30"}\n')
+
+            output = subprocess.run([sys.executable, "cli.py", "--input", path],
+                                    cwd=ROOT, check=True, capture_output=True,
+                                    text=True).stdout
+
+        verdicts = [json.loads(line)["verdict"] for line in output.splitlines()]
+        self.assertEqual(verdicts, ["restricted", "not_restricted"])
+
+    def test_single_check_with_format(self):
+        """Test that --format turns a single check into a machine-readable record."""
+        output = subprocess.run([sys.executable, "cli.py", "--plate", "ABC-121", "--date",
+                                 "2023-10-02", "--time", "08:00", "--format", "jsonl"],
+                                cwd=ROOT, check=True, capture_output=True, text=True).stdout
+        record = json.loads(output)
+        self.assertEqual(record["verdict"], "restricted")
+        self.assertEqual(record["rule"]["digits"], [1, 2])
+
+        status = subprocess.run([sys.executable, "cli.py", "--plate", "BAD", "--format",
+                                 "binary"], cwd=ROOT, check=True, capture_output=True).stdout
+        self.assertEqual(status, bytes([BINARY_CODES["invalid_license_plate"]]))
+        completed = subprocess.run([sys.executable, "cli.py", "--input", "-", "--format",
+                                    "binary"], cwd=ROOT, capture_output=True, text=True)
+        self.assertIn("only supported for single checks", completed.stderr)
+
+    def test_plate_or_input_required(self):
+        """Test that the command line requires either --plate or --input."""
+        completed = subprocess.run([sys.executable, "cli.py"], cwd=ROOT,
+                                   capture_output=True, text=True)
+        self.assertNotEqual(completed.returncode, 0)
+        self.assertIn("--plate or -i/--input is required", completed.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+Test module for the benchmark suite.
+
+Contains tests for the result comparison and loading of the benchmark runner; the
+benchmarks themselves are not run.
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks.suite import RESULTS_FORMAT, compare, load_results
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """Test cases for the benchmark runner's regression checks."""
+
+    def test_compare_flags_slowdowns_beyond_threshold(self):
+        """Test that only benchmarks slower than the threshold are regressions."""
+        baseline = {"fast": 1.0, "same": 2.0, "slow": 1.0, "removed": 1.0}
+        current = {"fast": 0.5, "same": 2.1, "slow": 1.2, "added": 1.0}
+        rows, regressions = compare(baseline, current, 0.10)
+        self.assertEqual([row[0] for row in rows], ["fast", "same", "slow"])
+        self.assertEqual(regressions, ["slow"])
+        self.assertAlmostEqual(rows[0][3], 0.5)
+
+    def test_load_results_checks_format(self):
+        """Test that saved results are read back and other files are rejected."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            with open(path, "w", encoding="utf-8") as target:
+                json.dump({"format": RESULTS_FORMAT, "results": {"a": 1.5}}, target)
+            self.assertEqual(load_results(path), {"a": 1.5})
+
+            with open(path, "w", encoding="utf-8") as target:
+                json.dump({"results": {"a": 1.5}}, target)
+            with self.assertRaises(ValueError):
+                load_results(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
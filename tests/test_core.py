@@ -3,11 +3,23 @@ Test module for the core PicoPlaca components.
 
 Contains unit tests for PicoPlacaRule, PicoPlacaRuleSet, and PicoPlacaPredictor classes.
 """
+import os
+import pickle
+import random
+import tempfile
 import unittest
-from datetime import time, datetime
+from datetime import date, time, datetime, timedelta
 from unittest.mock import patch
-from core import PicoPlacaRule, PicoPlacaRuleSet, PicoPlacaPredictor
+from core import (PicoPlacaRule, PicoPlacaRuleSet, PicoPlacaPredictor, PredictionResult,
+                  PicoPlacaSchedule, TripChecker, FleetIndex)
 from core.pico_placa_rule_set import NoRulesDefinedError
+from core.compiled_rule_table import CompiledRuleTable, MINUTES_PER_WEEK
+from core.exception_calendar import ExceptionCalendar, LIFTED
+from core.vectorized_engine import VectorizedEngine, np
+from output import OutputFormatter
+from core.predictor_stats import PredictorStats
+from core.prediction_result import (INVALID_LICENSE_PLATE, INVALID_DATETIME, NO_RULES,
+                                    RULE_ERROR)
 
 class TestPicoPlacaRule(unittest.TestCase):
     """Test cases for the PicoPlacaRule class."""
@@ -50,6 +62,32 @@ class TestPicoPlacaRule(unittest.TestCase):
         self.assertFalse(rule.is_restricted(0, time(9,30), 2))
         self.assertFalse(rule.is_restricted(0, time(8,0), 2))
 
+    def test_rule_is_immutable(self):
+        """Test that rule fields are stored as frozensets and cannot be reassigned."""
+        rule = PicoPlacaRule(days_of_week=[0, 1, 1], restricted_digits=(1, 2),
+                             start_time=time(7, 0), end_time=time(9, 30))
+        self.assertEqual(rule.days_of_week, frozenset({0, 1}))
+        self.assertEqual(rule.restricted_digits, frozenset({1, 2}))
+        with self.assertRaises(AttributeError):
+            rule.start_time = time(8, 0)
+        with self.assertRaises(AttributeError):
+            rule.extra = True
+        self.assertFalse(hasattr(rule, "__dict__"))
+
+    def test_equal_rules_hash_alike(self):
+        """Test that rules with the same fields are equal, hash alike and survive pickling."""
+        rule = PicoPlacaRule(days_of_week=[0, 2], restricted_digits=[1],
+                             start_time=time(7, 0), end_time=time(9, 30))
+        same = PicoPlacaRule(days_of_week=[2, 0], restricted_digits={1},
+                             start_time=time(7, 0), end_time=time(9, 30))
+        other = PicoPlacaRule(days_of_week=[0, 2], restricted_digits=[1],
+                              start_time=time(7, 0), end_time=time(9, 31))
+        self.assertEqual(rule, same)
+        self.assertEqual(hash(rule), hash(same))
+        self.assertNotEqual(rule, other)
+        self.assertEqual(len({rule, same, other}), 2)
+        self.assertEqual(pickle.loads(pickle.dumps(rule)), rule)
+
 class TestPicoPlacaRuleSet(unittest.TestCase):
     """Test cases for the PicoPlacaRuleSet class."""
 
@@ -71,6 +109,28 @@ class TestPicoPlacaRuleSet(unittest.TestCase):
         self.assertEqual(len(self.rule_set.rules_by_day[0]), 1)
         self.assertEqual(len(self.rule_set.rules_by_day[1]), 1)
 
+    def test_rules_by_day_is_read_only(self):
+        """Test that rules cannot be changed behind the compiled table's back."""
+        self.rule_set.add_rule(self.monday_rule)
+        monday = datetime(2023, 10, 2, 8, 0)
+        self.assertTrue(self.rule_set.is_vehicle_restricted(monday, 1))
+        with self.assertRaises(TypeError):
+            self.rule_set.rules_by_day[0] = []
+        with self.assertRaises(AttributeError):
+            self.rule_set.rules_by_day[0].clear()
+        self.assertTrue(self.rule_set.is_vehicle_restricted(monday, 1))
+
+    def test_rules_by_day_view_follows_changes(self):
+        """Test that the same view is returned and reflects add_rule and unpickling."""
+        view = self.rule_set.rules_by_day
+        self.rule_set.add_rule(self.monday_rule)
+        self.assertIs(self.rule_set.rules_by_day, view)
+        self.assertEqual(view[0], (self.monday_rule,))
+        copy = pickle.loads(pickle.dumps(self.rule_set))
+        copy.add_rule(self.tuesday_rule)
+        self.assertEqual(copy.rules_by_day[1], (self.tuesday_rule,))
+        self.assertEqual(view[1], ())
+
     def test_has_rules(self):
         """Test that has_rules correctly identifies when rules are present."""
         self.assertFalse(self.rule_set.has_rules())
@@ -102,6 +162,107 @@ class TestPicoPlacaRuleSet(unittest.TestCase):
         tuesday_datetime = datetime(2023, 10, 3, 8, 0)  # A Tuesday
         self.assertFalse(self.rule_set.is_vehicle_restricted(tuesday_datetime, 1))
 
+    def test_index_matches_linear_scan(self):
+        """Test that the rule index agrees with matching_rule on random rules and times."""
+        rng = random.Random(3)
+        for _ in range(200):
+            start = time(rng.randrange(24), rng.randrange(60), rng.randrange(60))
+            end = time(rng.randrange(24), rng.randrange(60), rng.randrange(60))
+            self.rule_set.add_rule(PicoPlacaRule(
+                days_of_week=rng.sample(range(7), rng.randint(1, 3)),
+                restricted_digits=rng.sample(range(10), rng.randint(1, 3)),
+                start_time=start, end_time=end))
+        monday = datetime(2023, 10, 2)
+        for _ in range(2000):
+            moment = monday + timedelta(seconds=rng.randrange(7 * 86400))
+            digit = rng.randrange(10)
+            self.assertEqual(self.rule_set.is_vehicle_restricted(moment, digit),
+                             self.rule_set.matching_rule(moment, digit) is not None,
+                             (moment, digit))
+
+    def test_matching_rule(self):
+        """Test that matching_rule returns the restricting rule."""
+        self.rule_set.add_rule(self.monday_rule)
+        self.assertIs(self.rule_set.matching_rule(datetime(2023, 10, 2, 8, 0), 2),
+                      self.monday_rule)
+        self.assertIsNone(self.rule_set.matching_rule(datetime(2023, 10, 2, 10, 0), 2))
+
+    def test_optimize_merges_and_prunes(self):
+        """Test that optimize merges overlapping, adjacent and shadowed windows."""
+        for days, digits, start, end in (
+                ([0], [1, 2], time(7, 0), time(8, 0)),
+                ([0], [1, 2], time(8, 0), time(9, 30)),   # adjacent
+                ([0], [1], time(7, 30), time(8, 30)),     # shadowed
+                ([1], [1, 2], time(7, 0), time(9, 30)),   # same window, other day
+                ([2], [3], time(10, 0), time(10, 0)),     # empty window
+                ([0], [1, 2], time(7, 0), time(8, 0))):   # duplicate
+            self.rule_set.add_rule(PicoPlacaRule(days, digits, start, end))
+        original = PicoPlacaRuleSet.from_rules(
+            rule for rules in self.rule_set.rules_by_day.values() for rule in rules)
+
+        self.assertEqual(self.rule_set.optimize(), 5)
+        self.assertEqual(self.rule_set.rules_by_day[0], self.rule_set.rules_by_day[1])
+        self.assertEqual(self.rule_set.rules_by_day[0],
+                         (PicoPlacaRule([0, 1], [1, 2], time(7, 0), time(9, 30)),))
+        self.assertEqual(self.rule_set.rules_by_day[2], ())
+        self.assertEqual(self.rule_set.compile().table, original.compile().table)
+        self.assertEqual(self.rule_set.optimize(), 0)
+
+    def test_optimize_keeps_default_rules(self):
+        """Test that rules that cannot be reduced are left untouched."""
+        self.rule_set.add_rule(self.monday_rule)
+        self.rule_set.add_rule(self.tuesday_rule)
+        self.assertEqual(self.rule_set.optimize(), 0)
+        self.assertIs(self.rule_set.rules_by_day[0][0], self.monday_rule)
+
+    def test_optimize_keeps_rule_set_without_live_rules(self):
+        """Test that a rule set whose rules restrict nothing still has rules."""
+        for _ in range(3):
+            self.rule_set.add_rule(PicoPlacaRule([0], [1], time(9, 0), time(8, 0)))
+        self.assertEqual(self.rule_set.optimize(), 2)
+        self.assertTrue(self.rule_set.has_rules())
+        self.assertFalse(self.rule_set.is_vehicle_restricted(datetime(2023, 10, 2, 8, 30), 1))
+
+    def test_optimize_is_equivalent_on_random_rules(self):
+        """Test that optimized random rules restrict exactly the same moments."""
+        rng = random.Random(18)
+        for _ in range(300):
+            start = time(rng.randrange(24), rng.choice((0, 15, 30, 45)), rng.choice((0, 30)))
+            end = time(rng.randrange(24), rng.choice((0, 15, 30, 45)), rng.choice((0, 30)))
+            self.rule_set.add_rule(PicoPlacaRule(
+                days_of_week=rng.sample(range(7), rng.randint(1, 3)),
+                restricted_digits=rng.sample(range(10), rng.randint(1, 3)),
+                start_time=start, end_time=end))
+        original = PicoPlacaRuleSet.from_rules(
+            rule for rules in self.rule_set.rules_by_day.values() for rule in rules)
+        self.assertGreater(self.rule_set.optimize(), 0)
+        monday = datetime(2023, 10, 2)
+        for _ in range(3000):
+            moment = monday + timedelta(seconds=rng.randrange(7 * 86400))
+            digit = rng.randrange(10)
+            self.assertEqual(self.rule_set.matching_rule(moment, digit) is not None,
+                             original.matching_rule(moment, digit) is not None,
+                             (moment, digit))
+
+    def test_optimize_rejects_snapshot_rule_set(self):
+        """Test that a table-only rule set cannot be optimized."""
+        self.rule_set.add_rule(self.monday_rule)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rules.snapshot")
+            self.rule_set.save_snapshot(path)
+            loaded = PicoPlacaRuleSet.load_snapshot(path)
+            with self.assertRaises(ValueError):
+                loaded.optimize()
+            del loaded
+
+    def test_index_rebuilt_after_add_rule(self):
+        """Test that adding a rule after a lookup is taken into account."""
+        self.rule_set.add_rule(self.monday_rule)
+        tuesday_datetime = datetime(2023, 10, 3, 8, 0)
+        self.assertFalse(self.rule_set.is_vehicle_restricted(tuesday_datetime, 3))
+        self.rule_set.add_rule(self.tuesday_rule)
+        self.assertTrue(self.rule_set.is_vehicle_restricted(tuesday_datetime, 3))
+
     def test_no_rules_defined_error(self):
         """Test that NoRulesDefinedError is raised when appropriate."""
         test_datetime = datetime(2023, 10, 2, 8, 0)
@@ -115,6 +276,629 @@ class TestPicoPlacaRuleSet(unittest.TestCase):
             test_datetime, 1, raise_on_no_rules=False))
 
 
+class TestCompiledRuleTable(unittest.TestCase):
+    """Test cases for the CompiledRuleTable produced by PicoPlacaRuleSet.compile."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.rule_set = PicoPlacaRuleSet()
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[0, 2], restricted_digits=[1, 2],
+                                             start_time=time(7, 0), end_time=time(9, 30)))
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[2], restricted_digits=[2, 5],
+                                             start_time=time(9, 0), end_time=time(20, 0)))
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[6], restricted_digits=[0],
+                                             start_time=time(0, 0), end_time=time(23, 59)))
+
+    def test_matches_reference_engine(self):
+        """Test that the compiled table agrees with the linear engine for every minute."""
+        table = self.rule_set.compile()
+        monday = datetime(2023, 10, 2)
+        for minute in range(MINUTES_PER_WEEK):
+            moment = monday + timedelta(minutes=minute)
+            for digit in range(10):
+                self.assertEqual(table.is_vehicle_restricted(moment, digit),
+                                 self.rule_set.matching_rule(moment, digit) is not None,
+                                 f"Mismatch at {moment} for digit {digit}")
+
+    def test_compile_is_cached_until_rule_added(self):
+        """Test that compile reuses its table and rebuilds it after add_rule."""
+        table = self.rule_set.compile()
+        self.assertIs(self.rule_set.compile(), table)
+
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[4], restricted_digits=[9],
+                                             start_time=time(6, 0), end_time=time(7, 0)))
+        recompiled = self.rule_set.compile()
+        self.assertIsNot(recompiled, table)
+        self.assertTrue(recompiled.is_vehicle_restricted(datetime(2023, 10, 6, 6, 30), 9))
+
+    def test_equal_rule_sets_share_their_table(self):
+        """Test that rule sets built from equal rules reuse one compiled table."""
+        rules = [PicoPlacaRule(days_of_week=[d], restricted_digits=[d], start_time=time(7, 0),
+                               end_time=time(8, 0)) for d in range(7)]
+        first = PicoPlacaRuleSet.from_rules(rules)
+        second = PicoPlacaRuleSet.from_rules(
+            PicoPlacaRule(rule.days_of_week, rule.restricted_digits, rule.start_time,
+                          rule.end_time) for rule in rules)
+        self.assertIs(first.compile(), second.compile())
+
+    def test_empty_rule_set(self):
+        """Test that an empty rule set compiles to a table without rules."""
+        table = PicoPlacaRuleSet().compile()
+        self.assertFalse(table.has_rules)
+        self.assertFalse(table.is_vehicle_restricted(datetime(2023, 10, 2, 8, 0), 1))
+
+    def test_unaligned_boundary_rejected(self):
+        """Test that rules with sub-minute boundaries cannot be compiled."""
+        rule_set = PicoPlacaRuleSet()
+        rule_set.add_rule(PicoPlacaRule(days_of_week=[0], restricted_digits=[1],
+                                        start_time=time(7, 0, 30), end_time=time(9, 30)))
+        with self.assertRaises(ValueError):
+            rule_set.compile()
+
+
+class TestRuleSetSnapshot(unittest.TestCase):
+    """Test cases for exporting and importing compiled rule set snapshots."""
+
+    def setUp(self):
+        """Set up a rule set and a temporary snapshot path."""
+        self.rule_set = PicoPlacaRuleSet()
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[0, 2], restricted_digits=[1, 2],
+                                             start_time=time(7, 0), end_time=time(9, 30)))
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[6], restricted_digits=[0],
+                                             start_time=time(22, 0), end_time=time(23, 59)))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "rules.snapshot")
+
+    def test_round_trip(self):
+        """Test that a loaded snapshot answers every query like the original rule set."""
+        self.rule_set.save_snapshot(self.path)
+        loaded = PicoPlacaRuleSet.load_snapshot(self.path)
+
+        self.assertTrue(loaded.has_rules())
+        self.assertIsInstance(loaded.compile().table, memoryview)
+        self.assertEqual(bytes(loaded.compile().table), self.rule_set.compile().table)
+        moment = datetime(2023, 10, 4, 9, 29, 59)
+        self.assertTrue(loaded.is_vehicle_restricted(moment, 2))
+        self.assertEqual(loaded.next_unrestricted(moment, 2), datetime(2023, 10, 4, 9, 30))
+        self.assertEqual(loaded.next_restricted(moment, 0), datetime(2023, 10, 8, 22, 0))
+        for digit in (0, 1, 3):
+            self.assertEqual(
+                list(loaded.restriction_calendar(digit, date(2023, 10, 1), date(2023, 10, 31))),
+                list(self.rule_set.restriction_calendar(digit, date(2023, 10, 1),
+                                                        date(2023, 10, 31))))
+
+    def test_snapshot_rule_set_has_no_rule_objects(self):
+        """Test that a snapshot rule set reports no matching rule and rejects new rules."""
+        self.rule_set.save_snapshot(self.path)
+        loaded = PicoPlacaRuleSet.load_snapshot(self.path)
+        self.assertIsNone(loaded.matching_rule(datetime(2023, 10, 2, 8, 0), 1))
+        with self.assertRaises(ValueError):
+            loaded.add_rule(PicoPlacaRule(days_of_week=[1], restricted_digits=[1],
+                                          start_time=time(7, 0), end_time=time(8, 0)))
+
+    def test_empty_rule_set_snapshot(self):
+        """Test that a snapshot of an empty rule set still raises NoRulesDefinedError."""
+        PicoPlacaRuleSet().save_snapshot(self.path)
+        loaded = PicoPlacaRuleSet.load_snapshot(self.path)
+        self.assertFalse(loaded.has_rules())
+        with self.assertRaises(NoRulesDefinedError):
+            loaded.is_vehicle_restricted(datetime(2023, 10, 2, 8, 0), 1)
+
+    def test_pickled_mapped_table_maps_the_same_file(self):
+        """Test that a mapped table is pickled as its path rather than its contents."""
+        self.rule_set.save_snapshot(self.path)
+        loaded = PicoPlacaRuleSet.load_snapshot(self.path)
+        data = pickle.dumps(loaded)
+        self.assertLess(len(data), 1000)
+        copy = pickle.loads(data)
+        self.assertEqual(copy.compile().source, loaded.compile().source)
+        self.assertTrue(copy.is_vehicle_restricted(datetime(2023, 10, 2, 8, 0), 1))
+
+    def test_invalid_snapshots_rejected(self):
+        """Test that foreign, truncated and incompatible files are rejected."""
+        self.rule_set.save_snapshot(self.path)
+        with open(self.path, "rb") as snapshot:
+            content = snapshot.read()
+        for corrupted in (b"", b"plate,date,time\n", content[:-1],
+                          content[:4] + b"\x63\x00" + content[6:]):
+            with open(self.path, "wb") as snapshot:
+                snapshot.write(corrupted)
+            with self.assertRaises(ValueError):
+                PicoPlacaRuleSet.load_snapshot(self.path)
+
+
+class TestNextChangeQueries(unittest.TestCase):
+    """Test cases for next_unrestricted and next_restricted against brute-force scanning."""
+
+    @staticmethod
+    def _scan(table, minute, digit, restricted):
+        for delta in range(2 * MINUTES_PER_WEEK):
+            if table.is_restricted_at((minute + delta) % MINUTES_PER_WEEK, digit) == restricted:
+                return delta
+        return None
+
+    def _check_table(self, table, minutes):
+        for digit in range(10):
+            for minute in minutes:
+                self.assertEqual(table.minutes_until_unrestricted(minute, digit),
+                                 self._scan(table, minute, digit, False), (digit, minute))
+                self.assertEqual(table.minutes_until_restricted(minute, digit),
+                                 self._scan(table, minute, digit, True), (digit, minute))
+
+    def test_random_rule_sets_match_brute_force(self):
+        """Test the interval index on random rule sets at random minutes."""
+        rng = random.Random(42)
+        for _ in range(5):
+            rule_set = PicoPlacaRuleSet()
+            for _ in range(rng.randint(1, 8)):
+                start = rng.randrange(24 * 60 - 1)
+                end = rng.randint(start + 1, 24 * 60 - 1)
+                rule_set.add_rule(PicoPlacaRule(
+                    days_of_week=rng.sample(range(7), rng.randint(1, 3)),
+                    restricted_digits=rng.sample(range(10), rng.randint(1, 4)),
+                    start_time=time(*divmod(start, 60)), end_time=time(*divmod(end, 60))))
+            self._check_table(rule_set.compile(), rng.sample(range(MINUTES_PER_WEEK), 40))
+
+    def test_wrapping_and_constant_tables(self):
+        """Test intervals that wrap around the week and digits that never change."""
+        table = bytearray(10 * MINUTES_PER_WEEK)
+        table[0:60] = b"\x01" * 60                                       # digit 0 wraps
+        table[MINUTES_PER_WEEK - 30:MINUTES_PER_WEEK] = b"\x01" * 30
+        table[MINUTES_PER_WEEK:2 * MINUTES_PER_WEEK] = b"\x01" * MINUTES_PER_WEEK  # digit 1
+        table[2 * MINUTES_PER_WEEK - 10:2 * MINUTES_PER_WEEK] = b"\x01" * 10
+        table[3 * MINUTES_PER_WEEK - 10:3 * MINUTES_PER_WEEK] = b"\x01" * 10     # digit 2
+        compiled = CompiledRuleTable(bytes(table), True)
+        self._check_table(compiled, [0, 30, 59, 60, MINUTES_PER_WEEK - 31,
+                                     MINUTES_PER_WEEK - 30, MINUTES_PER_WEEK - 1])
+        self.assertIsNone(compiled.minutes_until_unrestricted(100, 1))
+        self.assertIsNone(compiled.minutes_until_restricted(100, 5))
+
+    def test_rule_set_returns_datetimes(self):
+        """Test that the rule set queries return the start of the changing minute."""
+        rule_set = PicoPlacaRuleSet()
+        rule_set.add_rule(PicoPlacaRule(days_of_week=[0, 4], restricted_digits=[1],
+                                        start_time=time(7, 0), end_time=time(9, 30)))
+        during = datetime(2023, 10, 2, 8, 15, 42)  # A Monday
+        self.assertEqual(rule_set.next_unrestricted(during, 1), datetime(2023, 10, 2, 9, 30))
+        self.assertEqual(rule_set.next_restricted(during, 1), during)
+        after = datetime(2023, 10, 2, 9, 30)
+        self.assertEqual(rule_set.next_unrestricted(after, 1), after)
+        self.assertEqual(rule_set.next_restricted(after, 1), datetime(2023, 10, 6, 7, 0))
+        self.assertIsNone(rule_set.next_restricted(after, 2))
+
+
+class TestRestrictionCalendar(unittest.TestCase):
+    """Test cases for PicoPlacaRuleSet.restriction_calendar."""
+
+    def setUp(self):
+        """Set up overlapping, adjacent and disjoint windows."""
+        self.rule_set = PicoPlacaRuleSet()
+        for start, end in ((time(7, 0), time(8, 0)), (time(7, 30), time(9, 0)),
+                           (time(9, 0), time(9, 30)), (time(16, 0), time(20, 0))):
+            self.rule_set.add_rule(PicoPlacaRule(days_of_week=[0, 3], restricted_digits=[1],
+                                                 start_time=start, end_time=end))
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[6], restricted_digits=[1, 2],
+                                             start_time=time(22, 0), end_time=time(23, 59)))
+
+    def test_matches_minute_probing(self):
+        """Test that the calendar covers exactly the restricted minutes of a month."""
+        start_date, end_date = date(2023, 10, 1), date(2023, 10, 31)
+        intervals = list(self.rule_set.restriction_calendar(1, start_date, end_date))
+
+        expected = []
+        moment = datetime(2023, 10, 1)
+        while moment < datetime(2023, 11, 1):
+            if self.rule_set.is_vehicle_restricted(moment, 1):
+                if expected and expected[-1][1] == moment:
+                    expected[-1] = (expected[-1][0], moment + timedelta(minutes=1))
+                else:
+                    expected.append((moment, moment + timedelta(minutes=1)))
+            moment += timedelta(minutes=1)
+        self.assertEqual(intervals, expected)
+        self.assertEqual(intervals[1], (datetime(2023, 10, 2, 7, 0), datetime(2023, 10, 2, 9, 30)))
+
+    def test_clipped_to_range(self):
+        """Test that intervals are clipped to the requested dates."""
+        self.assertEqual(list(self.rule_set.restriction_calendar(2, date(2023, 10, 2),
+                                                                 date(2023, 10, 8))),
+                         [(datetime(2023, 10, 8, 22, 0), datetime(2023, 10, 8, 23, 59))])
+        self.assertEqual(list(self.rule_set.restriction_calendar(5, date(2023, 1, 1),
+                                                                 date(2023, 12, 31))), [])
+        self.assertEqual(list(self.rule_set.restriction_calendar(1, date(2023, 10, 8),
+                                                                 date(2023, 10, 1))), [])
+
+
+class TestExceptionCalendar(unittest.TestCase):
+    """Test cases for exception dates attached to a PicoPlacaRuleSet."""
+
+    def setUp(self):
+        """Set up a rule set with a lifted Monday and a Saturday restricted as a Monday."""
+        self.rule_set = PicoPlacaRuleSet()
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[0], restricted_digits=[1, 2],
+                                             start_time=time(7, 0), end_time=time(9, 30)))
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[0], restricted_digits=[1],
+                                             start_time=time(20, 0), end_time=time(23, 59)))
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[1], restricted_digits=[1],
+                                             start_time=time(0, 0), end_time=time(1, 0)))
+        self.rule_set.exceptions.lift(date(2023, 10, 9))
+        self.rule_set.exceptions.restrict_as(date(2023, 10, 14), 0)
+
+    def _minutes(self):
+        """Yields every minute of three weeks around the exception dates."""
+        moment = datetime(2023, 10, 1)
+        while moment < datetime(2023, 10, 22):
+            yield moment
+            moment += timedelta(minutes=1)
+
+    def test_calendar(self):
+        """Test lookups, ranges and removal on the calendar itself."""
+        exceptions = ExceptionCalendar(lifted=[date(2023, 12, 25)],
+                                       restricted_as={date(2023, 12, 23): 0})
+        self.assertEqual(exceptions.weekday_of(date(2023, 12, 25)), LIFTED)
+        self.assertEqual(exceptions.weekday_of(date(2023, 12, 23)), 0)
+        self.assertEqual(exceptions.weekday_of(date(2023, 12, 24)), 6)
+        self.assertEqual(exceptions.exceptions_between(date(2023, 12, 24), date(2023, 12, 31)),
+                         [(date(2023, 12, 25), LIFTED)])
+        self.assertEqual(exceptions.last_date(), date(2023, 12, 25))
+        self.assertEqual(exceptions.next_date(date(2023, 12, 24)), date(2023, 12, 25))
+        self.assertEqual(exceptions.next_date(date(2023, 12, 23)), date(2023, 12, 23))
+        self.assertIsNone(exceptions.next_date(date(2023, 12, 26)))
+        exceptions.remove(date(2023, 12, 25))
+        self.assertNotIn(date(2023, 12, 25), exceptions)
+        self.assertEqual(len(exceptions), 1)
+        with self.assertRaises(ValueError):
+            exceptions.restrict_as(date(2023, 12, 30), 7)
+
+    def test_overrides_are_read_only(self):
+        """Test that exceptions change only through the calendar, keeping ranges in step."""
+        exceptions = ExceptionCalendar(lifted=[date(2023, 12, 25)])
+        with self.assertRaises(TypeError):
+            exceptions.overrides[date(2023, 12, 31).toordinal()] = LIFTED
+        copy = ExceptionCalendar.from_overrides(exceptions.overrides)
+        self.assertEqual(copy.overrides, exceptions.overrides)
+        self.assertEqual(copy.last_date(), date(2023, 12, 25))
+        with self.assertRaises(ValueError):
+            ExceptionCalendar.from_overrides({date(2023, 12, 30).toordinal(): 7})
+
+    def test_lookups(self):
+        """Test that lifted dates are never restricted and overridden dates follow their weekday."""
+        self.assertTrue(self.rule_set.is_vehicle_restricted(datetime(2023, 10, 2, 8, 0), 2))
+        self.assertFalse(self.rule_set.is_vehicle_restricted(datetime(2023, 10, 9, 8, 0), 2))
+        self.assertIsNone(self.rule_set.matching_rule(datetime(2023, 10, 9, 8, 0), 2))
+        self.assertTrue(self.rule_set.is_vehicle_restricted(datetime(2023, 10, 14, 8, 0), 2))
+        self.assertIsNotNone(self.rule_set.matching_rule(datetime(2023, 10, 14, 8, 0), 2))
+        self.assertFalse(self.rule_set.is_vehicle_restricted(datetime(2023, 10, 16, 23, 59), 1))
+
+    def test_next_change_queries_match_minute_probing(self):
+        """Test the next-change queries against a minute-by-minute scan."""
+        minutes = list(self._minutes())
+        for digit in (1, 2):
+            states = [self.rule_set.is_vehicle_restricted(moment, digit) for moment in minutes]
+            for index in range(0, len(minutes) - MINUTES_PER_WEEK, 97):
+                for restricted, query in ((True, self.rule_set.next_restricted),
+                                          (False, self.rule_set.next_unrestricted)):
+                    expected = states.index(restricted, index)
+                    self.assertEqual(query(minutes[index], digit), minutes[expected],
+                                     (minutes[index], digit, restricted))
+
+    def test_next_change_skips_to_distant_exceptions(self):
+        """Test next-change queries across ordinary weeks before a far-off exception."""
+        self.rule_set.exceptions.lift(date(2043, 10, 5))
+        self.rule_set.exceptions.restrict_as(date(2043, 10, 10), 1)
+        self.assertEqual(self.rule_set.next_restricted(datetime(2023, 10, 17, 2, 0), 2),
+                         datetime(2023, 10, 23, 7, 0))
+        self.assertEqual(self.rule_set.next_unrestricted(datetime(2043, 10, 5, 8, 0), 2),
+                         datetime(2043, 10, 5, 8, 0))
+        self.assertEqual(self.rule_set.next_restricted(datetime(2043, 10, 6, 2, 0), 1),
+                         datetime(2043, 10, 10, 0, 0))
+        self.assertIsNone(self.rule_set.next_restricted(datetime(2023, 10, 10), 9))
+
+    def test_restriction_calendar_matches_minute_probing(self):
+        """Test that the calendar follows the exception dates."""
+        for digit in (1, 2):
+            expected = []
+            for moment in self._minutes():
+                if self.rule_set.is_vehicle_restricted(moment, digit):
+                    if expected and expected[-1][1] == moment:
+                        expected[-1] = (expected[-1][0], moment + timedelta(minutes=1))
+                    else:
+                        expected.append((moment, moment + timedelta(minutes=1)))
+            self.assertEqual(list(self.rule_set.restriction_calendar(
+                digit, date(2023, 10, 1), date(2023, 10, 21))), expected)
+
+    def test_trip_checker(self):
+        """Test trip overlaps across exception dates against minute-by-minute sampling."""
+        checker = TripChecker(self.rule_set)
+        rng = random.Random(11)
+        for _ in range(60):
+            start = datetime(2023, 10, 1) + timedelta(minutes=rng.randrange(MINUTES_PER_WEEK * 2))
+            end = start + timedelta(minutes=rng.randrange(4000))
+            sampled = sum(self.rule_set.is_vehicle_restricted(start + timedelta(minutes=m), 1)
+                          for m in range(int((end - start) / timedelta(minutes=1))))
+            self.assertEqual(checker.check(1, start, end).overlap, timedelta(minutes=sampled))
+
+    def test_predictor_paths(self):
+        """Test that single and batch predictions apply the exception dates."""
+        predictor = PicoPlacaPredictor(self.rule_set)
+        triples = [("ABC-122", "2023-10-09", "08:00"), ("ABC-122", "2023-10-14", "08:00"),
+                   ("ABC-122", "2023-10-02", "08:00")]
+        self.assertEqual([result.restricted for result in predictor.predict_many(triples)],
+                         [False, True, True])
+        self.assertIn("not restricted", predictor.predict_restriction(*triples[0]))
+
+        unaligned = PicoPlacaRuleSet()
+        unaligned.add_rule(PicoPlacaRule(days_of_week=[0], restricted_digits=[2],
+                                         start_time=time(7, 0, 30), end_time=time(9, 30)))
+        unaligned.exceptions = self.rule_set.exceptions
+        self.assertEqual([result.restricted for result in
+                          PicoPlacaPredictor(unaligned).predict_many(triples)],
+                         [False, True, True])
+
+    def test_snapshot_keeps_exceptions(self):
+        """Test that exception dates are stored in and loaded from snapshots."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rules.snapshot")
+            self.rule_set.save_snapshot(path)
+            loaded = PicoPlacaRuleSet.load_snapshot(path)
+            self.assertEqual(loaded.exceptions.overrides, self.rule_set.exceptions.overrides)
+            self.assertFalse(loaded.is_vehicle_restricted(datetime(2023, 10, 9, 8, 0), 2))
+            self.assertTrue(loaded.is_vehicle_restricted(datetime(2023, 10, 14, 8, 0), 2))
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_vectorized_engine(self):
+        """Test that the vectorized engine applies the exception dates on both paths."""
+        moments = list(self._minutes())[::7]
+        digits = np.array([index % 3 for index in range(len(moments))], dtype=np.uint8)
+        stamps = np.array(moments, dtype="datetime64[us]")
+        expected = [self.rule_set.is_vehicle_restricted(moment, int(digit))
+                    for moment, digit in zip(moments, digits)]
+        self.assertEqual(VectorizedEngine(self.rule_set).is_restricted(digits, stamps).tolist(),
+                         expected)
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[5], restricted_digits=[0],
+                                             start_time=time(3, 0, 1), end_time=time(3, 0, 2)))
+        self.assertEqual(VectorizedEngine(self.rule_set).is_restricted(digits, stamps).tolist(),
+                         expected)
+
+
+class TestTripChecker(unittest.TestCase):
+    """Test cases for the TripChecker class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.rule_set = PicoPlacaRuleSet()
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[0, 2], restricted_digits=[1, 2],
+                                             start_time=time(7, 0), end_time=time(9, 30)))
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[0], restricted_digits=[1],
+                                             start_time=time(16, 0), end_time=time(20, 0)))
+        self.checker = TripChecker(self.rule_set)
+
+    def test_matches_sampling(self):
+        """Test overlaps of random minute-aligned trips against minute-by-minute sampling."""
+        rng = random.Random(7)
+        monday = datetime(2023, 10, 2)
+        for _ in range(100):
+            start = monday + timedelta(minutes=rng.randrange(2 * MINUTES_PER_WEEK))
+            end = start + timedelta(minutes=rng.randrange(3000))
+            digit = rng.choice([1, 2, 3])
+            sampled = sum(self.rule_set.is_vehicle_restricted(start + timedelta(minutes=m), digit)
+                          for m in range(int((end - start) / timedelta(minutes=1))))
+            result = self.checker.check(digit, start, end)
+            self.assertEqual(result.overlap_minutes, sampled)
+            self.assertEqual(result.overlaps, sampled > 0)
+
+    def test_partial_minutes_and_long_trips(self):
+        """Test sub-minute overlaps and trips spanning several weeks."""
+        trips = [(1, datetime(2023, 10, 2, 15, 59, 30), datetime(2023, 10, 2, 16, 0, 45)),
+                 (1, datetime(2023, 10, 2, 9, 30), datetime(2023, 10, 2, 16, 0)),
+                 (2, datetime(2023, 10, 1), datetime(2023, 10, 22)),
+                 (1, datetime(2023, 10, 2, 8, 0), datetime(2023, 10, 2, 7, 0))]
+        results = list(self.checker.check_trips(trips))
+        self.assertEqual(results[0].overlap, timedelta(seconds=45))
+        self.assertFalse(results[1].overlaps)
+        self.assertEqual(results[2].overlap, timedelta(hours=2, minutes=30) * 6)
+        self.assertFalse(results[3].overlaps)
+
+    def test_no_rules_defined_error(self):
+        """Test that checking trips without rules raises NoRulesDefinedError."""
+        with self.assertRaises(NoRulesDefinedError):
+            TripChecker(PicoPlacaRuleSet()).check(1, datetime(2023, 10, 2), datetime(2023, 10, 3))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestVectorizedEngine(unittest.TestCase):
+    """Test cases for the NumPy VectorizedEngine."""
+
+    def setUp(self):
+        """Set up test fixtures with a week of timestamps for every digit."""
+        self.rule_set = PicoPlacaRuleSet()
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[0, 2], restricted_digits=[1, 2],
+                                             start_time=time(7, 0), end_time=time(9, 30)))
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[6], restricted_digits=[0],
+                                             start_time=time(16, 0), end_time=time(20, 0)))
+        minutes = np.arange(0, MINUTES_PER_WEEK, 7)
+        start = np.datetime64("2023-10-02T00:00:30")  # A Monday
+        self.timestamps = np.repeat(start + minutes.astype("timedelta64[m]"), 10)
+        self.digits = np.tile(np.arange(10, dtype=np.uint8), len(minutes))
+
+    def _reference(self, rule_set):
+        return [rule_set.is_vehicle_restricted(moment.item(), int(digit))
+                for moment, digit in zip(self.timestamps, self.digits)]
+
+    def test_matches_scalar_engine(self):
+        """Test that the compiled-table path matches the scalar engine."""
+        mask = VectorizedEngine(self.rule_set).is_restricted(self.digits, self.timestamps)
+        self.assertEqual(mask.tolist(), self._reference(self.rule_set))
+
+    def test_unaligned_rules_match_scalar_engine(self):
+        """Test that rules with sub-minute boundaries are evaluated window by window."""
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[3], restricted_digits=[7],
+                                             start_time=time(8, 0, 45), end_time=time(9, 0)))
+        mask = VectorizedEngine(self.rule_set).is_restricted(self.digits, self.timestamps)
+        self.assertEqual(mask.tolist(), self._reference(self.rule_set))
+
+    def test_not_a_time_is_not_restricted(self):
+        """Test that NaT timestamps are reported as not restricted."""
+        timestamps = np.array(["2023-10-02T08:00", "NaT"], dtype="datetime64[m]")
+        mask = VectorizedEngine(self.rule_set).is_restricted([1, 1], timestamps)
+        self.assertEqual(mask.tolist(), [True, False])
+
+    def test_no_rules_defined_error(self):
+        """Test that an empty rule set raises unless asked not to."""
+        engine = VectorizedEngine(PicoPlacaRuleSet())
+        with self.assertRaises(NoRulesDefinedError):
+            engine.is_restricted(self.digits, self.timestamps)
+        self.assertFalse(engine.is_restricted(self.digits, self.timestamps,
+                                              raise_on_no_rules=False).any())
+
+
+class TestFleetIndex(unittest.TestCase):
+    """Test cases for whole-fleet availability queries."""
+
+    def setUp(self):
+        """Set up a fleet with every digit, repeated plates and invalid plates."""
+        rng = random.Random(23)
+        self.rule_set = PicoPlacaRuleSet()
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[0, 2], restricted_digits=[1, 2],
+                                             start_time=time(7, 0), end_time=time(9, 30)))
+        self.rule_set.add_rule(PicoPlacaRule(days_of_week=[2], restricted_digits=[3, 4],
+                                             start_time=time(16, 0), end_time=time(19, 30)))
+        self.rule_set.exceptions.lift(date(2023, 10, 9))
+        self.plates = [f"ABC-{rng.randrange(100, 10000)}" for _ in range(300)]
+        self.plates[10:13] = ["abc-1231", "ABC-12", self.plates[0]]
+        self.index = FleetIndex(self.rule_set, self.plates)
+        self.hours = [datetime(2023, 10, 2) + timedelta(hours=hour, minutes=15)
+                      for hour in range(14 * 24)]
+
+    def _allowed(self, moment):
+        """Lists the positions of the plates that may drive, one rule check per plate."""
+        return [position for position, plate in enumerate(self.plates)
+                if plate not in ("abc-1231", "ABC-12")
+                and not self.rule_set.is_vehicle_restricted(moment, int(plate[-1]))]
+
+    def test_matches_per_plate_checks(self):
+        """Test that every query agrees with checking each plate on its own."""
+        self.assertEqual(self.index.invalid, ("abc-1231", "ABC-12"))
+        for moment, bitmap in self.index.allowed_bitmaps(self.hours):
+            allowed = self._allowed(moment)
+            self.assertEqual([position for position in range(len(self.plates))
+                              if bitmap >> position & 1], allowed)
+            self.assertEqual(self.index.plates_in(bitmap),
+                             [self.plates[position] for position in allowed])
+            self.assertEqual(self.index.allowed_count(moment), len(allowed))
+            self.assertEqual(sorted(plate for group in self.index.allowed_groups(moment)
+                                    for plate in group),
+                             sorted(self.plates[position] for position in allowed))
+
+    def test_allowed_digits_and_counts(self):
+        """Test digit and count queries, including a lifted day."""
+        self.assertEqual(self.index.allowed_digits(datetime(2023, 10, 4, 8, 0)),
+                         (0, 3, 4, 5, 6, 7, 8, 9))
+        self.assertEqual(self.index.allowed_digits(datetime(2023, 10, 9, 8, 0)),
+                         tuple(range(10)))
+        counts = dict(self.index.allowed_counts(self.hours))
+        self.assertEqual(counts[datetime(2023, 10, 9, 8, 15)], len(self.plates) - 2)
+        self.assertIs(self.index.allowed_groups(datetime(2023, 10, 9, 8, 0))[0],
+                      self.index.groups[0])
+
+    def test_schedule_and_no_rules(self):
+        """Test that schedules are supported and missing rules raise."""
+        schedule = PicoPlacaSchedule()
+        schedule.add_version(date(2023, 10, 4), self.rule_set)
+        index = FleetIndex(schedule, self.plates)
+        self.assertEqual(index.allowed_bitmap(datetime(2023, 10, 4, 8, 0)),
+                         self.index.allowed_bitmap(datetime(2023, 10, 4, 8, 0)))
+        with self.assertRaises(NoRulesDefinedError):
+            index.allowed_count(datetime(2023, 10, 2, 8, 0))
+        self.assertEqual(FleetIndex(self.rule_set, []).plates_in(0), [])
+
+
+class TestPicoPlacaSchedule(unittest.TestCase):
+    """Test cases for effective-dated rule set versions."""
+
+    def setUp(self):
+        """Set up a schedule whose restricted digits change on 2023-10-05 and 2023-10-12."""
+        self.schedule = PicoPlacaSchedule()
+        for effective_from, digits, end_time in ((date(2023, 10, 12), [5], time(23, 59)),
+                                                 (date(2023, 10, 1), [1], time(9, 30)),
+                                                 (date(2023, 10, 5), [2], time(9, 30))):
+            rule_set = PicoPlacaRuleSet()
+            rule_set.add_rule(PicoPlacaRule(days_of_week=list(range(7)), restricted_digits=digits,
+                                            start_time=time(7, 0), end_time=end_time))
+            self.schedule.add_version(effective_from, rule_set)
+
+    def _minutes(self):
+        """Yields every minute from 2023-09-30 to 2023-10-19."""
+        moment = datetime(2023, 9, 30)
+        while moment < datetime(2023, 10, 20):
+            yield moment
+            moment += timedelta(minutes=1)
+
+    def test_version_selection(self):
+        """Test that each date uses the version in force on it."""
+        self.assertEqual(self.schedule.effective_dates,
+                         [date(2023, 10, 1), date(2023, 10, 5), date(2023, 10, 12)])
+        self.assertIsNone(self.schedule.rule_set_for(date(2023, 9, 30)))
+        self.assertIs(self.schedule.rule_set_for(date(2023, 10, 4)), self.schedule.rule_sets[0])
+        self.assertIs(self.schedule.rule_set_for(date(2023, 10, 5)), self.schedule.rule_sets[1])
+        self.assertTrue(self.schedule.is_vehicle_restricted(datetime(2023, 10, 4, 8, 0), 1))
+        self.assertFalse(self.schedule.is_vehicle_restricted(datetime(2023, 10, 5, 8, 0), 1))
+        self.assertTrue(self.schedule.is_vehicle_restricted(datetime(2023, 10, 5, 8, 0), 2))
+        with self.assertRaises(NoRulesDefinedError):
+            self.schedule.is_vehicle_restricted(datetime(2023, 9, 30, 8, 0), 1)
+        self.assertFalse(self.schedule.is_vehicle_restricted(datetime(2023, 9, 30, 8, 0), 1,
+                                                             raise_on_no_rules=False))
+        with self.assertRaises(ValueError):
+            self.schedule.add_version(date(2023, 10, 5), PicoPlacaRuleSet())
+
+    def test_next_change_queries_cross_versions(self):
+        """Test the next-change queries against a minute-by-minute scan."""
+        minutes = list(self._minutes())
+        for digit in (1, 2, 5):
+            states = [self.schedule.is_vehicle_restricted(moment, digit, raise_on_no_rules=False)
+                      for moment in minutes]
+            for index in range(0, len(minutes) - 2 * 24 * 60, 131):
+                for restricted, query in ((True, self.schedule.next_restricted),
+                                          (False, self.schedule.next_unrestricted)):
+                    expected = (minutes[states.index(restricted, index)]
+                                if restricted in states[index:] else None)
+                    self.assertEqual(query(minutes[index], digit), expected,
+                                     (minutes[index], digit, restricted))
+
+    def test_restriction_calendar_spans_versions(self):
+        """Test that the calendar switches versions on their effective dates."""
+        intervals = list(self.schedule.restriction_calendar(1, date(2023, 9, 25), date(2023, 10, 6)))
+        self.assertEqual(intervals[0], (datetime(2023, 10, 1, 7, 0), datetime(2023, 10, 1, 9, 30)))
+        self.assertEqual(intervals[-1], (datetime(2023, 10, 4, 7, 0), datetime(2023, 10, 4, 9, 30)))
+        self.assertEqual(len(intervals), 4)
+
+    def test_predictor_uses_the_version_in_force(self):
+        """Test single and batch predictions over dates with different versions."""
+        predictor = PicoPlacaPredictor(self.schedule)
+        triples = [("ABC-121", "2023-10-04", "08:00"), ("ABC-121", "2023-10-05", "08:00"),
+                   ("ABC-122", "2023-10-05", "08:00"), ("ABC-125", "2023-10-12", "22:00"),
+                   ("ABC-121", "2023-09-30", "08:00"), ("ABC-121", "2023-10-5", "8:00")]
+        results = list(predictor.predict_many(triples))
+        self.assertEqual([result.restricted for result in results],
+                         [True, False, True, True, None, False])
+        self.assertEqual(results[4].error_code, NO_RULES)
+        self.assertEqual(predictor.predict_restriction(*triples[3]),
+                         OutputFormatter.format_prediction(True))
+        self.assertTrue(predictor.predict_restriction(*triples[4]).startswith("Error: "))
+
+    def test_predictor_with_exceptions_and_unaligned_versions(self):
+        """Test batch predictions against versions with exceptions or sub-minute rules."""
+        self.schedule.rule_sets[0].exceptions.lift(date(2023, 10, 2))
+        self.schedule.rule_sets[1].add_rule(PicoPlacaRule(
+            days_of_week=[3], restricted_digits=[3], start_time=time(7, 0, 30),
+            end_time=time(8, 0)))
+        predictor = PicoPlacaPredictor(self.schedule)
+        triples = [("ABC-121", "2023-10-02", "08:00"), ("ABC-121", "2023-10-03", "08:00"),
+                   ("ABC-123", "2023-10-05", "07:30"), ("ABC-123", "2023-10-05", "08:00")]
+        self.assertEqual([result.restricted for result in predictor.predict_many(triples)],
+                         [False, True, True, False])
+
+
 class TestPicoPlacaPredictor(unittest.TestCase):
     """Test cases for the PicoPlacaPredictor class."""
 
@@ -187,6 +971,187 @@ class TestPicoPlacaPredictor(unittest.TestCase):
         mock_parse_datetime.assert_called_once_with("invalid-date", "08:00")
         self.assertEqual(result, "Error: Invalid date or time format")
 
+    def test_predict_restriction_unaligned_rules(self):
+        """Test that rules that cannot be compiled are evaluated by the reference engine."""
+        rule_set = PicoPlacaRuleSet()
+        rule_set.add_rule(PicoPlacaRule(days_of_week=[0], restricted_digits=[1],
+                                        start_time=time(7, 0, 30), end_time=time(9, 30)))
+        predictor = PicoPlacaPredictor(rule_set)
+
+        self.assertEqual(predictor.predict_restriction("ABC-121", "2023-10-02", "07:00"),
+                         "Vehicle is not restricted to circulate at this time and date")
+        self.assertEqual(predictor.predict_restriction("ABC-121", "2023-10-02", "07:01"),
+                         "Vehicle is restricted to circulate at this time and date")
+
+    def test_predict_many(self):
+        """Test that predict_many yields structured results in input order."""
+        triples = [("ABC-121", "2023-10-02", "08:00"),
+                   ("ABC-125", "2023-10-02", "08:00"),
+                   ("INVALID", "2023-10-02", "08:00"),
+                   ("ABC-122", "2023-10-02", "8:00am"),
+                   ("ABC-121", "2023-10-02", "08:00")]
+
+        results = list(self.predictor.predict_many(iter(triples)))
+
+        self.assertEqual([r[:3] for r in results], triples)
+        self.assertEqual([r.restricted for r in results], [True, False, None, None, True])
+        self.assertIsNone(results[0].error)
+        self.assertEqual([r.error_code for r in results],
+                         [None, None, INVALID_LICENSE_PLATE, INVALID_DATETIME, None])
+        self.assertIn("Invalid license plate format", results[2].error)
+        self.assertIn("Unable to parse", results[3].error)
+        self.assertIsInstance(results[0], PredictionResult)
+
+    def test_predict_many_matches_evaluate_on_odd_spellings(self):
+        """Test that dates and times parsed on their own agree with parsing them together."""
+        self.rule_set.exceptions.lift(date(2023, 10, 9))
+        self.rule_set.exceptions.restrict_as(date(2023, 10, 7), 0)
+        triples = [("ABC-121", day, clock)
+                   for day in ("2023-10-02", "2023-10-2", "2023-10-02 ", " 2023-10-02",
+                               "2023-10-09", "2023-10-07", "2023-02-29", "", "2023-10-02 08")
+                   for clock in ("08:00", "8:00", " 8:00", "08:00 ", "24:00", "08", ":00", "")]
+        self.assertEqual(list(self.predictor.predict_many(triples)),
+                         [self.predictor.evaluate(*triple)._replace(rule=None)
+                          for triple in triples])
+
+    def test_predict_many_no_rules(self):
+        """Test that predict_many reports a missing rule set on every valid item."""
+        predictor = PicoPlacaPredictor(PicoPlacaRuleSet())
+        result, = predictor.predict_many([("ABC-121", "2023-10-02", "08:00")])
+        self.assertIsNone(result.restricted)
+        self.assertEqual(result.error_code, NO_RULES)
+        self.assertEqual(result.error, str(NoRulesDefinedError()))
+
+    def test_evaluate(self):
+        """Test that evaluate returns structured results with the matched rule."""
+        result = self.predictor.evaluate("ABC-121", "2023-10-02", "08:00")
+        self.assertEqual((result.restricted, result.verdict, result.error_code),
+                         (True, "restricted", None))
+        self.assertIs(result.rule, self.monday_rule)
+        self.assertFalse(hasattr(result, "__dict__"))
+
+        unrestricted = self.predictor.evaluate("ABC-125", "2023-10-02", "08:00")
+        self.assertEqual((unrestricted.verdict, unrestricted.rule), ("not_restricted", None))
+        self.assertEqual(self.predictor.evaluate("BAD", "2023-10-02", "08:00").error_code,
+                         INVALID_LICENSE_PLATE)
+        invalid = self.predictor.evaluate("ABC-121", "2023-10-02", "8h")
+        self.assertEqual((invalid.verdict, invalid.error_code), ("error", INVALID_DATETIME))
+        self.assertEqual(PicoPlacaPredictor(PicoPlacaRuleSet()).evaluate(
+            "ABC-121", "2023-10-02", "08:00").error_code, NO_RULES)
+
+    def test_evaluate_with_schedule(self):
+        """Test that evaluate reports the rule of the version in force."""
+        schedule = PicoPlacaSchedule()
+        schedule.add_version(date(2023, 1, 1), self.rule_set)
+        predictor = PicoPlacaPredictor(schedule)
+        self.assertIs(predictor.evaluate("ABC-121", "2023-10-02", "08:00").rule,
+                      self.monday_rule)
+        self.assertEqual(predictor.evaluate("ABC-121", "2022-10-03", "08:00").error_code,
+                         NO_RULES)
+
+    def test_predict_many_epochs(self):
+        """Test that UTC epochs give the same verdicts as the matching local times."""
+        # 2023-10-02 13:00 UTC is 08:00 in Guayaquil (UTC-5)
+        epochs = [1696251600 + 60 * 97 * step for step in range(200)]
+        pairs = [("ABC-121", epoch) for epoch in epochs] + [
+            ("BAD", epochs[0]), ("ABC-121", "soon"), ("ABC-121", float("nan"))]
+        results = list(self.predictor.predict_many_epochs(pairs, "America/Guayaquil"))
+        self.assertEqual((results[0].date, results[0].time, results[0].restricted),
+                         ("2023-10-02", "08:00", True))
+        expected = list(self.predictor.predict_many(
+            (plate, result.date, result.time) for (plate, _), result in zip(pairs, results)))
+        self.assertEqual(results[:201], expected[:201])
+        self.assertEqual([result.error_code for result in results[200:]],
+                         [INVALID_LICENSE_PLATE, INVALID_DATETIME, INVALID_DATETIME])
+        self.assertEqual(results[201].date, "soon")
+        self.assertEqual(self.predictor.evaluate_epoch("ABC-121", 1696251600, "UTC").time,
+                         "13:00")
+
+    def test_predict_many_epochs_with_schedule(self):
+        """Test that epochs are checked against the version in force on the local date."""
+        schedule = PicoPlacaSchedule()
+        schedule.add_version(date(2023, 10, 2), self.rule_set)
+        predictor = PicoPlacaPredictor(schedule)
+        # 2023-10-02 04:30 UTC is still 2023-10-01 in Guayaquil
+        results = list(predictor.predict_many_epochs(
+            [("ABC-121", 1696221000), ("ABC-121", 1696251600)], "America/Guayaquil"))
+        self.assertEqual([result.error_code for result in results], [NO_RULES, None])
+        self.assertTrue(results[1].restricted)
+        self.assertEqual(PicoPlacaPredictor(PicoPlacaRuleSet()).evaluate_epoch(
+            "ABC-121", 1696251600, "UTC").error_code, NO_RULES)
+
+    def test_predict_many_with_stats(self):
+        """Test that instrumented batches give the same results and count every stage."""
+        triples = [("ABC-121", "2023-10-02", "08:00"),
+                   ("INVALID", "2023-10-02", "08:00"),
+                   ("ABC-122", "2023-10-02", "8:00am"),
+                   ("ABC-125", "2023-10-02", "08:00")]
+        stats = PredictorStats()
+        instrumented = PicoPlacaPredictor(self.rule_set, stats)
+
+        self.assertEqual(list(instrumented.predict_many(triples)),
+                         list(self.predictor.predict_many(triples)))
+        self.assertEqual(stats.counts, {"plate": 4, "datetime": 3, "rules": 2, "format": 0})
+        self.assertEqual(stats.errors, {INVALID_LICENSE_PLATE: 1, INVALID_DATETIME: 1})
+
+    def test_predict_restriction_with_stats(self):
+        """Test that predict_restriction times each stage it reaches."""
+        stats = PredictorStats()
+        predictor = PicoPlacaPredictor(self.rule_set, stats)
+        self.assertEqual(predictor.predict_restriction("ABC-121", "2023-10-02", "08:00"),
+                         self.predictor.predict_restriction("ABC-121", "2023-10-02", "08:00"))
+        predictor.predict_restriction("ABC-121", "2023-10-02", "8h")
+        PicoPlacaPredictor(PicoPlacaRuleSet(), stats).predict_restriction(
+            "ABC-121", "2023-10-02", "08:00")
+        with patch.object(predictor, "_is_restricted", side_effect=ValueError("bad rule")):
+            self.assertEqual(predictor.predict_restriction("ABC-121", "2023-10-02", "08:00"),
+                             "Error: bad rule")
+        self.assertEqual(stats.counts, {"plate": 4, "datetime": 4, "rules": 3, "format": 1})
+        self.assertEqual(stats.errors, {INVALID_DATETIME: 1, NO_RULES: 1, RULE_ERROR: 1})
+
+    def test_evaluate_with_stats(self):
+        """Test that evaluate gives the same results and times each stage it reaches."""
+        stats = PredictorStats()
+        predictor = PicoPlacaPredictor(self.rule_set, stats)
+        for time in ("08:00", "8h"):
+            self.assertEqual(predictor.evaluate("ABC-121", "2023-10-02", time),
+                             self.predictor.evaluate("ABC-121", "2023-10-02", time))
+        predictor.evaluate("INVALID", "2023-10-02", "08:00")
+        PicoPlacaPredictor(PicoPlacaRuleSet(), stats).evaluate("ABC-121", "2023-10-02", "08:00")
+        self.assertEqual(stats.counts, {"plate": 4, "datetime": 3, "rules": 2, "format": 0})
+        self.assertEqual(stats.errors, {INVALID_LICENSE_PLATE: 1, INVALID_DATETIME: 1,
+                                        NO_RULES: 1})
+
+
+class TestPredictorStats(unittest.TestCase):
+    """Test cases for the PredictorStats class."""
+
+    def test_histogram_and_merge(self):
+        """Test bucket placement, merging and the Prometheus exposition."""
+        stats = PredictorStats()
+        stats.observe("rules", 2e-6)
+        stats.observe("rules", 0.5)
+        stats.count_error(NO_RULES)
+        other = PredictorStats()
+        other.observe("rules", 1e-6)
+        other.count_error(NO_RULES)
+        stats.merge(other)
+
+        self.assertEqual(stats.counts["rules"], 3)
+        self.assertEqual(stats.buckets["rules"][:2], [1, 1])
+        self.assertEqual(stats.buckets["rules"][-1], 1)
+        self.assertEqual(stats.errors, {NO_RULES: 2})
+        text = stats.to_prometheus()
+        self.assertIn('picoplaca_stage_duration_seconds_bucket{stage="rules",le="2.5e-06"} 2',
+                      text)
+        self.assertIn('picoplaca_stage_duration_seconds_bucket{stage="rules",le="+Inf"} 3', text)
+        self.assertIn('picoplaca_errors_total{code="no_rules"} 2', text)
+        self.assertIn("rules", stats.summary())
+
+        stats.reset()
+        self.assertEqual(stats.counts["rules"], 0)
+        self.assertEqual(stats.errors, {})
+
 
 if __name__ == '__main__':
     unittest.main()
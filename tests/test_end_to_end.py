@@ -3,10 +3,15 @@ End-to-End tests for the Pico y Placa system.
 
 Contains comprehensive tests that verify the complete system functionality using real components.
 """
+import os
+import subprocess
+import sys
 import unittest
 from datetime import time
 from core import PicoPlacaRule, PicoPlacaRuleSet, PicoPlacaPredictor
 
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 
 class TestPicoPlacaPredictorEndToEnd(unittest.TestCase):
     """Test cases for end-to-end validation of the PicoPlacaPredictor."""
@@ -160,6 +165,77 @@ class TestPicoPlacaPredictorEndToEnd(unittest.TestCase):
         result = self.predictor.predict_restriction("ABC-121", "2023-10-02", "19:59")
         self.assertEqual(result, self.RESTRICTED_MSG)
 
+    def test_next_unrestricted_and_restricted(self):
+        """Test the next-change predictions with real components."""
+        self.assertEqual(self.predictor.predict_next_unrestricted("ABC-121", "2023-10-02", "17:00"),
+                         "Vehicle may circulate from 2023-10-02 20:00")
+        self.assertEqual(self.predictor.predict_next_restricted("ABC-121", "2023-10-02", "20:00"),
+                         "Vehicle is restricted to circulate from 2023-10-09 06:00")
+        result = self.predictor.predict_next_restricted("INVALID", "2023-10-02", "20:00")
+        self.assertTrue(result.startswith(self.LICENSE_PLATE_ERROR_PREFIX))
+
+    def test_predict_many_matches_single_predictions(self):
+        """Test that predict_many agrees with predict_restriction for every input."""
+        triples = [(plate, date, clock)
+                   for plate in ("ABC-121", "XYZ-100", "ABC-123", "INVALID")
+                   for date in ("2023-10-02", "2023-10-06", "2023-10-07", "2023/10/02")
+                   for clock in ("05:59", "06:00", "09:29", "09:30", "17:30", "8:00am")]
+
+        for triple, result in zip(triples, self.predictor.predict_many(triples)):
+            expected = self.predictor.predict_restriction(*triple)
+            if result.error is not None:
+                self.assertEqual(expected, self.ERROR_PREFIX + result.error)
+            elif result.restricted:
+                self.assertEqual(expected, self.RESTRICTED_MSG)
+            else:
+                self.assertEqual(expected, self.NOT_RESTRICTED_MSG)
+
+
+class TestCommandLineStartup(unittest.TestCase):
+    """Test cases for the start-up cost of cli.py, measured with python -X importtime."""
+
+    # Cumulative import time allowed for 'import cli', in microseconds; about 40 ms is
+    # typical, while eagerly importing every package took over 200 ms
+    IMPORT_BUDGET_US = 100_000
+
+    # Modules that a single check must not load
+    DEFERRED_MODULES = ("numpy", "asyncio", "multiprocessing", "batch", "service",
+                        "input.record_reader", "input.rule_config_loader",
+                        "input.time_zone_converter", "core.vectorized_engine")
+
+    def _import_times(self, *args):
+        """Runs Python with -X importtime and returns {module: cumulative microseconds}."""
+        completed = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT,
+                                   capture_output=True, text=True, check=True)
+        times = {}
+        for line in completed.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+        return times
+
+    def test_single_check_defers_unused_modules(self):
+        """Test that a single check does not import batch, service or optional modules."""
+        imported = self._import_times(os.path.join(ROOT, "cli.py"), "--plate", "ABC-1234",
+                                      "--date", "2023-10-02", "--time", "08:00")
+        self.assertIn("core.pico_placa_predictor", imported)
+        for module in self.DEFERRED_MODULES:
+            self.assertNotIn(module, imported)
+
+    def test_format_choices_match_record_reader(self):
+        """Test that the formats spelled out in cli match those the record reader accepts."""
+        import cli
+        from input.record_reader import FORMATS
+        self.assertEqual(cli.FORMATS, FORMATS)
+
+    def test_import_time_budget(self):
+        """Test that importing cli stays within its start-up budget."""
+        # The best of a few runs, so that a busy machine does not fail the test
+        best = min(self._import_times("-c", "import cli")["cli"] for _ in range(3))
+        self.assertLess(best, self.IMPORT_BUDGET_US)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,8 +3,23 @@ Test module for the input parser classes.
 This module contains unit tests that verify the functionality of the DateTimeParser
 and LicensePlateParser classes, ensuring they correctly parse and validate input data.
 """
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
 import unittest
+from datetime import datetime as Datetime, timedelta, timezone
+from unittest.mock import patch
+from cli import setup_default_rules
 from input import DateTimeParser, LicensePlateParser
+from input.record_reader import RecordReader
+from input.rule_config_loader import RuleConfigError, RuleConfigLoader
+from input.time_zone_converter import TimeZoneConverter, TABLE_END, np
+from zoneinfo import ZoneInfo
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 class TestDateTimeParser(unittest.TestCase):
     """Test cases for the DateTimeParser class."""
@@ -23,6 +38,121 @@ class TestDateTimeParser(unittest.TestCase):
         with self.assertRaises(ValueError):
             DateTimeParser.parse_datetime("2021-09-01", "")
 
+    def test_parse_date(self):
+        """Test that parse_date parses a date on its own and rejects invalid ones."""
+        self.assertEqual(DateTimeParser.parse_date("2023-10-02"), Datetime(2023, 10, 2).date())
+        with self.assertRaises(ValueError):
+            DateTimeParser.parse_date("2023-1002")
+
+    def test_try_parse_datetime(self):
+        """Test that try_parse_datetime returns None instead of raising."""
+        self.assertEqual(DateTimeParser.try_parse_datetime("2021-09-01", "08:00"),
+                         DateTimeParser.parse_datetime("2021-09-01", "08:00"))
+        self.assertIsNone(DateTimeParser.try_parse_datetime("2021-09-01", ""))
+        self.assertIsNone(DateTimeParser.try_parse_datetime("2021-02-30", "08:00"))
+
+    def test_fast_path_matches_strptime(self):
+        """Test that the canonical fast path accepts exactly what strptime accepts."""
+        for date_str in ("2024-02-29", "2023-02-29", "1900-02-29", "2000-02-29", "0000-01-01",
+                         "0001-01-01", "9999-12-31", "2023-13-01", "2023-00-10", "2023-1-2",
+                         "2023-10-0a", "2023-10-2 "):
+            for time_str in ("00:00", "23:59", "24:00", "12:60", "8:00", "08:00am"):
+                try:
+                    expected = Datetime.strptime(date_str + " " + time_str, "%Y-%m-%d %H:%M")
+                except ValueError:
+                    expected = None
+                for _ in range(2):  # First sight, then memoized
+                    self.assertEqual(DateTimeParser.try_parse_datetime(date_str, time_str),
+                                     expected, (date_str, time_str))
+
+    def test_try_parse_ordinal_minute(self):
+        """Test that dates and times are converted to the day ordinal and minute of the day."""
+        self.assertEqual(DateTimeParser.try_parse_ordinal_minute("2023-10-02", "08:15"),
+                         (Datetime(2023, 10, 2).toordinal(), 8 * 60 + 15))
+        self.assertEqual(DateTimeParser.try_parse_ordinal_minute("2023-10-2", "8:15"),
+                         (Datetime(2023, 10, 2).toordinal(), 8 * 60 + 15))
+        self.assertIsNone(DateTimeParser.try_parse_ordinal_minute("2023-02-30", "08:15"))
+        self.assertIsNone(DateTimeParser.try_parse_ordinal_minute("2023-10-02", "24:00"))
+
+    def test_try_parse_minute_of_week(self):
+        """Test that dates and times are converted straight to the minute of the week."""
+        monday = Datetime(2023, 10, 2)
+        for offset in range(0, 14 * 24 * 60, 37):
+            moment = monday + timedelta(minutes=offset)
+            self.assertEqual(
+                DateTimeParser.try_parse_minute_of_week(moment.strftime("%Y-%m-%d"),
+                                                        moment.strftime("%H:%M")),
+                offset % (7 * 24 * 60))
+        self.assertEqual(DateTimeParser.try_parse_minute_of_week("2023-10-3", "8:00"),
+                         24 * 60 + 8 * 60)
+        self.assertIsNone(DateTimeParser.try_parse_minute_of_week("2023-02-29", "08:00"))
+        self.assertIsNone(DateTimeParser.try_parse_minute_of_week("2023-10-02", "24:00"))
+
+    def test_minute_of_week_from_epoch(self):
+        """Test that epoch seconds are converted to the minute of the week."""
+        # 2023-10-02 08:00:30 UTC, a Monday
+        self.assertEqual(DateTimeParser.minute_of_week_from_epoch(1696233630), 8 * 60)
+        # 1970-01-01 00:00 was a Thursday
+        self.assertEqual(DateTimeParser.minute_of_week_from_epoch(0), 3 * 24 * 60)
+        self.assertEqual(DateTimeParser.minute_of_week_from_epoch(-60), 3 * 24 * 60 - 1)
+
+class TestTimeZoneConverter(unittest.TestCase):
+    """Test cases for UTC epoch conversion with cached offset transitions."""
+
+    ZONES = ("America/Guayaquil", "America/New_York", "Australia/Lord_Howe", "UTC")
+
+    def _probes(self, converter):
+        """Lists epochs around every transition, plus a spread across and beyond the table."""
+        probes = [-86400 * 400, -1, 0, TABLE_END - 1, TABLE_END, TABLE_END + 86400 * 400]
+        for transition in converter.transitions:
+            probes += [transition - 3600, transition - 1, transition, transition + 1,
+                       transition + 1799.5, transition + 3600]
+        probes += range(0, TABLE_END, 86400 * 37 + 3607)
+        return probes
+
+    def _expected(self, zone, epoch):
+        """Converts one epoch with zoneinfo."""
+        return (Datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=epoch)) \
+            .astimezone(ZoneInfo(zone)).replace(tzinfo=None)
+
+    def test_matches_zoneinfo_across_transitions(self):
+        """Test scalar conversions against zoneinfo on both sides of every transition."""
+        for zone in self.ZONES:
+            converter = TimeZoneConverter.for_zone(zone)
+            for epoch in self._probes(converter):
+                expected = self._expected(zone, epoch)
+                self.assertEqual(converter.to_local(epoch), expected, (zone, epoch))
+                self.assertEqual(converter.ordinal_minute(epoch),
+                                 (expected.toordinal(), expected.hour * 60 + expected.minute))
+        self.assertEqual(len(TimeZoneConverter.for_zone("America/Guayaquil").transitions), 2)
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_array_matches_zoneinfo(self):
+        """Test array conversions, for mixed and single-segment batches, and NaN rows."""
+        for zone in self.ZONES:
+            converter = TimeZoneConverter.for_zone(zone)
+            probes = self._probes(converter)
+            expected = np.array([self._expected(zone, epoch) for epoch in probes],
+                                dtype="datetime64[us]")
+            self.assertTrue((converter.to_local_array(probes) == expected).all(), zone)
+            summer = [1696233600 + 60 * minute for minute in range(100)]
+            self.assertTrue((converter.to_local_array(np.array(summer, dtype=np.int64))
+                             == np.array([self._expected(zone, epoch) for epoch in summer],
+                                         dtype="datetime64[us]")).all())
+        local = TimeZoneConverter.for_zone("UTC").to_local_array([0.5, math.nan])
+        self.assertEqual(local[0], np.datetime64("1970-01-01T00:00:00.500000"))
+        self.assertTrue(np.isnat(local[1]))
+
+    def test_shared_per_zone_and_invalid_input(self):
+        """Test that converters are shared per zone and bad input is rejected."""
+        self.assertIs(TimeZoneConverter.for_zone("America/Guayaquil"),
+                      TimeZoneConverter.for_zone("America/Guayaquil"))
+        with self.assertRaises(ValueError):
+            TimeZoneConverter.for_zone("UTC").local_seconds(math.nan)
+        with self.assertRaises(KeyError):
+            TimeZoneConverter.for_zone("Not/AZone")
+
+
 class TestLicensePlateParser(unittest.TestCase):
     """Test cases for the LicensePlateParser class."""
 
@@ -41,6 +171,197 @@ class TestLicensePlateParser(unittest.TestCase):
         with self.assertRaises(ValueError):
             LicensePlateParser.parse_license_plate("ABC-1B34")
 
+    def test_try_parse_license_plate(self):
+        """Test that try_parse_license_plate returns None instead of raising."""
+        self.assertEqual(LicensePlateParser.try_parse_license_plate("ABC-1230"), 0)
+        self.assertIsNone(LicensePlateParser.try_parse_license_plate("ABC-12"))
+        self.assertIsNone(LicensePlateParser.try_parse_license_plate("ABC-123\n"))
+
+
+class TestRecordReader(unittest.TestCase):
+    """Test cases for the RecordReader class."""
+
+    def test_read_csv(self):
+        """Test that CSV rows become records and malformed rows carry an error."""
+        stream = io.StringIO("plate,date,time,id\n"
+                             "ABC-123,2023-10-02,08:00,1\n"
+                             "ABC-124,2023-10-02\n")
+        first, second = RecordReader(stream, "csv")
+        self.assertEqual(first.triple, ("ABC-123", "2023-10-02", "08:00"))
+        self.assertEqual(first.fields["id"], "1")
+        self.assertIsNone(second.triple)
+        self.assertEqual(second.error, "line 3: field 'time' is missing")
+
+    def test_read_csv_missing_column(self):
+        """Test that a CSV header without the required columns is reported once."""
+        records = list(RecordReader(io.StringIO("plate,when\nABC-123,now\n"), "csv"))
+        self.assertEqual(len(records), 1)
+        self.assertIn("missing CSV column(s): date, time", records[0].error)
+
+    def test_read_jsonl(self):
+        """Test that JSON lines become records and invalid lines carry an error."""
+        stream = io.StringIO('{"plate": "ABC-123", "date": "2023-10-02", "time": "08:00"}\n'
+                             '\n'
+                             'not json\n'
+                             '{"plate": 123, "date": "2023-10-02", "time": "08:00"}\n')
+        records = list(RecordReader(stream, "jsonl"))
+        self.assertEqual([r.line_number for r in records], [1, 3, 4])
+        self.assertEqual(records[0].triple, ("ABC-123", "2023-10-02", "08:00"))
+        self.assertIn("invalid JSON", records[1].error)
+        self.assertEqual(records[2].error, "line 4: field 'plate' is not a string")
+
+    def test_detect_format(self):
+        """Test that the format is guessed from the file extension."""
+        self.assertEqual(RecordReader.detect_format("checks.JSONL"), "jsonl")
+        self.assertEqual(RecordReader.detect_format("checks.csv"), "csv")
+        self.assertEqual(RecordReader.detect_format("-"), "csv")
+
+
+class TestRuleConfigLoader(unittest.TestCase):
+    """Test cases for the RuleConfigLoader class."""
+
+    CONFIG = {
+        "default_region": "north",
+        "regions": {
+            "north": {"rules": [{"days": ["monday", 2], "digits": [1],
+                                 "windows": [["07:00", "08:00"], ["17:00", "18:30"]]}]},
+            "south": {"rules": [{"days": ["sunday"], "digits": [0], "windows": [["10:00", "11:00"]]}]},
+        },
+    }
+
+    def setUp(self):
+        """Set up temporary directories for configuration files and their caches."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache_directory = os.path.join(self.directory, "cache")
+        environment = patch.dict(os.environ, {"PICOPLACA_CACHE_DIR": self.cache_directory})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def write(self, name, text):
+        """Writes a configuration file and returns its path."""
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as config:
+            config.write(text)
+        return path
+
+    def test_bundled_config_matches_default_rules(self):
+        """Test that config/rules.json describes the built-in Quito schedule."""
+        rule_set = RuleConfigLoader.load(os.path.join(ROOT, "config", "rules.json"),
+                                         use_cache=False)
+        self.assertEqual(rule_set.compile().table, setup_default_rules().compile().table)
+
+    def test_regions(self):
+        """Test that the default region is used unless another one is requested."""
+        path = self.write("rules.json", json.dumps(self.CONFIG))
+        north = RuleConfigLoader.load(path)
+        self.assertTrue(north.is_vehicle_restricted(Datetime(2023, 10, 4, 17, 45), 1))
+        self.assertFalse(north.is_vehicle_restricted(Datetime(2023, 10, 8, 10, 30), 0))
+        south = RuleConfigLoader.load(path, "south")
+        self.assertTrue(south.is_vehicle_restricted(Datetime(2023, 10, 8, 10, 30), 0))
+        with self.assertRaises(RuleConfigError):
+            RuleConfigLoader.load(path, "east")
+
+    def test_exceptions(self):
+        """Test that a region's exception dates are attached to its rule set."""
+        config = json.loads(json.dumps(self.CONFIG))
+        config["regions"]["north"]["exceptions"] = {"lifted": ["2023-10-02"],
+                                                    "restricted_as": {"2023-10-07": "monday"}}
+        path = self.write("rules.json", json.dumps(config))
+        for _ in range(2):  # Parsed, then cached
+            rule_set = RuleConfigLoader.load(path)
+            self.assertFalse(rule_set.is_vehicle_restricted(Datetime(2023, 10, 2, 7, 30), 1))
+            self.assertTrue(rule_set.is_vehicle_restricted(Datetime(2023, 10, 7, 7, 30), 1))
+        config["regions"]["north"]["exceptions"] = {"lifted": ["2023-13-01"]}
+        with self.assertRaises(RuleConfigError):
+            RuleConfigLoader.load(self.write("rules.json", json.dumps(config)))
+
+    def test_region_required_without_default(self):
+        """Test that a file with several regions and no default needs an explicit region."""
+        config = dict(self.CONFIG)
+        del config["default_region"]
+        path = self.write("rules.json", json.dumps(config))
+        with self.assertRaises(RuleConfigError):
+            RuleConfigLoader.load(path)
+
+    def test_toml(self):
+        """Test that TOML files with the same structure are supported."""
+        path = self.write("rules.toml", '[[regions.quito.rules]]\n'
+                                        'days = ["friday"]\n'
+                                        'digits = [9, 0]\n'
+                                        'windows = [["06:00", "09:30"]]\n')
+        rule_set = RuleConfigLoader.load(path)
+        self.assertTrue(rule_set.is_vehicle_restricted(Datetime(2023, 10, 6, 9, 29), 0))
+        self.assertFalse(rule_set.is_vehicle_restricted(Datetime(2023, 10, 6, 9, 30), 0))
+
+    def test_cache_skips_parsing_until_the_source_changes(self):
+        """Test that an unchanged file is loaded from the cache and a changed one is not."""
+        path = self.write("rules.json", json.dumps(self.CONFIG))
+        RuleConfigLoader.load(path)
+        self.assertTrue(os.path.exists(RuleConfigLoader.cache_path(path)))
+
+        with patch.object(RuleConfigLoader, "parse") as parse:
+            rule_set = RuleConfigLoader.load(path)
+        parse.assert_not_called()
+        self.assertIsNotNone(rule_set._compiled)
+        self.assertTrue(rule_set.is_vehicle_restricted(Datetime(2023, 10, 2, 7, 0), 1))
+
+        self.CONFIG["regions"]["north"]["rules"][0]["digits"] = [2]
+        self.write("rules.json", json.dumps(self.CONFIG))
+        rule_set = RuleConfigLoader.load(path)
+        self.assertFalse(rule_set.is_vehicle_restricted(Datetime(2023, 10, 2, 7, 0), 1))
+        self.CONFIG["regions"]["north"]["rules"][0]["digits"] = [1]
+
+    def test_corrupt_cache_is_ignored(self):
+        """Test that an unreadable cache is rebuilt instead of failing the load."""
+        path = self.write("rules.json", json.dumps(self.CONFIG))
+        os.makedirs(self.cache_directory)
+        cache_file = RuleConfigLoader.cache_path(path)
+        with open(cache_file, "w", encoding="utf-8") as cache:
+            cache.write("not a cache")
+        rule_set = RuleConfigLoader.load(path)
+        self.assertTrue(rule_set.is_vehicle_restricted(Datetime(2023, 10, 2, 7, 0), 1))
+
+    def test_cache_is_private_plain_data(self):
+        """Test that the cache is JSON kept outside the config's directory."""
+        path = self.write("rules.json", json.dumps(self.CONFIG))
+        RuleConfigLoader.load(path)
+        cache_file = RuleConfigLoader.cache_path(path)
+        self.assertEqual(os.path.dirname(cache_file), self.cache_directory)
+        self.assertEqual(os.stat(self.cache_directory).st_mode & 0o777, 0o700)
+        with open(cache_file, encoding="utf-8") as cache:
+            cached = json.load(cache)
+        self.assertEqual(sorted(cached["regions"]), ["north", "south"])
+
+        rule = cached["regions"]["north"]["rules"][0]
+        # Tampered entries are rebuilt from source
+        for index, value in ((1, [10]), (2, "07:00:30"), (2, "07:00+05:00"), (2, 700)):
+            tampered = list(rule)
+            tampered[index] = value
+            cached["regions"]["north"]["rules"][0] = tampered
+            with open(cache_file, "w", encoding="utf-8") as cache:
+                json.dump(cached, cache)
+            rule_set = RuleConfigLoader.load(path)
+            self.assertTrue(rule_set.is_vehicle_restricted(Datetime(2023, 10, 2, 7, 0), 1),
+                            value)
+
+    def test_invalid_configs(self):
+        """Test that invalid configurations raise RuleConfigError."""
+        rule = {"days": ["monday"], "digits": [1], "windows": [["07:00", "08:00"]]}
+        for config in ("{", [], {"regions": {}}, {"regions": {"a": {}}},
+                       {"regions": {"a": {"rules": []}}, "default_region": "b"},
+                       {"regions": {"a": {"rules": [dict(rule, days=["someday"])]}}},
+                       {"regions": {"a": {"rules": [dict(rule, digits=[10])]}}},
+                       {"regions": {"a": {"rules": [dict(rule, windows=[["08:00", "07:00"]])]}}},
+                       {"regions": {"a": {"rules": [dict(rule, windows=[["7am", "8am"]])]}}},
+                       {"regions": {"a": {"rules": [dict(rule, windows=[["07:00+05:00",
+                                                                         "08:00"]])]}}},
+                       {"regions": {"a": {"rules": [dict(rule, windows=[["07:00:30",
+                                                                         "08:00"]])]}}}):
+            text = config if isinstance(config, str) else json.dumps(config)
+            with self.assertRaises(RuleConfigError, msg=text):
+                RuleConfigLoader.load(self.write("rules.json", text), use_cache=False)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,8 +3,17 @@ Test module for the OutputFormatter class.
 This module contains unit tests that verify the functionality of the OutputFormatter class,
 ensuring it correctly formats prediction results into human-readable messages.
 """
+import csv
+import io
+import json
 import unittest
+from datetime import datetime, time
+from core import PicoPlacaRule, PredictionResult
+from core.prediction_result import INVALID_LICENSE_PLATE, NO_RULES
 from output import OutputFormatter
+from output.output_formatter import BINARY_CODES, CSV_HEADER
+from output.interval_writer import IntervalWriter
+from output.record_writer import RecordWriter
 
 class TestOutputFormatter(unittest.TestCase):
     """Test cases for the OutputFormatter class."""
@@ -19,6 +28,126 @@ class TestOutputFormatter(unittest.TestCase):
           is not restricted."""
         message = OutputFormatter.format_prediction(False)
         self.assertEqual(message, "Vehicle is not restricted to circulate at this time and date")
+    def test_format_next_change(self):
+        """Test the messages for next-change predictions."""
+        moment = datetime(2023, 10, 2, 9, 30)
+        self.assertEqual(OutputFormatter.format_next_unrestricted(moment),
+                         "Vehicle may circulate from 2023-10-02 09:30")
+        self.assertEqual(OutputFormatter.format_next_unrestricted(None),
+                         "Vehicle is restricted to circulate at all times")
+        self.assertEqual(OutputFormatter.format_next_restricted(moment),
+                         "Vehicle is restricted to circulate from 2023-10-02 09:30")
+        self.assertEqual(OutputFormatter.format_next_restricted(None),
+                         "Vehicle is never restricted to circulate")
+
+
+class TestResultEncoders(unittest.TestCase):
+    """Test cases for the machine-readable result encoders of OutputFormatter."""
+
+    RULE = PicoPlacaRule([0], [1, 2], time(6, 0), time(9, 30))
+    RESULTS = [PredictionResult("ABC-121", "2023-10-02", "08:00", True, None, RULE),
+               PredictionResult("ABC-125", "2023-10-02", "08:00", False),
+               PredictionResult('A"B,C', "2023-10-02", "08:00", None, INVALID_LICENSE_PLATE),
+               PredictionResult("ABC-121", "2023-10-02", "08:00", None, NO_RULES)]
+
+    def test_write_jsonl(self):
+        """Test that JSON lines carry verdicts, error codes and matched rules."""
+        stream = io.BytesIO()
+        self.assertEqual(OutputFormatter.write_results(self.RESULTS, stream, "jsonl"), 4)
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(records[0], {"plate": "ABC-121", "date": "2023-10-02",
+                                      "time": "08:00", "verdict": "restricted",
+                                      "rule": {"days": [0], "digits": [1, 2],
+                                               "start": "06:00:00", "end": "09:30:00"}})
+        self.assertEqual(records[1]["verdict"], "not_restricted")
+        self.assertEqual((records[2]["plate"], records[2]["verdict"], records[2]["error_code"]),
+                         ('A"B,C', "error", INVALID_LICENSE_PLATE))
+        self.assertEqual(records[3]["error_code"], NO_RULES)
+
+    def test_write_csv(self):
+        """Test that CSV rows are quoted only where needed and parse back."""
+        stream = io.BytesIO()
+        OutputFormatter.write_results(self.RESULTS, stream, "csv")
+        rows = list(csv.DictReader(io.StringIO(stream.getvalue().decode("utf-8"))))
+        self.assertEqual([row["verdict"] for row in rows],
+                         ["restricted", "not_restricted", "error", "error"])
+        self.assertEqual(rows[2]["plate"], 'A"B,C')
+        self.assertEqual(rows[3]["error_code"], NO_RULES)
+        self.assertEqual(rows[0]["error_code"], "")
+
+    def test_write_binary(self):
+        """Test that the binary format holds one status byte per result."""
+        stream = io.BytesIO()
+        OutputFormatter.write_results(self.RESULTS * 3000, stream, "binary")
+        expected = bytes([BINARY_CODES["restricted"], BINARY_CODES["not_restricted"],
+                          BINARY_CODES[INVALID_LICENSE_PLATE], BINARY_CODES[NO_RULES]])
+        self.assertEqual(stream.getvalue(), expected * 3000)
+
+    def test_unknown_and_registered_formats(self):
+        """Test that unknown formats are rejected and new encoders can be registered."""
+        with self.assertRaises(ValueError):
+            OutputFormatter.write_results(self.RESULTS, io.BytesIO(), "xml")
+        OutputFormatter.register_encoder(
+            "verdicts", lambda results, stream: stream.write(
+                b"".join(result.verdict.encode() + b"\n" for result in results)))
+        stream = io.BytesIO()
+        OutputFormatter.write_results(self.RESULTS[:2], stream, "verdicts")
+        self.assertEqual(stream.getvalue(), b"restricted\nnot_restricted\n")
+
+
+class TestRecordWriter(unittest.TestCase):
+    """Test cases for the RecordWriter class."""
+
+    def test_write_csv(self):
+        """Test that CSV output keeps the input columns and adds verdict and error."""
+        stream = io.StringIO()
+        writer = RecordWriter(stream, "csv")
+        writer.write({"plate": "ABC-121", "date": "2023-10-02", "time": "08:00", "id": "7"},
+                     True)
+        writer.write({}, None, "line 3: invalid")
+        writer.write({"plate": "BAD"}, None, "Invalid license plate", INVALID_LICENSE_PLATE)
+        self.assertEqual(stream.getvalue().splitlines(), [
+            "plate,date,time,id,verdict,error_code,error",
+            "ABC-121,2023-10-02,08:00,7,restricted,,",
+            ",,,,error,invalid_record,line 3: invalid",
+            "BAD,,,,error,invalid_license_plate,Invalid license plate",
+        ])
+
+    def test_csv_schema_matches_structured_results(self):
+        """Test that batch CSV output shares its columns with OutputFormatter.write_csv."""
+        stream = io.StringIO()
+        RecordWriter(stream, "csv").write({"plate": "ABC-121", "date": "2023-10-02",
+                                           "time": "08:00"}, True)
+        self.assertTrue(stream.getvalue().startswith(CSV_HEADER.rstrip("\n")))
+
+    def test_write_jsonl(self):
+        """Test that JSON-lines output only carries an error key on failed records."""
+        stream = io.StringIO()
+        writer = RecordWriter(stream, "jsonl")
+        writer.write({"plate": "ABC-125"}, False)
+        writer.write({"plate": "BAD"}, None, "Invalid license plate", INVALID_LICENSE_PLATE)
+        first, second = map(json.loads, stream.getvalue().splitlines())
+        self.assertEqual(first, {"plate": "ABC-125", "verdict": "not_restricted"})
+        self.assertEqual(second, {"plate": "BAD", "verdict": "error",
+                                  "error_code": "invalid_license_plate",
+                                  "error": "Invalid license plate"})
+
+
+class TestIntervalWriter(unittest.TestCase):
+    """Test cases for the IntervalWriter class."""
+
+    def test_write_csv_and_jsonl(self):
+        """Test that intervals are written with ISO timestamps in both formats."""
+        start, end = datetime(2023, 10, 2, 6, 0), datetime(2023, 10, 2, 9, 30, 15)
+        csv_stream, jsonl_stream = io.StringIO(), io.StringIO()
+        IntervalWriter(csv_stream, "csv").write("ABC-121", start, end)
+        IntervalWriter(jsonl_stream, "jsonl").write("ABC-121", start, end)
+        self.assertEqual(csv_stream.getvalue(),
+                         "plate,start,end\nABC-121,2023-10-02T06:00,2023-10-02T09:30:15\n")
+        self.assertEqual(json.loads(jsonl_stream.getvalue()),
+                         {"plate": "ABC-121", "start": "2023-10-02T06:00",
+                          "end": "2023-10-02T09:30:15"})
+
 
 if __name__ == '__main__':
     unittest.main()
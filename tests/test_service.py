@@ -0,0 +1,241 @@
+"""
+Test module for the long-running service modes.
+
+Contains tests for the asyncio HTTP server, exercised over real localhost connections,
+and for the violation watcher.
+"""
+import asyncio
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from cli import setup_default_rules
+from core import PicoPlacaPredictor
+from core.predictor_stats import PredictorStats
+from service import PicoPlacaHttpServer, ViolationWatcher
+from service.violation_watcher import FUTURE_EVENT, INVALID_EVENT
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 2023-10-02 (a Monday) at 06:00 in Guayaquil, when plates ending in 1 and 2 are restricted
+MONDAY_6AM = 1696244400
+
+
+class TestPicoPlacaHttpServer(unittest.TestCase):
+    """Test cases for the PicoPlacaHttpServer class."""
+
+    def setUp(self):
+        """Set up a server on a free port."""
+        self.server = PicoPlacaHttpServer(PicoPlacaPredictor(setup_default_rules()), port=0)
+
+    def _exchange(self, *requests):
+        """Sends raw requests over a single connection and returns the parsed responses."""
+        async def run():
+            server = await self.server.start()
+            async with server:
+                reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+                responses = []
+                for request in requests:
+                    writer.write(request)
+                    await writer.drain()
+                    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+                    headers = dict(line.split(": ", 1) for line in head.split("\r\n")[1:] if line)
+                    body = await reader.readexactly(int(headers["Content-Length"]))
+                    if headers["Content-Type"] == "application/json":
+                        body = json.loads(body)
+                    responses.append((int(head.split(" ")[1]), headers, body))
+                writer.close()
+                return responses
+        return asyncio.run(run())
+
+    def test_get_check_with_keep_alive(self):
+        """Test two GET checks answered over the same connection."""
+        first, second = self._exchange(
+            b"GET /check?plate=ABC-121&date=2023-10-02&time=08:00 HTTP/1.1\r\nHost: x\r\n\r\n",
+            b"GET /check?plate=ABC-123&date=2023-10-02&time=08:00 HTTP/1.1\r\nHost: x\r\n\r\n")
+        self.assertEqual(first[0], 200)
+        self.assertEqual(first[1]["Connection"], "keep-alive")
+        self.assertEqual(first[2], {"plate": "ABC-121", "date": "2023-10-02",
+                                    "time": "08:00", "verdict": "restricted"})
+        self.assertEqual(second[2]["verdict"], "not_restricted")
+
+    def test_post_batch_check(self):
+        """Test a batched POST check with one invalid entry."""
+        body = json.dumps([{"plate": "XYZ-100", "date": "2023-10-06", "time": "17:30"},
+                           {"plate": "BAD", "date": "2023-10-06", "time": "17:30"}]).encode()
+        (status, _, payload), = self._exchange(
+            b"POST /check HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+        self.assertEqual(status, 200)
+        self.assertEqual(payload[0]["verdict"], "restricted")
+        self.assertEqual((payload[1]["verdict"], payload[1]["error_code"]),
+                         ("error", "invalid_license_plate"))
+        self.assertIn("Invalid license plate format", payload[1]["error"])
+
+    def test_errors(self):
+        """Test missing parameters, unknown endpoints and invalid bodies."""
+        missing, unknown, invalid = self._exchange(
+            b"GET /check?plate=ABC-121 HTTP/1.1\r\n\r\n",
+            b"GET /nowhere HTTP/1.1\r\n\r\n",
+            b"POST /check HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}")
+        self.assertEqual((missing[0], missing[2]["error"]),
+                         (400, "Missing query parameter 'date'"))
+        self.assertEqual(unknown[0], 404)
+        self.assertEqual(invalid[0], 400)
+
+    def test_metrics(self):
+        """Test that /metrics exposes the stats in the Prometheus text format."""
+        (status, _, _), = self._exchange(b"GET /metrics HTTP/1.1\r\n\r\n")
+        self.assertEqual(status, 404)
+
+        self.server.predictor.stats = PredictorStats()
+        _, (status, headers, body) = self._exchange(
+            b"GET /check?plate=BAD&date=2023-10-02&time=08:00 HTTP/1.1\r\n\r\n",
+            b"GET /metrics HTTP/1.1\r\n\r\n")
+        self.assertEqual(status, 200)
+        self.assertTrue(headers["Content-Type"].startswith("text/plain"))
+        text = body.decode("utf-8")
+        self.assertIn('picoplaca_stage_duration_seconds_count{stage="plate"} 1', text)
+        self.assertIn('picoplaca_errors_total{code="invalid_license_plate"} 1', text)
+
+    def test_metrics_callable(self):
+        """Test that a metrics callable takes over /metrics."""
+        self.server.metrics = lambda: "picoplaca_watch_events_total 3\n"
+        (status, _, body), = self._exchange(b"GET /metrics HTTP/1.1\r\n\r\n")
+        self.assertEqual((status, body), (200, b"picoplaca_watch_events_total 3\n"))
+
+
+def _event(plate, epoch, speed=None) -> bytes:
+    """Encodes one position event."""
+    event = {"plate": plate, "ts": epoch}
+    if speed is not None:
+        event["speed"] = speed
+    return json.dumps(event).encode("utf-8")
+
+
+class TestViolationWatcher(unittest.TestCase):
+    """Test cases for the ViolationWatcher class."""
+
+    def setUp(self):
+        """Set up a watcher in Quito's time zone."""
+        self.watcher = ViolationWatcher(PicoPlacaPredictor(setup_default_rules()),
+                                        "America/Guayaquil", idle_timeout=600)
+
+    def test_alerts_once_per_restricted_window(self):
+        """Test that only transitions of moving vehicles into restriction raise alerts."""
+        violations = self.watcher.process_lines([
+            _event("ABC-121", MONDAY_6AM - 60, 30),       # before the window
+            _event("ABC-121", MONDAY_6AM, 30),            # enters it: alert
+            _event("ABC-121", MONDAY_6AM + 60, 30),       # still inside: no alert
+            _event("ABC-123", MONDAY_6AM, 30),            # not restricted
+            _event("ABC-122", MONDAY_6AM, 0),             # parked inside the window
+            _event("ABC-122", MONDAY_6AM + 120),          # starts moving: alert
+        ])
+        self.assertEqual([(v.license_plate, v.time) for v in violations],
+                         [("ABC-121", "06:00"), ("ABC-122", "06:02")])
+        # Leaving the window re-arms the vehicle for the evening one
+        self.assertEqual(self.watcher.process_lines([_event("ABC-121", MONDAY_6AM + 4 * 3600)]),
+                         [])
+        evening = self.watcher.process_lines([_event("ABC-121", MONDAY_6AM + 10 * 3600, 5)])
+        self.assertEqual([v.time for v in evening], ["16:00"])
+        self.assertEqual((self.watcher.events, self.watcher.violations), (8, 3))
+        self.assertEqual(json.loads(evening[0].to_json()),
+                         {"event": "violation", "plate": "ABC-121",
+                          "ts": MONDAY_6AM + 10 * 3600, "date": "2023-10-02", "time": "16:00"})
+
+    def test_invalid_events_are_counted(self):
+        """Test that malformed events are rejected without stopping the batch."""
+        violations = self.watcher.process_lines([
+            b"not json", b"[1, 2]", b'{"plate": "ABC-121"}', b'{"plate": 5, "ts": 1}',
+            b'{"plate": "ABC-121", "ts": true}', b'{"plate": "ABC-121", "ts": "soon"}',
+            b'{"plate": "BAD", "ts": 1}', b"", _event("ABC-121", MONDAY_6AM)])
+        self.assertEqual(len(violations), 1)
+        self.assertEqual(self.watcher.errors, {INVALID_EVENT: 5, "invalid_datetime": 1,
+                                               "invalid_license_plate": 1})
+        self.assertEqual(self.watcher.events, 1)
+
+    def test_idle_vehicles_are_evicted(self):
+        """Test that state stays proportional to the vehicles seen within the timeout."""
+        for minute in range(120):
+            self.watcher.process_lines([_event(f"ABC-{1000 + minute * 10 + index}",
+                                               MONDAY_6AM + minute * 60)
+                                        for index in range(10)])
+        self.assertEqual(self.watcher.tracked, 110)
+        self.assertEqual(self.watcher.evicted, 1090)
+        text = self.watcher.to_prometheus()
+        self.assertIn("picoplaca_watch_tracked_vehicles 110", text)
+        self.assertIn("picoplaca_watch_events_total 1200", text)
+
+    def test_future_events_are_rejected(self):
+        """Test that a far-future event neither evicts active vehicles nor stops eviction."""
+        self.watcher.clock = lambda: MONDAY_6AM + 60
+        self.assertEqual(len(self.watcher.process_lines([_event("ABC-121", MONDAY_6AM)])), 1)
+        self.assertEqual(self.watcher.process_lines([_event("ABC-999", 7258118400),
+                                                     _event("ABC-121", MONDAY_6AM + 30)]), [])
+        self.assertEqual(self.watcher.errors, {FUTURE_EVENT: 1})
+        self.assertEqual((self.watcher.events, self.watcher.evicted), (2, 0))
+
+        # Idle vehicles are still evicted once event time moves on
+        self.watcher.clock = lambda: MONDAY_6AM + 3600
+        self.watcher.process_lines([_event("ABC-123", MONDAY_6AM + 3600)])
+        self.assertEqual((self.watcher.tracked, self.watcher.evicted), (1, 1))
+
+    def test_run_stream_with_bounded_queues(self):
+        """Test a stream larger than the queues, with a partial last line."""
+        watcher = ViolationWatcher(PicoPlacaPredictor(setup_default_rules()),
+                                   "America/Guayaquil", queue_size=2)
+        lines = [_event(f"ABC-{1000 + index % 9000}", MONDAY_6AM + index // 10)
+                 for index in range(20000)]
+        source = io.BytesIO(b"\n".join(lines))
+        target = io.BytesIO()
+        asyncio.run(watcher.run_stream(source, target))
+        alerts = [json.loads(line) for line in target.getvalue().splitlines()]
+        self.assertEqual(watcher.events, 20000)
+        # One alert per plate ending in 1 or 2, however often it is seen
+        self.assertEqual(len(alerts), 1800)
+        self.assertLessEqual(watcher.queue_peak, 2)
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets are not available")
+    def test_serve_socket(self):
+        """Test events sent over two connections to a Unix socket."""
+        async def run(path, target):
+            task = asyncio.ensure_future(self.watcher.serve_socket(path, target))
+            while not os.path.exists(path):
+                await asyncio.sleep(0.01)
+            for plate in ("ABC-121", "ABC-122"):
+                _, writer = await asyncio.open_unix_connection(path)
+                writer.write(_event(plate, MONDAY_6AM) + b"\n")
+                await writer.drain()
+                writer.close()
+            while self.watcher.events < 2:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        with tempfile.TemporaryDirectory() as directory:
+            target = io.BytesIO()
+            asyncio.run(run(os.path.join(directory, "events.sock"), target))
+        self.assertEqual(sorted(json.loads(line)["plate"]
+                                for line in target.getvalue().splitlines()),
+                         ["ABC-121", "ABC-122"])
+
+    def test_watch_command(self):
+        """Test the watch command reading standard input."""
+        events = b"\n".join([_event("ABC-121", MONDAY_6AM), _event("ABC-121", MONDAY_6AM + 60),
+                             b"garbage"]) + b"\n"
+        process = subprocess.run([sys.executable, "cli.py", "--stats", "watch"], input=events,
+                                 cwd=ROOT, check=True, capture_output=True)
+        self.assertEqual(len(process.stdout.splitlines()), 1)
+        self.assertIn(b"violations: 1", process.stderr)
+        self.assertIn(b"errors[invalid_event]: 1", process.stderr)
+        # One report, with the watch counters and predictor stats under their own headings
+        self.assertEqual(process.stderr.count(b"predictor stats:"), 1)
+        self.assertLess(process.stderr.index(b"watch counters:"),
+                        process.stderr.index(b"predictor stats:"))
+
+
+if __name__ == '__main__':
+    unittest.main()